@@ -2,10 +2,20 @@ import argparse
 import asyncio
 from typing import Iterable
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, select, update
 
-from database.database import AsyncSessionLocal
+from database.database import AsyncSessionLocal, close_redis, init_redis
 from database.models import FavoritePlace, Subscription, Trip, User
+from services.place_catalog import ingest_new_trips, top_places
+from services.plan_store import gc_orphan_blobs, migrate_legacy_plans, storage_stats
+from services.trip_retention import (
+    TRIP_HISTORY_RETENTION_DAYS,
+    TRIP_RETENTION_BATCH_SIZE,
+    count_eligible,
+    history_cutoff,
+    run_retention,
+)
+from services.user_cache import invalidate_user
 
 
 def _print_table(headers: list[str], rows: Iterable[list[str]]) -> None:
@@ -112,6 +122,16 @@ async def _delete_user_with_related(db, user: User) -> None:
     await db.delete(user)
 
 
+async def _invalidate_users(user_ids: list[int]) -> None:
+    """Çalışan API'nin Redis'teki kullanıcı önbelleğini düşür (süreç içi kopyalar kısa sürede dolar)."""
+    await init_redis()
+    try:
+        for user_id in user_ids:
+            await invalidate_user(user_id)
+    finally:
+        await close_redis()
+
+
 async def cmd_users_delete(args: argparse.Namespace) -> None:
     if args.all and not args.yes:
         raise SystemExit("Bulk delete requires --yes confirmation.")
@@ -127,6 +147,7 @@ async def cmd_users_delete(args: argparse.Namespace) -> None:
             for user in users:
                 await _delete_user_with_related(db, user)
             await db.commit()
+            await _invalidate_users([user.id for user in users])
             print(f"deleted_users={len(users)}")
             return
 
@@ -147,9 +168,84 @@ async def cmd_users_delete(args: argparse.Namespace) -> None:
 
         await _delete_user_with_related(db, user)
         await db.commit()
+        await _invalidate_users([user.id])
         print(f"deleted_user_id={user.id} email={user.email}")
 
 
+async def cmd_users_set_active(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(User).where(User.id == args.id).values(is_active=args.active).returning(User.email)
+        )
+        email = result.scalar_one_or_none()
+        if email is None:
+            print("User not found.")
+            return
+        await db.commit()
+    await _invalidate_users([args.id])
+    print(f"user_id={args.id} email={email} active={'yes' if args.active else 'no'}")
+
+
+async def cmd_places_ingest(args: argparse.Namespace) -> None:
+    processed = await ingest_new_trips(batch_size=args.batch)
+    print(f"ingested_trips={processed}")
+
+
+async def cmd_places_top(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        places = await top_places(db, args.city, place_type=args.type or None, limit=args.limit)
+
+    rows = [
+        [str(p.id), p.name, p.type or "", str(p.mention_count), f"{p.lat:.5f},{p.lng:.5f}", p.geohash]
+        for p in places
+    ]
+    print(f"places={len(rows)}")
+    if rows:
+        _print_table(["id", "name", "type", "mentions", "coordinates", "geohash"], rows)
+
+
+async def cmd_trips_migrate_plans(args: argparse.Namespace) -> None:
+    migrated = await migrate_legacy_plans(batch_size=args.batch)
+    print(f"migrated_trips={migrated}")
+
+
+async def cmd_trips_plan_storage(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        stats = await storage_stats(db)
+
+    for key, value in stats.items():
+        print(f"{key}={value}")
+    if stats["referenced_plan_bytes"]:
+        saved = stats["referenced_plan_bytes"] - stats["stored_plan_bytes"]
+        print(f"plan_bytes_saved={saved} ({saved / stats['referenced_plan_bytes']:.1%})")
+
+
+async def cmd_trips_plan_gc(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        deleted = await gc_orphan_blobs(db)
+    print(f"deleted_blobs={deleted}")
+
+
+async def cmd_trips_retention(args: argparse.Namespace) -> None:
+    cutoff = history_cutoff(args.days)
+    async with AsyncSessionLocal() as db:
+        eligible = await count_eligible(db, cutoff)
+    mode = "delete" if args.delete else "archive"
+    print(f"cutoff={cutoff.isoformat(timespec='seconds')} mode={mode} eligible_trips={eligible}")
+    if args.dry_run or not eligible:
+        return
+
+    def progress(batch: int, total: int) -> None:
+        print(f"batch={batch} processed={total}/{eligible} ({total / eligible:.0%})", flush=True)
+
+    report = await run_retention(
+        days=args.days, batch_size=args.batch, mode=mode, max_batches=args.max_batches or None, on_batch=progress
+    )
+    print(f"processed_trips={report['rows']} batches={report['batches']}")
+    for name in report["dropped_partitions"]:
+        print(f"dropped_partition={name}")
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="admin_panel",
@@ -176,6 +272,48 @@ def build_parser() -> argparse.ArgumentParser:
     users_delete.add_argument("--yes", action="store_true", help="Required confirmation for --all")
     users_delete.set_defaults(func=cmd_users_delete)
 
+    users_deactivate = users_sub.add_parser("deactivate", help="Deactivate a user (authenticated endpoints return 400)")
+    users_deactivate.add_argument("--id", type=int, required=True, help="User id")
+    users_deactivate.set_defaults(func=cmd_users_set_active, active=False)
+
+    users_activate = users_sub.add_parser("activate", help="Re-activate a user")
+    users_activate.add_argument("--id", type=int, required=True, help="User id")
+    users_activate.set_defaults(func=cmd_users_set_active, active=True)
+
+    places_parser = subparsers.add_parser("places", help="Place catalog operations")
+    places_sub = places_parser.add_subparsers(dest="places_command", required=True)
+
+    places_ingest = places_sub.add_parser("ingest", help="Ingest places from trips newer than the watermark")
+    places_ingest.add_argument("--batch", type=int, default=200, help="Trips per transaction")
+    places_ingest.set_defaults(func=cmd_places_ingest)
+
+    places_top = places_sub.add_parser("top", help="Top places for a city")
+    places_top.add_argument("--city", type=str, required=True, help="City name")
+    places_top.add_argument("--type", type=str, default="", help="Filter by activity type")
+    places_top.add_argument("--limit", type=int, default=20, help="Limit number of rows")
+    places_top.set_defaults(func=cmd_places_top)
+
+    trips_parser = subparsers.add_parser("trips", help="Trip storage operations")
+    trips_sub = trips_parser.add_subparsers(dest="trips_command", required=True)
+
+    trips_migrate = trips_sub.add_parser("migrate-plans", help="Move inline trip plans into compressed blobs")
+    trips_migrate.add_argument("--batch", type=int, default=500, help="Trips per transaction")
+    trips_migrate.set_defaults(func=cmd_trips_migrate_plans)
+
+    trips_storage = trips_sub.add_parser("plan-storage", help="Space used and saved by plan blobs")
+    trips_storage.set_defaults(func=cmd_trips_plan_storage)
+
+    trips_gc = trips_sub.add_parser("plan-gc", help="Delete plan blobs no trip references")
+    trips_gc.set_defaults(func=cmd_trips_plan_gc)
+
+    trips_retention = trips_sub.add_parser("retention", help="Archive (or delete) old unsaved history in batches")
+    trips_retention.add_argument("--days", type=int, default=TRIP_HISTORY_RETENTION_DAYS, help="Keep history newer than this")
+    trips_retention.add_argument("--batch", type=int, default=TRIP_RETENTION_BATCH_SIZE, help="Trips per transaction")
+    trips_retention.add_argument("--max-batches", type=int, default=0, help="Stop after N batches (0: no limit)")
+    trips_retention.add_argument("--delete", action="store_true", help="Delete instead of archiving")
+    trips_retention.add_argument("--dry-run", action="store_true", help="Only count eligible trips")
+    trips_retention.set_defaults(func=cmd_trips_retention)
+
     stats_parser = subparsers.add_parser("stats", help="Quick database stats")
     stats_parser.set_defaults(func=cmd_stats)
 
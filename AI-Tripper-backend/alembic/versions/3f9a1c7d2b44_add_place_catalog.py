@@ -0,0 +1,62 @@
+"""add place catalog
+
+Revision ID: 3f9a1c7d2b44
+Revises: 100557c82fe1
+Create Date: 2026-10-19 10:12:41.530218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b44'
+down_revision: Union[str, Sequence[str], None] = '100557c82fe1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('places',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('country', sa.String(), nullable=True),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('normalized_name', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=True),
+    sa.Column('address', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lng', sa.Float(), nullable=False),
+    sa.Column('geohash', sa.String(length=9), nullable=False),
+    sa.Column('geocell', sa.String(length=6), nullable=False),
+    sa.Column('mention_count', sa.Integer(), nullable=False),
+    sa.Column('last_trip_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_places_id'), 'places', ['id'], unique=False)
+    op.create_index('ix_places_city_type_mentions', 'places', ['city', 'type', 'mention_count'], unique=False)
+    op.create_index('ix_places_city_normalized_name', 'places', ['city', 'normalized_name'], unique=False)
+    op.create_index('ix_places_city_geocell', 'places', ['city', 'geocell'], unique=False)
+
+    op.create_table('job_watermarks',
+    sa.Column('job', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_watermarks')
+    op.drop_index('ix_places_city_geocell', table_name='places')
+    op.drop_index('ix_places_city_normalized_name', table_name='places')
+    op.drop_index('ix_places_city_type_mentions', table_name='places')
+    op.drop_index(op.f('ix_places_id'), table_name='places')
+    op.drop_table('places')
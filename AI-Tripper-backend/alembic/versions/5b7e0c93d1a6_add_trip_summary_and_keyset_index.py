@@ -0,0 +1,64 @@
+"""add trip summary and keyset index
+
+Revision ID: 5b7e0c93d1a6
+Revises: 8c2e5d41a9f3
+Create Date: 2026-10-19 17:20:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c93d1a6'
+down_revision: Union[str, Sequence[str], None] = '8c2e5d41a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Mevcut satırların özetini trip_plan'dan doldur (models.summarize_trip_plan ile aynı şekil)
+BACKFILL_SUMMARY = """
+UPDATE trips SET summary = json_build_object(
+    'destination', trip_plan -> 'trip_summary' ->> 'destination',
+    'city_image', trip_plan ->> 'city_image',
+    'day_titles', CASE
+        WHEN json_typeof(trip_plan -> 'daily_itinerary') = 'array' THEN (
+            SELECT coalesce(json_agg(day ->> 'title'), '[]'::json)
+            FROM json_array_elements(trip_plan -> 'daily_itinerary') AS day
+            WHERE json_typeof(day) = 'object'
+        )
+        ELSE '[]'::json
+    END
+)
+WHERE id > :start AND id <= :end AND summary IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable, default'suz kolon: sadece katalog değişikliği, tablo yeniden yazılmaz
+    op.add_column('trips', sa.Column('summary', sa.JSON(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        # id aralıklarıyla, her batch ayrı commit; geçiş sırasında eski kodun eklediği
+        # satırlar da yakalansın diye max(id) her turda yeniden okunur
+        start = 0
+        while start < bind.scalar(sa.text('SELECT coalesce(max(id), 0) FROM trips')):
+            bind.execute(sa.text(BACKFILL_SUMMARY), {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+            start += BACKFILL_BATCH_SIZE
+
+        op.create_index(
+            'ix_trips_user_created_id', 'trips', ['user_id', 'created_at', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_trips_user_created_id', table_name='trips', postgresql_concurrently=True)
+    op.drop_column('trips', 'summary')
@@ -0,0 +1,34 @@
+"""restore user preference columns
+
+Revision ID: 8c2e5d41a9f3
+Revises: 3f9a1c7d2b44
+Create Date: 2026-10-19 11:02:18.774102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e5d41a9f3'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('hobbies', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('interests', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('preferred_countries', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('vacation_types', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'vacation_types')
+    op.drop_column('users', 'preferred_countries')
+    op.drop_column('users', 'interests')
+    op.drop_column('users', 'hobbies')
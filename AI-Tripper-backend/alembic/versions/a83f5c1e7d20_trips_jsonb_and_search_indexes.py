@@ -0,0 +1,129 @@
+"""trips jsonb and search indexes
+
+Revision ID: a83f5c1e7d20
+Revises: e41d7a2c9b58
+Create Date: 2026-10-19 18:21:37.904416
+
+trip_plan / interests JSON -> JSONB, tabloyu uzun süre kilitlemeden:
+1. *_jsonb gölge kolonları + INSERT/UPDATE'te onları dolduran trigger
+2. id aralıklarıyla batch backfill (her batch ayrı commit)
+3. NOT NULL için NOT VALID CHECK + VALIDATE (yazmaları bloklamaz)
+4. Kısa ACCESS EXCLUSIVE kilit altında kolon değişimi (sadece katalog işlemleri)
+5. GIN / tam metin indeksleri CONCURRENTLY
+
+Eski uygulama kodu geçiş sırasında çalışmaya devam eder (json -> jsonb atama cast'i var).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f5c1e7d20'
+down_revision: Union[str, Sequence[str], None] = 'e41d7a2c9b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+JSONB_COLUMNS = ('trip_plan', 'interests')
+
+# database/models.py'deki TRIP_SEARCH_DOCUMENT_DDL ile aynı tanım
+TRIP_SEARCH_DOCUMENT = """
+CREATE OR REPLACE FUNCTION trip_search_document(name text, city text, trip_plan jsonb, interests jsonb)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, ''))
+        || jsonb_to_tsvector('simple', jsonb_path_query_array(trip_plan, '$.daily_itinerary[*].activities[*].name'), '["string"]')
+        || jsonb_to_tsvector('simple', jsonb_path_query_array(trip_plan, '$.daily_itinerary[*].activities[*].type'), '["string"]')
+        || jsonb_to_tsvector('simple', coalesce(interests, '[]'::jsonb), '["string"]')
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in JSONB_COLUMNS:
+        op.add_column('trips', sa.Column(f'{column}_jsonb', postgresql.JSONB(), nullable=True))
+
+    # Geçiş sırasında yazılan/güncellenen satırlar gölge kolonlara da düşsün
+    op.execute(
+        """
+        CREATE FUNCTION trips_jsonb_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.trip_plan_jsonb := NEW.trip_plan::jsonb;
+            NEW.interests_jsonb := NEW.interests::jsonb;
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trips_jsonb_sync BEFORE INSERT OR UPDATE OF trip_plan, interests ON trips
+        FOR EACH ROW EXECUTE FUNCTION trips_jsonb_sync()
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.scalar(sa.text('SELECT coalesce(max(id), 0) FROM trips'))
+        # Bundan sonra eklenen satırları trigger dolduruyor
+        for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(
+                    """
+                    UPDATE trips SET trip_plan_jsonb = trip_plan::jsonb, interests_jsonb = interests::jsonb
+                    WHERE id > :start AND id <= :end AND trip_plan_jsonb IS NULL
+                    """
+                ),
+                {'start': start, 'end': start + BACKFILL_BATCH_SIZE},
+            )
+        for column in JSONB_COLUMNS:
+            op.execute(
+                f'ALTER TABLE trips ADD CONSTRAINT trips_{column}_jsonb_not_null '
+                f'CHECK ({column}_jsonb IS NOT NULL) NOT VALID'
+            )
+            op.execute(f'ALTER TABLE trips VALIDATE CONSTRAINT trips_{column}_jsonb_not_null')
+
+    # Kolon değişimi: sadece katalog işlemleri, kilit kısa sürer
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute('LOCK TABLE trips IN ACCESS EXCLUSIVE MODE')
+    op.execute('DROP TRIGGER trips_jsonb_sync ON trips')
+    op.execute('DROP FUNCTION trips_jsonb_sync()')
+    for column in JSONB_COLUMNS:
+        # Doğrulanmış CHECK sayesinde SET NOT NULL tabloyu taramaz
+        op.alter_column('trips', f'{column}_jsonb', nullable=False)
+        op.execute(f'ALTER TABLE trips DROP CONSTRAINT trips_{column}_jsonb_not_null')
+        op.drop_column('trips', column)
+        op.alter_column('trips', f'{column}_jsonb', new_column_name=column)
+    op.execute(TRIP_SEARCH_DOCUMENT)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_trips_trip_plan_gin', 'trips', ['trip_plan'], unique=False,
+            postgresql_using='gin', postgresql_ops={'trip_plan': 'jsonb_path_ops'}, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_trips_interests_gin', 'trips', ['interests'], unique=False,
+            postgresql_using='gin', postgresql_ops={'interests': 'jsonb_path_ops'}, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_trips_search', 'trips',
+            [sa.text('trip_search_document(name, city, trip_plan, interests)')], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trips_search', table_name='trips')
+    op.drop_index('ix_trips_interests_gin', table_name='trips')
+    op.drop_index('ix_trips_trip_plan_gin', table_name='trips')
+    op.execute('DROP FUNCTION IF EXISTS trip_search_document(text, text, jsonb, jsonb)')
+    for column in JSONB_COLUMNS:
+        op.alter_column(
+            'trips', column, type_=sa.JSON(), postgresql_using=f'{column}::json', existing_nullable=False
+        )
@@ -0,0 +1,160 @@
+"""trip plan blobs
+
+Revision ID: c2d94e7b1f35
+Revises: a83f5c1e7d20
+Create Date: 2026-10-19 20:04:12.518733
+
+trip_plan'lar içerik adresli, sıkıştırılmış trip_plan_blobs tablosuna taşınıyor:
+1. trip_plan_blobs + trips.plan_hash (FK, CONCURRENTLY indeks); trips.trip_plan nullable olur
+2. Kullanılmayan mode / places kolonları silinir (sadece katalog işlemi)
+3. Arama artık plandan çıkarılan küçük plan_terms kolonuna bakar: id batch'leriyle
+   backfill, ardından ix_trips_search / GIN indeksleri plan_terms üzerinde yeniden kurulur
+
+Planların blob'a taşınması (sha256 + zstd) SQL'de yapılamadığı için migration'da değil:
+deploy'dan sonra `python admin_panel.py trips migrate-plans` çalıştırılır. Taşınana kadar
+eski satırlar trips.trip_plan'dan okunmaya devam eder.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d94e7b1f35'
+down_revision: Union[str, Sequence[str], None] = 'a83f5c1e7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# database/models.py'deki TRIP_SEARCH_DOCUMENT_DDL ile aynı tanım
+TRIP_SEARCH_DOCUMENT = """
+CREATE FUNCTION trip_search_document(name text, city text, plan_terms jsonb, interests jsonb)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, ''))
+        || jsonb_to_tsvector('simple', coalesce(plan_terms, '{}'::jsonb), '["string"]')
+        || jsonb_to_tsvector('simple', coalesce(interests, '[]'::jsonb), '["string"]')
+$$
+"""
+
+# a83f5c1e7d20'deki tanım (downgrade)
+OLD_TRIP_SEARCH_DOCUMENT = """
+CREATE FUNCTION trip_search_document(name text, city text, trip_plan jsonb, interests jsonb)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, ''))
+        || jsonb_to_tsvector('simple', jsonb_path_query_array(trip_plan, '$.daily_itinerary[*].activities[*].name'), '["string"]')
+        || jsonb_to_tsvector('simple', jsonb_path_query_array(trip_plan, '$.daily_itinerary[*].activities[*].type'), '["string"]')
+        || jsonb_to_tsvector('simple', coalesce(interests, '[]'::jsonb), '["string"]')
+$$
+"""
+
+# models.plan_search_terms ile aynı sonuç (sıra hariç)
+PLAN_TERMS_BACKFILL = """
+UPDATE trips SET plan_terms = jsonb_build_object(
+    'names', (
+        SELECT coalesce(jsonb_agg(DISTINCT value), '[]'::jsonb)
+        FROM jsonb_array_elements(jsonb_path_query_array(
+            trip_plan, '$.daily_itinerary[*].activities[*].name ? (@.type() == "string")'
+        ))
+    ),
+    'types', (
+        SELECT coalesce(jsonb_agg(DISTINCT lower(btrim(value))), '[]'::jsonb)
+        FROM jsonb_array_elements_text(jsonb_path_query_array(
+            trip_plan, '$.daily_itinerary[*].activities[*].type ? (@.type() == "string")'
+        ))
+        WHERE btrim(value) <> ''
+    )
+)
+WHERE id > :start AND id <= :end AND plan_terms IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'trip_plan_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('codec', sa.String(length=8), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('raw_size', sa.Integer(), nullable=False),
+        sa.Column('stored_size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.add_column('trips', sa.Column('plan_hash', sa.String(length=64), nullable=True))
+    op.add_column('trips', sa.Column('plan_terms', postgresql.JSONB(), nullable=True))
+    # Kolon tamamen NULL: NOT VALID + VALIDATE tabloyu kilitli tutmadan doğrular
+    op.execute(
+        'ALTER TABLE trips ADD CONSTRAINT trips_plan_hash_fkey FOREIGN KEY (plan_hash) '
+        'REFERENCES trip_plan_blobs (hash) NOT VALID'
+    )
+    op.alter_column('trips', 'trip_plan', existing_type=postgresql.JSONB(), nullable=True)
+    op.drop_column('trips', 'mode')
+    op.drop_column('trips', 'places')
+
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE trips VALIDATE CONSTRAINT trips_plan_hash_fkey')
+        op.create_index('ix_trips_plan_hash', 'trips', ['plan_hash'], unique=False, postgresql_concurrently=True)
+
+        bind = op.get_bind()
+        max_id = bind.scalar(sa.text('SELECT coalesce(max(id), 0) FROM trips'))
+        # Yeni uygulama kodu plan_terms'i yazarken dolduruyor
+        for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+            bind.execute(sa.text(PLAN_TERMS_BACKFILL), {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+        op.create_index(
+            'ix_trips_plan_terms_gin', 'trips', ['plan_terms'], unique=False,
+            postgresql_using='gin', postgresql_ops={'plan_terms': 'jsonb_path_ops'}, postgresql_concurrently=True,
+        )
+        op.drop_index('ix_trips_search', table_name='trips', postgresql_concurrently=True)
+        op.drop_index('ix_trips_trip_plan_gin', table_name='trips', postgresql_concurrently=True)
+
+    # Parametre adı değiştiği için CREATE OR REPLACE yetmez; ikisi aynı transaction'da
+    op.execute('DROP FUNCTION trip_search_document(text, text, jsonb, jsonb)')
+    op.execute(TRIP_SEARCH_DOCUMENT)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_trips_search', 'trips',
+            [sa.text('trip_search_document(name, city, plan_terms, interests)')], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.scalar(sa.text('SELECT EXISTS (SELECT 1 FROM trips WHERE trip_plan IS NULL)')):
+        # Blob'lar zstd ile sıkıştırılmış olabilir; SQL ile geri açılamaz
+        raise RuntimeError(
+            'Some trips only have their plan in trip_plan_blobs; copy them back to trips.trip_plan before downgrading'
+        )
+
+    op.drop_index('ix_trips_search', table_name='trips')
+    op.drop_index('ix_trips_plan_terms_gin', table_name='trips')
+    op.execute('DROP FUNCTION trip_search_document(text, text, jsonb, jsonb)')
+    op.execute(OLD_TRIP_SEARCH_DOCUMENT)
+    op.create_index(
+        'ix_trips_trip_plan_gin', 'trips', ['trip_plan'], unique=False,
+        postgresql_using='gin', postgresql_ops={'trip_plan': 'jsonb_path_ops'},
+    )
+    op.create_index(
+        'ix_trips_search', 'trips',
+        [sa.text('trip_search_document(name, city, trip_plan, interests)')], unique=False,
+        postgresql_using='gin',
+    )
+
+    op.add_column('trips', sa.Column('places', sa.JSON(), nullable=True))
+    op.add_column('trips', sa.Column('mode', sa.String(), nullable=True))
+    op.alter_column('trips', 'trip_plan', existing_type=postgresql.JSONB(), nullable=False)
+    op.drop_index('ix_trips_plan_hash', table_name='trips')
+    op.drop_constraint('trips_plan_hash_fkey', 'trips', type_='foreignkey')
+    op.drop_column('trips', 'plan_terms')
+    op.drop_column('trips', 'plan_hash')
+    op.drop_table('trip_plan_blobs')
@@ -0,0 +1,59 @@
+"""trip history archive
+
+Revision ID: d7f30b8e4c61
+Revises: c2d94e7b1f35
+Create Date: 2026-10-19 21:37:48.201945
+
+Saklama süresini aşan kaydedilmemiş geçmiş için created_at'e göre aylık RANGE
+partition'lı trip_history_archive. Partition'ları services/trip_retention.py açar
+ve süresi dolanları atar; bu migration sadece (boş) üst tabloyu kurar.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f30b8e4c61'
+down_revision: Union[str, Sequence[str], None] = 'c2d94e7b1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'trip_history_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('city', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=True),
+        sa.Column('duration_days', sa.Integer(), nullable=False),
+        sa.Column('travelers', sa.String(), nullable=False),
+        sa.Column('interests', postgresql.JSONB(), nullable=False),
+        sa.Column('budget', sa.String(), nullable=True),
+        sa.Column('transport', sa.String(), nullable=True),
+        sa.Column('plan_hash', sa.String(length=64), nullable=True),
+        sa.Column('trip_plan', postgresql.JSONB(), nullable=True),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['plan_hash'], ['trip_plan_blobs.hash']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index(
+        'ix_trip_history_archive_user_created', 'trip_history_archive', ['user_id', 'created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Partition'lar üst tabloyla birlikte silinir
+    op.drop_index('ix_trip_history_archive_user_created', table_name='trip_history_archive')
+    op.drop_table('trip_history_archive')
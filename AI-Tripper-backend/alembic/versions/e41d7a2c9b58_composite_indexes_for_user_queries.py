@@ -0,0 +1,43 @@
+"""composite indexes for user queries
+
+Revision ID: e41d7a2c9b58
+Revises: 5b7e0c93d1a6
+Create Date: 2026-10-19 17:48:12.530961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41d7a2c9b58'
+down_revision: Union[str, Sequence[str], None] = '5b7e0c93d1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY transaction içinde çalışmaz; yazmalar indeks oluşurken bloklanmaz
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_trips_user_saved_created_id', 'trips', ['user_id', 'is_saved', 'created_at', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_favorite_places_user_created_id', 'favorite_places', ['user_id', 'created_at', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        # Tek başına is_saved indeksi (iki değerli kolon) artık hiçbir sorguda kullanılmıyor;
+        # eski kurulumlarda create_all ile oluşmuş olabilir
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_trips_is_saved')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trips_is_saved ON trips (is_saved)')
+        op.drop_index('ix_favorite_places_user_created_id', table_name='favorite_places', postgresql_concurrently=True)
+        op.drop_index('ix_trips_user_saved_created_id', table_name='trips', postgresql_concurrently=True)
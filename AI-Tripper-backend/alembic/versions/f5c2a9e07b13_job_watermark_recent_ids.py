@@ -0,0 +1,28 @@
+"""job watermark recent ids
+
+Revision ID: f5c2a9e07b13
+Revises: d7f30b8e4c61
+Create Date: 2026-10-19 23:12:05.418327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c2a9e07b13'
+down_revision: Union[str, Sequence[str], None] = 'd7f30b8e4c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_watermarks', sa.Column('recent_ids', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job_watermarks', 'recent_ids')
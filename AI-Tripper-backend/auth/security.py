@@ -9,8 +9,10 @@ from sqlalchemy import select
 import os
 from dotenv import load_dotenv
 
-from database.database import get_db
+from database.database import AsyncSessionLocal, get_db, get_read_db
 from database import models, schemas
+from services import metrics, user_cache
+from services.password_hashing import PasswordHasher
 
 load_dotenv()
 
@@ -18,17 +20,21 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 1440))
+# Değiştirilirse eski hash'ler bir sonraki başarılı login'de yeni cost ile yeniden üretilir
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+# bcrypt event loop'u bloklamasın: sınırlı thread havuzunda çalışır
+password_hasher = PasswordHasher(pwd_context)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -61,42 +67,94 @@ async def authenticate_user(db: AsyncSession, username: str, password: str):
     user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        # Hash eski cost/şema ile üretilmiş: parola elimizdeyken sessizce yükselt
+        user.hashed_password = new_hash
+        await db.commit()
+        await user_cache.invalidate_user(user.id)
+        metrics.inc("auth.password_rehashed")
     return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+async def _user_from_token(token: str, db: AsyncSession):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        sub: str = payload.get("sub")
-        if sub is None:
-            print("❌ Token'da sub bulunamadı")
+    # Daha önce doğrulanmış token: JWT tekrar çözülmez
+    user_id = user_cache.cached_token_user(token)
+    sub = None
+    expires_at = None
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            sub: str = payload.get("sub")
+            if sub is None:
+                print("❌ Token'da sub bulunamadı")
+                raise credentials_exception
+        except JWTError as e:
+            print(f"❌ JWT decode hatası: {e}")
             raise credentials_exception
-    except JWTError as e:
-        print(f"❌ JWT decode hatası: {e}")
-        raise credentials_exception
+        expires_at = payload.get("exp")
+        # New tokens: sub is user.id (stable, unaffected by username changes)
+        if sub.isdigit():
+            user_id = int(sub)
+
+    version = None
+    if user_id is not None:
+        snapshot, version = await user_cache.get_user_snapshot(user_id)
+        if snapshot is not None:
+            if sub is not None:
+                user_cache.remember_token(token, user_id, expires_at)
+            return await user_cache.attach_user(db, snapshot)
 
     user = None
-    # New tokens: sub is user.id (stable, unaffected by username changes)
-    if sub.isdigit():
-        user = await get_user_by_id(db, user_id=int(sub))
+    if user_id is not None:
+        user = await get_user_by_id(db, user_id=user_id)
 
     # Backward compatibility for old tokens where sub=username
-    if user is None:
+    if user is None and sub is not None:
         user = await get_user_by_username(db, username=sub)
 
     if user is None:
         raise credentials_exception
+    # Eski (sub=username) token'da sürüm okunmadı: bu istekte önbelleğe yazılmaz
+    await user_cache.cache_user(user, version)
+    if sub is not None:
+        user_cache.remember_token(token, user.id, expires_at)
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    user = await _user_from_token(token, db)
+    # get_db bu istekte yazma olursa kullanıcının okumalarını bir süre primary'ye sabitler
+    db.info["user_id"] = user.id
     return user
 
 
+async def get_current_user_readonly(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    """GET endpoint'leri için: kullanıcı okuma session'ından (replika olabilir) yüklenir, değiştirilmemeli."""
+    try:
+        return await _user_from_token(token, db)
+    except HTTPException:
+        if db.info.get("read_route") != "replica":
+            raise
+    # Yeni kayıt olmuş kullanıcı replikaya henüz ulaşmamış olabilir
+    async with AsyncSessionLocal() as primary:
+        return await _user_from_token(token, primary)
+
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+async def get_current_active_user_readonly(current_user: models.User = Depends(get_current_user_readonly)):
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
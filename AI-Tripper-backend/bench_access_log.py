@@ -0,0 +1,132 @@
+"""
+İstek loglamanın istek başına maliyetini karşılaştırır.
+
+Aynı küçük FastAPI uygulaması (bir GET, büyük JSON gövdeli bir POST) httpx ASGITransport ile
+ağ olmadan çağrılır:
+
+- none:   middleware yok (taban çizgisi)
+- before: eski `@app.middleware("http")` log_requests (BaseHTTPMiddleware, POST gövdesini okuyup loglar)
+- after:  middleware.access_log.AccessLogMiddleware (--sample-rate, ayrıca --sample-rate 1 ile)
+
+Loglar /dev/null'a main.py'deki formatla yazılır (biçimlendirme maliyeti dahil).
+
+    python bench_access_log.py --requests 2000 --body-kb 64
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from middleware.access_log import ACCESS_LOG_SAMPLE_RATE, AccessLogMiddleware
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    for name in ("aitripper", "aitripper.access"):
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def build_app(variant: str, sample_rate: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    @app.post("/api/items")
+    async def create_item(request: Request):
+        # Gerçek endpoint'ler gibi gövdeyi kendisi okur
+        payload = await request.json()
+        return {"days": len(payload["daily_itinerary"])}
+
+    if variant == "before":
+        logger = logging.getLogger("aitripper")
+
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            if request.method == "POST":
+                body = await request.body()
+                logger.info(f"RECEIVED BODY: {body.decode()}")
+            return await call_next(request)
+
+    elif variant == "after":
+        app.add_middleware(AccessLogMiddleware, sample_rate=sample_rate)
+    return app
+
+
+def _body(size_kb: int) -> dict:
+    activity = {"time": "09:00", "place": "Hagia Sophia", "description": "x" * 200, "password": "secret"}
+    count = max(1, size_kb * 1024 // 300)
+    return {"daily_itinerary": [{"day": i // 5 + 1, "activities": [activity]} for i in range(count)]}
+
+
+async def _measure(client: httpx.AsyncClient, timings: dict, count: int, body: dict) -> None:
+    for i in range(count):
+        started_at = time.perf_counter()
+        await client.get(f"/api/items/{i}")
+        timings["GET"].append((time.perf_counter() - started_at) * 1e6)
+        started_at = time.perf_counter()
+        await client.post("/api/items", json=body)
+        timings["POST"].append((time.perf_counter() - started_at) * 1e6)
+
+
+async def run_variants(variants: list[tuple[str, FastAPI]], requests: int, body: dict, rounds: int = 20) -> dict:
+    """Varyantlar turlar halinde sırayla çalışır; ısınma/GC kayması hepsine eşit dağılır."""
+    clients = {
+        name: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        for name, app in variants
+    }
+    timings = {name: {"GET": [], "POST": []} for name in clients}
+    try:
+        for name, client in clients.items():
+            await _measure(client, {"GET": [], "POST": []}, 50, body)  # ısınma
+        for _ in range(rounds):
+            for name, client in clients.items():
+                await _measure(client, timings[name], max(1, requests // rounds), body)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return timings
+
+
+def _summary(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(0.99 * len(timings)))]
+    return f"mean={statistics.fmean(timings):7.0f}us p50={statistics.median(timings):7.0f}us p99={p99:7.0f}us"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request overhead of request logging middleware")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per method and variant")
+    parser.add_argument("--body-kb", type=int, default=64, help="POST body size")
+    parser.add_argument("--sample-rate", type=float, default=ACCESS_LOG_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    _configure_logging()
+    body = _body(args.body_kb)
+    variants = [
+        ("none", build_app("none", 0)),
+        ("before", build_app("before", 0)),
+        (f"after@{args.sample_rate:g}", build_app("after", args.sample_rate)),
+        ("after@1", build_app("after", 1.0)),
+    ]
+    baseline = None
+    for name, timings in (await run_variants(variants, args.requests, body)).items():
+        means = {method: statistics.fmean(values) for method, values in timings.items()}
+        baseline = baseline or means
+        for method, values in timings.items():
+            overhead = means[method] - baseline[method]
+            print(f"{name:11} {method:4} {_summary(values)} overhead={overhead:+6.0f}us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Katalog destekli mod ile serbest üretimi karşılaştırır (gecikme + Gemini token sayıları).
+
+Gerçek API yerine yerel stand-in ile:
+    uvicorn gemini_stub:app --port 8090
+    GEMINI_API_BASE=http://localhost:8090/v1beta GOOGLE_API_KEY=local \
+        python bench_catalog_assembly.py --city Istanbul --days 3 --runs 10 --synthetic
+
+--synthetic verilmezse adaylar places tablosundan okunur (önce: admin_panel.py places ingest).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from services import metrics
+from services.llm_service import _catalog_candidates, _itinerary_payload, _plan_itinerary, _trip_preferences
+
+
+def _token_totals() -> dict[str, float]:
+    totals = {"input_uncached": 0.0, "input_cached": 0.0, "output": 0.0}
+    for key, value in metrics.snapshot()["counters"].items():
+        if key.startswith("gemini.tokens{"):
+            for kind in totals:
+                if f"kind={kind}" in key:
+                    totals[kind] += value
+    return totals
+
+
+def _synthetic_candidates(city: str, count: int = 40) -> list[dict]:
+    kinds = ["museum", "restaurant", "park", "landmark", "market", "cafe"]
+    return [
+        {
+            "id": i,
+            "name": f"{city} place {i}",
+            "type": kinds[i % len(kinds)],
+            "address": f"{city} street {i}",
+            "description": "A well known spot with a short description from the catalog.",
+            "lat": 41.0 + i / 1000,
+            "lng": 28.9 + i / 1000,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+async def run_mode(name: str, trip_data: dict, candidates: list[dict], runs: int) -> dict:
+    days = trip_data["days"]
+    prompt = f"""
+Create a {days}-day travel itinerary for {trip_data['city']} in {trip_data['language']}.
+{_trip_preferences(trip_data)}
+- trip_summary.duration_days must be {days} and daily_itinerary must have {days} days.
+"""
+    before = _token_totals()
+    latencies = []
+    for _ in range(runs):
+        started_at = time.monotonic()
+        await _plan_itinerary(trip_data, _itinerary_payload(prompt), "pro", candidates)
+        latencies.append(time.monotonic() - started_at)
+    after = _token_totals()
+
+    latencies.sort()
+    return {
+        "mode": name,
+        "p50_s": round(statistics.median(latencies), 3),
+        "p90_s": round(latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))], 3),
+        **{f"{kind}_tokens/run": round((after[kind] - before[kind]) / runs) for kind in after},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Catalog-assisted vs free-form itinerary benchmark")
+    parser.add_argument("--city", default="Istanbul")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--synthetic", action="store_true", help="Use generated candidates instead of the places table")
+    args = parser.parse_args()
+
+    trip_data = {
+        "city": args.city,
+        "days": args.days,
+        "travelers": "cift",
+        "interests": ["kultur", "yemek"],
+        "transport": "farketmez",
+        "budget": "orta",
+        "start_date": "",
+        "language": args.language,
+    }
+    candidates = _synthetic_candidates(args.city) if args.synthetic else await _catalog_candidates(args.city)
+    print(f"candidates={len(candidates)}")
+
+    results = [
+        await run_mode("freeform", trip_data, [], args.runs),
+        await run_mode("catalog", trip_data, candidates, args.runs),
+    ]
+    headers = list(results[0])
+    print(" | ".join(headers))
+    for row in results:
+        print(" | ".join(str(row[h]) for h in headers))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""
+Context caching'in gerçek Gemini API'sindeki etkisini ölçer (stub değil).
+
+1. Her statik önek için countTokens ile gerçek token sayısı alınır ve modelin minimum
+   önbellek boyutuyla (services.gemini_client.min_cache_tokens) karşılaştırılır.
+2. Aynı kısa istek --runs kez streamGenerateContent ile gönderilir: önek inline
+   (systemInstruction) ve, önek yeterince büyükse, cachedContents referansıyla.
+   Raporlanan: ilk token süresi (TTFT), toplam süre ve usageMetadata'daki
+   promptTokenCount / cachedContentTokenCount (örtük önbellek isabetleri de burada görünür).
+3. Oluşturulan cachedContents girdisi sonunda silinir.
+
+    GOOGLE_API_KEY=... python bench_context_cache.py --model gemini-2.5-flash --runs 5
+    GOOGLE_API_KEY=... python bench_context_cache.py --prefix catalog --pad-tokens 1200
+
+--pad-tokens, minimumun altındaki bir öneki yapay olarak büyütüp önbellekli yolu yine de ölçmek içindir.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+from services.gemini_client import CONTEXT_CACHE_TTL, GEMINI_API_BASE, GEMINI_MODEL, min_cache_tokens
+from services.llm_service import (
+    CATALOG_PROMPT_PREFIX,
+    ITINERARY_PROMPT_PREFIX,
+    PERSONALIZED_PROMPT_PREFIX,
+    REFINE_PROMPT_PREFIX,
+)
+
+PREFIXES = {
+    "itinerary": ITINERARY_PROMPT_PREFIX,
+    "catalog": CATALOG_PROMPT_PREFIX,
+    "refine": REFINE_PROMPT_PREFIX,
+    "personalized": PERSONALIZED_PROMPT_PREFIX,
+}
+PROMPT = "Plan a 1-day trip to Istanbul in English for a couple interested in food. Keep it to 3 stops."
+
+
+async def count_tokens(client: httpx.AsyncClient, key: str, model: str, text: str) -> int:
+    response = await client.post(
+        f"{GEMINI_API_BASE}/models/{model}:countTokens?key={key}",
+        json={"contents": [{"role": "user", "parts": [{"text": text}]}]},
+    )
+    response.raise_for_status()
+    return response.json()["totalTokens"]
+
+
+async def stream_once(client: httpx.AsyncClient, key: str, model: str, body: dict) -> dict:
+    """Tek bir streamGenerateContent çağrısı: TTFT, toplam süre ve son usageMetadata."""
+    started_at = time.perf_counter()
+    ttft = None
+    usage = {}
+    url = f"{GEMINI_API_BASE}/models/{model}:streamGenerateContent?alt=sse&key={key}"
+    async with client.stream("POST", url, json=body) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(f"{response.status_code}: {response.text[:300]}")
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = json.loads(line[5:])
+            if ttft is None and chunk.get("candidates"):
+                ttft = time.perf_counter() - started_at
+            usage = chunk.get("usageMetadata") or usage
+    return {
+        "ttft": ttft or 0.0,
+        "total": time.perf_counter() - started_at,
+        "prompt_tokens": usage.get("promptTokenCount", 0),
+        "cached_tokens": usage.get("cachedContentTokenCount", 0),
+    }
+
+
+def _report(label: str, results: list[dict]) -> None:
+    def p50(field: str) -> float:
+        return statistics.median(r[field] for r in results)
+
+    print(
+        f"  {label:7} ttft_p50={p50('ttft') * 1000:7.0f}ms total_p50={p50('total') * 1000:7.0f}ms "
+        f"prompt_tokens={p50('prompt_tokens'):6.0f} cached_tokens={p50('cached_tokens'):6.0f}"
+    )
+
+
+async def bench_prefix(client: httpx.AsyncClient, key: str, args: argparse.Namespace, name: str, prefix: str) -> None:
+    if args.pad_tokens:
+        prefix += "\nReference notes (ignore):\n" + "lorem ipsum " * args.pad_tokens
+    tokens = await count_tokens(client, key, args.model, prefix)
+    minimum = min_cache_tokens(args.model)
+    eligible = tokens >= minimum
+    print(f"{name}: {tokens} tokens (min {minimum} for {args.model}) -> {'cacheable' if eligible else 'inline only'}")
+
+    contents = [{"role": "user", "parts": [{"text": PROMPT}]}]
+    inline_body = {"contents": contents, "systemInstruction": {"parts": [{"text": prefix}]}}
+    results = [await stream_once(client, key, args.model, inline_body) for _ in range(args.runs)]
+    _report("inline", results)
+    if not eligible:
+        return
+
+    response = await client.post(
+        f"{GEMINI_API_BASE}/cachedContents?key={key}",
+        json={
+            "model": f"models/{args.model}",
+            "systemInstruction": {"parts": [{"text": prefix}]},
+            "ttl": f"{min(CONTEXT_CACHE_TTL, 600)}s",
+            "displayName": f"bench-{name}",
+        },
+    )
+    if response.status_code != 200:
+        print(f"  cache create failed ({response.status_code}): {response.text[:300]}")
+        return
+    cache_name = response.json()["name"]
+    try:
+        cached_body = {"contents": contents, "cachedContent": cache_name}
+        results = [await stream_once(client, key, args.model, cached_body) for _ in range(args.runs)]
+        _report("cached", results)
+    finally:
+        await client.delete(f"{GEMINI_API_BASE}/{cache_name}?key={key}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Input tokens and time-to-first-token with and without context caching")
+    parser.add_argument("--model", default=GEMINI_MODEL)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prefix", choices=[*PREFIXES, "all"], default="all")
+    parser.add_argument("--pad-tokens", type=int, default=0, help="Pad the prefix with roughly this many tokens")
+    args = parser.parse_args()
+
+    key = os.getenv("GOOGLE_API_KEY", "").strip()
+    if not key:
+        raise SystemExit("GOOGLE_API_KEY is required")
+
+    names = list(PREFIXES) if args.prefix == "all" else [args.prefix]
+    async with httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=30.0)) as client:
+        for name in names:
+            await bench_prefix(client, key, args, name, PREFIXES[name])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
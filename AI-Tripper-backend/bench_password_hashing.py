@@ -0,0 +1,128 @@
+"""
+Login sırasında diğer endpoint'lerin gecikmesini ölçer: bcrypt handler içinde (inline) ve
+services.password_hashing havuzunda (pool).
+
+Aynı uygulamaya (httpx ASGITransport, ağ yok) --concurrency paralel istemci toplam --logins
+login gönderirken ayrı bir istemci her --ping-interval'de hafif bir GET atar. Raporlanan:
+login/sn, login p50/p95 ve GET p50/p95/max; GET gecikmesi planlanan gönderim anından ölçülür
+(event loop ne kadar bloklandı).
+
+    python bench_password_hashing.py --logins 40 --concurrency 8
+    BCRYPT_ROUNDS=10 python bench_password_hashing.py --workers 2 --max-queue 4
+
+Veritabanı gerekmez; parola doğrulama auth.security'deki CryptContext ile yapılır.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from auth.security import pwd_context
+from services.password_hashing import PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+
+
+def _percentiles(timings: list[float]) -> str:
+    if not timings:
+        return "n/a"
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    return f"p50={statistics.median(timings):.1f}ms p95={p95:.1f}ms max={timings[-1]:.1f}ms"
+
+
+def build_app(mode: str, hashed: str, hasher: PasswordHasher) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            verified = pwd_context.verify(PASSWORD, hashed)
+        else:
+            verified = await hasher.verify(PASSWORD, hashed)
+        if not verified:
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_mode(mode: str, hashed: str, args: argparse.Namespace) -> None:
+    hasher = PasswordHasher(pwd_context, workers=args.workers, max_queue=args.max_queue)
+    app = build_app(mode, hashed, hasher)
+    login_timings: list[float] = []
+    ping_timings: list[float] = []
+    statuses: dict[int, int] = {}
+    remaining = args.logins
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started_at = time.perf_counter()
+                response = await client.post("/login")
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    login_timings.append((time.perf_counter() - started_at) * 1000)
+
+        async def pinger():
+            # Gecikme planlanan gönderim anından ölçülür: loop bloklanıp GET hiç
+            # gönderilemediyse o bekleme de sayılır (coordinated omission)
+            scheduled_at = time.perf_counter()
+            while True:
+                await client.get("/ping")
+                finished_at = time.perf_counter()
+                ping_timings.append((finished_at - scheduled_at) * 1000)
+                if done.is_set():
+                    break
+                scheduled_at += args.ping_interval
+                await asyncio.sleep(max(0.0, scheduled_at - finished_at))
+
+        ping_task = asyncio.create_task(pinger())
+        started_at = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started_at
+        done.set()
+        await ping_task
+
+    print(
+        f"{mode:6} logins={len(login_timings)}/{args.logins} statuses={statuses} "
+        f"throughput={len(login_timings) / elapsed:.1f}/s"
+    )
+    print(f"       login {_percentiles(login_timings)}")
+    print(f"       GET   {_percentiles(ping_timings)} (n={len(ping_timings)})")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Event-loop latency while bcrypt logins run")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel login clients")
+    parser.add_argument("--ping-interval", type=float, default=0.01, help="Seconds between background GETs")
+    parser.add_argument("--workers", type=int, default=None, help="Hash pool size (default: PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--max-queue", type=int, default=None, help="Hash queue limit (default: PASSWORD_HASH_MAX_QUEUE)")
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    args = parser.parse_args()
+
+    from services import password_hashing
+
+    args.workers = args.workers or password_hashing.PASSWORD_HASH_WORKERS
+    args.max_queue = args.max_queue if args.max_queue is not None else password_hashing.PASSWORD_HASH_MAX_QUEUE
+
+    hashed = pwd_context.hash(PASSWORD)
+    print(f"bcrypt cost={hashed.split('$')[2]} workers={args.workers} max_queue={args.max_queue}")
+    for mode in (["inline", "pool"] if args.mode == "both" else [args.mode]):
+        await run_mode(mode, hashed, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+"""
+trip_plan blob depolamasının alan kazancını ve okuma maliyetini ölçer.
+
+Planlar gemini_stub'daki itinerary üreticisiyle oluşturulur; --dup-rate kadarı daha önce
+üretilmiş bir planın kopyasıdır (önbellekten dönen plan, aynı planın geçmiş + kayıtlı hali).
+
+1. Codec karşılaştırması (veritabanı gerekmez): JSON / zlib / zstd boyutları ve açma süresi
+2. --db verilirse ayrı bir şemada (varsayılan: plan_bench) aynı trip'ler önce satır içi
+   (eski düzen) yazılır, sonra services.plan_store ile blob'a taşınır; her iki düzende
+   pg_total_relation_size ve detay okuma (sorgu + plan açma) gecikmesi raporlanır.
+
+    python bench_plan_storage.py --trips 5000 --dup-rate 0.4
+    DATABASE_URL=postgresql://... python bench_plan_storage.py --db
+
+Uygulama tablolarına dokunmaz; şema sonunda silinir (--keep ile bırakılır).
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import zlib
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from database import models
+from database.database import DATABASE_URL, Base
+from database.plan_codec import PLAN_ZLIB_LEVEL, PLAN_ZSTD_LEVEL, canonical_json, zstandard
+from gemini_stub import _fake_itinerary
+from services.plan_store import migrate_batch
+
+CITIES = ["Istanbul", "Roma", "Paris", "Tokyo", "Barcelona", "Prague", "Lisbon", "Vienna"]
+
+
+def _plans(count: int, dup_rate: float) -> list[dict]:
+    plans: list[dict] = []
+    for _ in range(count):
+        if plans and random.random() < dup_rate:
+            plans.append(random.choice(plans))
+        else:
+            prompt = f"Create a {random.randint(2, 7)}-day travel itinerary for {random.choice(CITIES)} in Europe"
+            plans.append(_fake_itinerary(prompt))
+    return plans
+
+
+def _percentiles(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    return f"p50={statistics.median(timings):.3f}ms p95={p95:.3f}ms"
+
+
+def _timed(fn, items) -> list[float]:
+    timings = []
+    for item in items:
+        started_at = time.perf_counter()
+        fn(item)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return timings
+
+
+def codec_report(plans: list[dict]) -> None:
+    unique = {canonical_json(plan) for plan in plans}
+    inline_bytes = sum(len(json.dumps(plan, ensure_ascii=False).encode("utf-8")) for plan in plans)
+    print(f"plans={len(plans)} unique={len(unique)} inline_json_bytes={inline_bytes}")
+
+    codecs = {"json": (lambda raw: raw, json.loads)}
+    codecs["zlib"] = (
+        lambda raw: zlib.compress(raw, PLAN_ZLIB_LEVEL),
+        lambda data: json.loads(zlib.decompress(data)),
+    )
+    if zstandard is not None:
+        codecs["zstd"] = (
+            lambda raw: zstandard.ZstdCompressor(level=PLAN_ZSTD_LEVEL).compress(raw),
+            lambda data: json.loads(zstandard.ZstdDecompressor().decompress(data)),
+        )
+    else:
+        print("zstandard not installed: skipping zstd")
+
+    for name, (encode, decode) in codecs.items():
+        encoded = [encode(raw) for raw in unique]
+        stored = sum(len(data) for data in encoded)
+        print(
+            f"{name:5} unique_stored_bytes={stored} "
+            f"saved_vs_inline={1 - stored / inline_bytes:.1%} "
+            f"decode {_percentiles(_timed(decode, encoded))}"
+        )
+
+
+async def _sizes(conn) -> tuple[int, int]:
+    row = (await conn.execute(text(
+        "SELECT pg_total_relation_size('trips'), pg_total_relation_size('trip_plan_blobs')"
+    ))).one()
+    return row[0], row[1]
+
+
+async def _detail_reads(session_factory, trip_ids: list[int], runs: int) -> list[float]:
+    """routes/*.py detay endpoint'i: satırı (blob'la) yükle ve trip_plan'ı oku."""
+    timings = []
+    async with session_factory() as db:
+        for trip_id in random.choices(trip_ids, k=runs):
+            started_at = time.perf_counter()
+            result = await db.execute(
+                select(models.Trip).options(joinedload(models.Trip.plan_blob)).where(models.Trip.id == trip_id)
+            )
+            result.scalar_one().trip_plan
+            timings.append((time.perf_counter() - started_at) * 1000)
+            db.expunge_all()
+    return timings
+
+
+async def db_report(plans: list[dict], schema: str, runs: int, keep: bool) -> None:
+    admin_engine = create_async_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    async with admin_engine.connect() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    engine = create_async_engine(DATABASE_URL, connect_args={"server_settings": {"search_path": schema}})
+    autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            user_id = (await conn.execute(
+                insert(models.User).values(email="bench@example.com", username="bench", hashed_password="x")
+                .returning(models.User.id)
+            )).scalar_one()
+            # Eski düzen: her satırda planın tam kopyası (Core insert: anahtarlar kolon adları)
+            for start in range(0, len(plans), 1000):
+                await conn.execute(insert(models.Trip.__table__), [
+                    {
+                        "user_id": user_id, "is_saved": False, "city": plan["trip_summary"]["destination"],
+                        "duration_days": len(plan["daily_itinerary"]), "travelers": "cift", "interests": ["kultur"],
+                        "trip_plan": plan,
+                        "summary": models.summarize_trip_plan(plan),
+                        "plan_terms": models.plan_search_terms(plan),
+                    }
+                    for plan in plans[start:start + 1000]
+                ])
+        async with autocommit.connect() as conn:
+            await conn.execute(text("VACUUM FULL ANALYZE trips"))
+            inline_trips, _ = await _sizes(conn)
+            trip_ids = list((await conn.execute(select(models.Trip.id))).scalars())
+        inline_reads = await _detail_reads(session_factory, trip_ids, runs)
+
+        while await migrate_batch(session_factory=session_factory, batch_size=500):
+            pass
+        async with autocommit.connect() as conn:
+            # UPDATE eski satır sürümlerini bırakır; alanı geri almak için VACUUM FULL (veya pg_repack)
+            await conn.execute(text("VACUUM FULL ANALYZE trips"))
+            await conn.execute(text("VACUUM FULL ANALYZE trip_plan_blobs"))
+            blob_trips, blobs = await _sizes(conn)
+        blob_reads = await _detail_reads(session_factory, trip_ids, runs)
+
+        after = blob_trips + blobs
+        print(f"inline: trips={inline_trips} bytes")
+        print(f"blobs:  trips={blob_trips} + trip_plan_blobs={blobs} = {after} bytes ({1 - after / inline_trips:.1%} smaller)")
+        print(f"detail read inline {_percentiles(inline_reads)}")
+        print(f"detail read blob   {_percentiles(blob_reads)}")
+    finally:
+        await engine.dispose()
+        if not keep:
+            async with admin_engine.connect() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await admin_engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Space / read overhead of content-addressed trip plan blobs")
+    parser.add_argument("--trips", type=int, default=5000)
+    parser.add_argument("--dup-rate", type=float, default=0.4, help="Share of trips that repeat an earlier plan")
+    parser.add_argument("--runs", type=int, default=500, help="Detail reads per layout (--db)")
+    parser.add_argument("--db", action="store_true", help="Also measure table sizes and reads in PostgreSQL")
+    parser.add_argument("--schema", default="plan_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench schema afterwards")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if not args.schema.isidentifier():
+        raise SystemExit("--schema must be a plain identifier")
+
+    random.seed(args.seed)
+    plans = _plans(args.trips, args.dup_rate)
+    codec_report(plans)
+    if args.db:
+        await db_report(plans, args.schema, args.runs, args.keep)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
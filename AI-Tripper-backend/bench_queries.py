@@ -0,0 +1,258 @@
+"""
+Route sorgularının plan / gecikme regresyon testi.
+
+Ayrı bir şemada (varsayılan: query_bench) modellerden tabloları kurar, büyük sentetik veri
+üretir (bir de çok geçmişi olan "ağır" kullanıcı), sonra her route sorgusu için:
+- EXPLAIN (ANALYZE, FORMAT JSON) planında beklenen indeksin kullanıldığını ve büyük
+  tablolarda Seq Scan olmadığını,
+- tekrarlı çalıştırmada p95 gecikmenin bütçenin altında olduğunu doğrular.
+Herhangi bir kontrol başarısızsa çıkış kodu 1'dir.
+
+    DATABASE_URL=postgresql://... python bench_queries.py --users 2000 --trips-per-user 50
+
+Uygulama tablolarına dokunmaz; şema sonunda silinir (--keep ile bırakılır).
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from database import models
+from database.database import DATABASE_URL, Base
+from services.trip_listing import encode_cursor, trip_page_query, trip_search_query
+
+BIG_TABLES = {"trips", "favorite_places"}
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _seed(conn, users: int, trips_per_user: int, heavy_trips: int, favorites_per_user: int) -> None:
+    await conn.execute(text(
+        """
+        INSERT INTO users (email, username, hashed_password, is_active, remaining_routes, created_at)
+        SELECT 'bench' || g || '@example.com', 'bench' || g, 'x', true, 3, now()
+        FROM generate_series(1, :users) AS g
+        """
+    ), {"users": users})
+    # trip_plan (blob'a taşınmamış eski düzen) gerçekçi boyutta (TOAST'a taşan) olsun ki özet projeksiyonunun etkisi görülsün.
+    # Tüm kullanıcıların trip'leri aynı bir yıla yayılır (ağır kullanıcı ayrı bir zaman aralığında
+    # kalırsa planner haklı olarak created_at indeksini seçer ve test gerçekçi olmaz).
+    trip_rows = """
+        INSERT INTO trips (user_id, is_saved, name, city, country, duration_days, travelers, interests,
+                           budget, transport, trip_plan, summary, plan_terms, created_at, updated_at)
+        SELECT u, (g % 5 = 0), 'trip ' || g, 'city' || (g % 300), 'country', 3, 'cift', '["kultur"]',
+               'orta', 'farketmez',
+               json_build_object('trip_summary', json_build_object('destination', 'city' || (g % 300)),
+                                 'notes', repeat('lorem ipsum ', 400)),
+               json_build_object('destination', 'city' || (g % 300), 'day_titles', json_build_array('Day 1')),
+               jsonb_build_object('names', jsonb_build_array('place ' || g),
+                                  'types', jsonb_build_array((ARRAY['museum', 'park', 'restaurant'])[g % 3 + 1])),
+               now() - random() * interval '365 days', now()
+    """
+    await conn.execute(text(trip_rows + """
+        FROM generate_series(1, :users) AS u, generate_series(1, :per_user) AS g
+    """), {"users": users, "per_user": trips_per_user})
+    await conn.execute(text(trip_rows.replace("SELECT u,", "SELECT 1,") + """
+        FROM generate_series(1, :heavy) AS g
+    """), {"heavy": heavy_trips})
+    await conn.execute(text(
+        """
+        INSERT INTO favorite_places (user_id, name, lat, lng, city, created_at)
+        SELECT u, 'place ' || g, 41.0, 29.0, 'city' || (g % 300), now() - random() * interval '365 days'
+        FROM generate_series(1, :users) AS u, generate_series(1, :per_user) AS g
+        """
+    ), {"users": users, "per_user": favorites_per_user})
+    await conn.execute(text(
+        """
+        INSERT INTO subscriptions (user_id, plan, status, created_at, updated_at)
+        SELECT g, 'free', 'active', now(), now() FROM generate_series(1, :users) AS g
+        """
+    ), {"users": users})
+    for table in ("users", "trips", "favorite_places", "subscriptions"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def _deep_cursor(conn, user_id: int, saved_only: bool, offset: int) -> str:
+    query = select(models.Trip.id, models.Trip.created_at).where(models.Trip.user_id == user_id)
+    if saved_only:
+        query = query.where(models.Trip.is_saved == True)
+    row = (await conn.execute(
+        query.order_by(models.Trip.created_at.desc(), models.Trip.id.desc()).offset(offset).limit(1)
+    )).one()
+    return encode_cursor(row)
+
+
+def _route_queries(heavy_cursor: str, heavy_saved_cursor: str, trip_id: int) -> list[tuple[str, object, set[str]]]:
+    """(isim, sorgu, kabul edilen indeksler) — routes/*.py'deki sorgularla aynı şekil."""
+    return [
+        ("history first page", trip_page_query(42), {"ix_trips_user_created_id"}),
+        ("history deep page (heavy user)", trip_page_query(1, cursor=heavy_cursor), {"ix_trips_user_created_id"}),
+        ("saved first page", trip_page_query(42, saved_only=True), {"ix_trips_user_saved_created_id"}),
+        (
+            "saved deep page (heavy user)",
+            trip_page_query(1, saved_only=True, cursor=heavy_saved_cursor),
+            {"ix_trips_user_saved_created_id"},
+        ),
+        (
+            "saved search by place name",
+            trip_search_query(42, q="city1"),
+            {"ix_trips_search", "ix_trips_user_saved_created_id"},
+        ),
+        (
+            "saved search by activity type",
+            trip_search_query(42, place_type="museum"),
+            {"ix_trips_plan_terms_gin", "ix_trips_user_saved_created_id"},
+        ),
+        (
+            "saved search by interest (heavy user)",
+            trip_search_query(1, interest="kultur"),
+            {"ix_trips_interests_gin", "ix_trips_user_saved_created_id"},
+        ),
+        (
+            "trip detail",
+            select(models.Trip)
+            .options(joinedload(models.Trip.plan_blob))
+            .where(models.Trip.id == trip_id, models.Trip.user_id == 1),
+            # id kolonunda hem PK hem de index=True'dan gelen ix_*_id var; ikisi de uygun
+            {"trips_pkey", "ix_trips_id"},
+        ),
+        (
+            "favorites list",
+            select(models.FavoritePlace)
+            .where(models.FavoritePlace.user_id == 42)
+            .order_by(models.FavoritePlace.created_at.desc(), models.FavoritePlace.id.desc())
+            .limit(100),
+            {"ix_favorite_places_user_created_id"},
+        ),
+        (
+            "favorite delete lookup",
+            select(models.FavoritePlace).where(models.FavoritePlace.id == 4242, models.FavoritePlace.user_id == 42),
+            {"favorite_places_pkey", "ix_favorite_places_id"},
+        ),
+        (
+            "subscription by user",
+            select(models.Subscription.plan, models.Subscription.status).where(models.Subscription.user_id == 42),
+            {"subscriptions_user_id_key"},
+        ),
+    ]
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN sarmalayıcı; parametreler normal bind processor'lardan geçer (JSONB, regconfig...)."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def _explain(conn, query) -> dict:
+    result = await conn.execute(_Explain(query))
+    return result.scalar()[0]
+
+
+async def _timed(conn, query, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        (await conn.execute(query)).all()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return sorted(timings)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN / latency regression checks for route queries")
+    parser.add_argument("--schema", default="query_bench")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--trips-per-user", type=int, default=50)
+    parser.add_argument("--heavy-trips", type=int, default=20000, help="Extra trips for user 1 (deep pages)")
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="p95 latency budget per query")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench schema afterwards")
+    args = parser.parse_args()
+
+    if not args.schema.isidentifier():
+        raise SystemExit("--schema must be a plain identifier")
+
+    admin_engine = create_async_engine(DATABASE_URL)
+    async with admin_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {args.schema}"))
+
+    engine = create_async_engine(DATABASE_URL, connect_args={"server_settings": {"search_path": args.schema}})
+    failures = []
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            started_at = time.monotonic()
+            await _seed(conn, args.users, args.trips_per_user, args.heavy_trips, args.favorites_per_user)
+            print(f"seeded in {time.monotonic() - started_at:.1f}s")
+
+        async with engine.connect() as conn:
+            heavy_cursor = await _deep_cursor(conn, 1, False, args.heavy_trips - 100)
+            heavy_saved_cursor = await _deep_cursor(conn, 1, True, args.heavy_trips // 5 - 100)
+            trip_id = await conn.scalar(select(models.Trip.id).where(models.Trip.user_id == 1).limit(1))
+
+            rows = []
+            for name, query, expected_indexes in _route_queries(heavy_cursor, heavy_saved_cursor, trip_id):
+                plan = await _explain(conn, query)
+                nodes = list(_plan_nodes(plan["Plan"]))
+                indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+                seq_scans = {
+                    node["Relation Name"] for node in nodes
+                    if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in BIG_TABLES
+                }
+                timings = await _timed(conn, query, args.runs)
+                p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+
+                problems = []
+                if not indexes & expected_indexes:
+                    problems.append(f"expected {sorted(expected_indexes)}, plan uses {sorted(indexes) or 'no index'}")
+                if seq_scans:
+                    problems.append(f"seq scan on {sorted(seq_scans)}")
+                if p95 > args.budget_ms:
+                    problems.append(f"p95 {p95:.2f}ms > {args.budget_ms}ms")
+                failures.extend(f"{name}: {problem}" for problem in problems)
+                rows.append([
+                    name,
+                    ",".join(sorted(indexes)) or "-",
+                    f"{statistics.median(timings):.2f}",
+                    f"{p95:.2f}",
+                    "FAIL" if problems else "ok",
+                ])
+
+        headers = ["query", "indexes", "p50_ms", "p95_ms", "result"]
+        widths = [max(len(str(row[i])) for row in rows + [headers]) for i in range(len(headers))]
+        for row in [headers] + rows:
+            print(" | ".join(str(cell).ljust(widths[i]) for i, cell in enumerate(row)))
+    finally:
+        await engine.dispose()
+        if not args.keep:
+            async with admin_engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"))
+        await admin_engine.dispose()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
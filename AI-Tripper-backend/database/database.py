@@ -1,6 +1,13 @@
+import asyncio
 import os
+import time
+from uuid import uuid4
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import redis.asyncio as redis
 
 # Load environment variables
@@ -15,15 +22,88 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
+# Okuma replikası (opsiyonel). Yoksa tüm okumalar primary'ye gider.
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+if READ_REPLICA_URL and READ_REPLICA_URL.startswith("postgresql://"):
+    READ_REPLICA_URL = READ_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 5))  # saniye; daha gerideyse primary'den oku
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 2))  # saniye
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", 30))  # hata sonrası replikayı bu kadar atla
+READ_YOUR_WRITES_WINDOW = int(os.getenv("READ_YOUR_WRITES_WINDOW", 10))  # saniye; yazan kullanıcı primary'den okur
+
+# Bağlantı havuzu: her worker kendi havuzunu açar, toplamı Postgres max_connections'ı aşmamalı.
+# DB_MAX_CONNECTIONS uygulamaya ayrılan toplam bağlantı sayısıdır (Postgres varsayılanı 100;
+# admin paneli, migration ve superuser için pay bırakılır) ve WEB_CONCURRENCY worker'a bölünür.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))  # uvicorn/gunicorn worker sayısı
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 80))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # saniye; havuz doluyken bağlantı bekleme
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # saniye; eski bağlantılar yenilenir (-1: kapalı)
+# Her checkout'ta SELECT 1 (bir round-trip). Kapalıyken kopan bağlantı ilk kullanımda hata verir
+# ve SQLAlchemy havuzdaki tüm bağlantıları geçersiz sayar.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# PgBouncer transaction pooling: asyncpg'nin isimli prepared statement önbellekleri kapatılır
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+def _pool_sizes() -> tuple[int, int]:
+    """Worker başına (pool_size, max_overflow): bütçenin ~2/3'ü kalıcı, kalanı geçici bağlantı."""
+    per_worker = max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+    pool_size = int(os.getenv("DB_POOL_SIZE") or max(1, per_worker * 2 // 3))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW") or max(0, per_worker - pool_size))
+    return pool_size, max_overflow
+
+
+DB_POOL_SIZE, DB_MAX_OVERFLOW = _pool_sizes()
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Checkout bekleme süresini ve zaman aşımlarını services.metrics'e yazan havuz."""
+
+    def connect(self):
+        from services import metrics
+
+        label = self.logging_name or "default"
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            metrics.inc("db.pool.timeouts", engine=label)
+            raise
+        finally:
+            # Havuz doluysa kuyrukta bekleme; boşsa yeni bağlantı açma (ve pre-ping) süresi
+            metrics.observe("db.pool.wait_ms", (time.perf_counter() - started_at) * 1000, engine=label)
+
+
+def _engine_options(label: str, pool_timeout: float = DB_POOL_TIMEOUT, connect_args: dict | None = None) -> dict:
+    connect_args = dict(connect_args or {})
+    if DB_PGBOUNCER:
+        # PgBouncer her transaction'da farklı sunucu bağlantısı verebilir: önbelleklenmiş
+        # prepared statement'lar orada bulunmaz, isimler de çakışmasın diye tekil üretilir
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    return {
+        "future": True,
+        "poolclass": MonitoredQueuePool,
+        "pool_logging_name": label,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # Son bırakılan bağlantı önce verilir; fazlalar boşta kalıp recycle ile kapanır
+        "pool_use_lifo": True,
+        "connect_args": connect_args,
+    }
+
+
 # Create async engine
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # SQL loglarını görmek için True yapabilirsin
-    future=True,
-    pool_pre_ping=True,  # Bağlantı kontrolü
-    pool_size=20,        # Aynı anda açık kalacak sabit bağlantı sayısı
-    max_overflow=10,     # Havuz dolduğunda geçici olarak açılacak ekstra bağlantı sayısı
-    pool_timeout=30,     # Yeni bağlantı beklerken pes etme süresi (saniye)
+    **_engine_options("primary"),
 )
 
 # Create AsyncSessionLocal class
@@ -35,6 +115,62 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+read_engine = create_async_engine(
+    READ_REPLICA_URL,
+    # Replika yoğunsa uzun beklemek yerine hata -> primary'ye dönülür (bkz. ReplicaSession)
+    **_engine_options("replica", pool_timeout=5, connect_args={"timeout": 3}),
+) if READ_REPLICA_URL else None
+
+# Replika hatası sayılanlar: bağlantı kurulamadı, havuz zaman aşımı, sorgu sırasında kopma
+REPLICA_ERRORS = (DBAPIError, OSError, PoolTimeoutError)
+
+
+class ReplicaSession(AsyncSession):
+    """
+    Replika session'ı: bir okuma replikada hata verirse session primary'ye bağlanıp aynı
+    okumayı tekrarlar; istek hata dönmez, sonraki istekler REPLICA_RETRY_AFTER boyunca primary'ye gider.
+    """
+
+    async def _with_fallback(self, method: str, *args, **kwargs):
+        try:
+            return await getattr(super(), method)(*args, **kwargs)
+        except REPLICA_ERRORS as e:
+            if self.info.get("read_route") != "replica":
+                raise
+            from services import metrics
+
+            mark_replica_down(type(e).__name__)
+            try:
+                await super().rollback()
+            except Exception:
+                pass
+            self.bind = engine
+            self.sync_session.bind = engine.sync_engine
+            self.info["read_route"] = "primary"
+            metrics.inc("db.read_route", route="primary", reason="replica_error")
+            return await getattr(super(), method)(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await self._with_fallback("execute", *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._with_fallback("scalar", *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await self._with_fallback("scalars", *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._with_fallback("get", *args, **kwargs)
+
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=ReplicaSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+) if read_engine else None
+
 # Create Base class
 Base = declarative_base()
 
@@ -60,6 +196,129 @@ async def close_redis():
         await redis_client.close()
         print("✅ Redis connection closed")
 
+def publish_pool_metrics() -> dict:
+    """Havuz durumunu gauge olarak yaz (/api/metrics her çağrıldığında) ve döndür."""
+    from services import metrics
+
+    status = {}
+    for label, pool_engine in (("primary", engine), ("replica", read_engine)):
+        if pool_engine is None:
+            continue
+        pool = pool_engine.pool
+        checked_in, checked_out = pool.checkedin(), pool.checkedout()
+        status[label] = {
+            "size": pool.size(),
+            "open": checked_in + checked_out,  # bağlantılar tembel açılır, size'a kadar büyür
+            "checked_in": checked_in,
+            "checked_out": checked_out,
+            # pool_size üstünde açılmış geçici bağlantılar (SQLAlchemy henüz dolmamış havuzda negatif sayar)
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": DB_MAX_OVERFLOW,
+        }
+        for key, value in status[label].items():
+            metrics.set_gauge(f"db.pool.{key}", value, engine=label)
+    return status
+
+
+# Yazma yapan session'ları işaretle (read-your-writes için, bkz. get_db)
+@event.listens_for(Session, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+# Replika durumu: son ölçülen gecikme ve hata sonrası atlama süresi
+_replica_state = {"lag": None, "checked_at": 0.0, "down_until": 0.0}
+# Redis yoksa yapışkanlık süreç içinde tutulur: {user_id: bitiş (monotonic)}
+_sticky_users: dict[int, float] = {}
+
+# Replikada uygulanmamış WAL varsa son replay'den bu yana geçen süre; yetişmişse 0
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+def mark_replica_down(reason: str) -> None:
+    from services import metrics
+
+    _replica_state["down_until"] = time.monotonic() + REPLICA_RETRY_AFTER
+    metrics.inc("db.replica_failures")
+    print(f"⚠️ Read replica unavailable ({reason}), {REPLICA_RETRY_AFTER:.0f}s boyunca primary kullanılacak")
+
+
+async def replica_ready() -> bool:
+    """Replika ulaşılabilir ve gecikmesi REPLICA_MAX_LAG içinde mi (ölçüm kısa süre önbelleklenir)."""
+    from services import metrics
+
+    now = time.monotonic()
+    if read_engine is None or now < _replica_state["down_until"]:
+        return False
+    if now - _replica_state["checked_at"] >= REPLICA_LAG_CHECK_INTERVAL:
+        # Eşzamanlı istekler ölçüm sürerken son bilinen değeri kullansın
+        _replica_state["checked_at"] = now
+        try:
+            async with read_engine.connect() as conn:
+                lag = float(await asyncio.wait_for(conn.scalar(REPLICA_LAG_QUERY), timeout=2))
+        except Exception as e:
+            mark_replica_down(str(e) or type(e).__name__)
+            return False
+        _replica_state["lag"] = lag
+        metrics.set_gauge("db.replica_lag_seconds", lag)
+    lag = _replica_state["lag"]
+    return lag is not None and lag <= REPLICA_MAX_LAG
+
+
+async def mark_user_write(user_id: int) -> None:
+    """Kullanıcı az önce yazdı: READ_YOUR_WRITES_WINDOW boyunca okumaları primary'ye gitsin."""
+    if read_engine is None:
+        return
+    _sticky_users[user_id] = time.monotonic() + READ_YOUR_WRITES_WINDOW
+    if redis_client:
+        try:
+            # Diğer worker'lar da görsün
+            await redis_client.setex(f"read_sticky:{user_id}", READ_YOUR_WRITES_WINDOW, "1")
+        except Exception as e:
+            print(f"Read stickiness write error: {e}")
+
+
+async def is_sticky(user_id: int) -> bool:
+    until = _sticky_users.get(user_id)
+    if until is not None:
+        if until > time.monotonic():
+            return True
+        _sticky_users.pop(user_id, None)
+    if redis_client:
+        try:
+            return bool(await redis_client.exists(f"read_sticky:{user_id}"))
+        except Exception as e:
+            print(f"Read stickiness read error: {e}")
+    return False
+
+
+def _request_user_id(request: Request) -> int | None:
+    """
+    Token'ın kullanıcı id'si, sadece yönlendirme için: JWT burada tekrar çözülmez, auth
+    dependency'nin doğruladığı token önbelleğine bakılır (services.user_cache).
+    """
+    from services import user_cache
+
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    return user_cache.cached_token_user(authorization[7:])
+
+
 # Async Dependency
 async def get_db():
     """Asenkron database session dependency"""
@@ -69,5 +328,48 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
+        finally:
+            # get_current_user session'a kullanıcıyı yazar; yazma olduysa okumaları bir süre primary'ye sabitle
+            if session.info.get("wrote") and session.info.get("user_id"):
+                await mark_user_write(session.info["user_id"])
+            await session.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Sadece okuyan (GET) endpoint'ler için session dependency.
+
+    Replika tanımlı, ulaşılabilir ve yeterince güncelse replikaya gider; kullanıcı son
+    READ_YOUR_WRITES_WINDOW saniye içinde yazdıysa, replika gerideyse veya hata verdiyse
+    primary kullanılır; replika sorgu sırasında düşerse okuma aynı istekte primary'de
+    tekrarlanır (ReplicaSession). Bu session ile yazma yapılmamalı.
+    """
+    from services import metrics
+
+    route = "primary"
+    if read_engine is not None:
+        user_id = _request_user_id(request)
+        has_token = request.headers.get("authorization", "").lower().startswith("bearer ")
+        if user_id is None and has_token:
+            # Token henüz doğrulanmamış (ilk istek): yapışkan mı bilinmiyor, güvenli taraf primary
+            metrics.inc("db.read_route", route="primary", reason="unknown_user")
+        elif user_id is not None and await is_sticky(user_id):
+            metrics.inc("db.read_route", route="primary", reason="sticky")
+        elif not await replica_ready():
+            metrics.inc("db.read_route", route="primary", reason="replica_unavailable")
+        else:
+            route = "replica"
+            metrics.inc("db.read_route", route="replica")
+
+    async with (ReadSessionLocal if route == "replica" else AsyncSessionLocal)() as session:
+        session.info["read_route"] = route
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            if session.info["read_route"] == "replica" and isinstance(e, REPLICA_ERRORS):
+                # ReplicaSession dışında kalan bir çağrı (ör. stream): sonrakiler primary'ye gitsin
+                mark_replica_down(type(e).__name__)
+            raise
         finally:
             await session.close()
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, JSON, LargeBinary, Index, DDL, event, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database.database import Base
+from database.plan_codec import decompress_plan
 
 class User(Base):
     __tablename__ = "users"
@@ -22,6 +24,10 @@ class User(Base):
     gender = Column(String, nullable=True)  # "erkek", "kadin", "diger", None
     age_range = Column(String, nullable=True)  # "18-25", "26-35", "36-45", "46+"
     travel_style = Column(String, nullable=True)  # "rahat", "aktif", "luks", "butce"
+    hobbies = Column(JSON, nullable=True)  # ["fotoğraf", "yürüyüş"]
+    interests = Column(JSON, nullable=True)  # ["kultur", "yemek"]
+    preferred_countries = Column(JSON, nullable=True)  # ["Italy", "Japan"]
+    vacation_types = Column(JSON, nullable=True)  # ["deniz", "sehir"]
     
     # Subscription & Usage Limits
     remaining_routes = Column(Integer, default=3, nullable=False)  # Free users: 3, Premium/Pro: -1 (unlimited)
@@ -43,7 +49,7 @@ class Trip(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Kayıt durumu
-    is_saved = Column(Boolean, default=False, index=True)  # Kaydedildi mi?
+    is_saved = Column(Boolean, default=False)  # Kaydedildi mi? (tek başına indeks yok, bkz. __table_args__)
     name = Column(String, nullable=True)  # Kullanıcının verdiği isim (sadece is_saved=True için)
     
     # Tatil bilgileri
@@ -53,17 +59,19 @@ class Trip(Base):
     
     # Seyahat tercihleri
     travelers = Column(String, nullable=False)  # "yalniz", "cift", "aile", "arkadaslar"
-    interests = Column(JSON, nullable=False)  # ["kultur", "yemek", "doga"]
+    interests = Column(JSONB, nullable=False)  # ["kultur", "yemek", "doga"]
     budget = Column(String, nullable=True)  # "dusuk", "orta", "yuksek"
     transport = Column(String, nullable=True)  # "ucak", "araba", "farketmez"
-    # Deprecated: kept only for backward compatibility with older records.
-    mode = Column(String, nullable=True, default=None)
     
-    # AI plan verisi
-    # Canonical trip payload used by the new planner flow.
-    trip_plan = Column(JSON, nullable=False)
-    # Deprecated: kept only for backward compatibility with older records.
-    places = Column(JSON, nullable=True)
+    # AI plan verisi: içerik adresli, sıkıştırılmış blob (bkz. services/plan_store.py)
+    plan_hash = Column(String(64), ForeignKey("trip_plan_blobs.hash"), nullable=True, index=True)
+    # Blob'a taşınmamış eski satırların planı (admin_panel.py trips migrate-plans ile boşaltılır)
+    legacy_trip_plan = Column("trip_plan", JSONB, nullable=True)
+    # Liste kartları için plandan yazarken çıkarılan küçük özet
+    # {"destination", "city_image", "day_titles"}; listeler planı hiç okumaz
+    summary = Column(JSON, nullable=True)
+    # Arama için plandan çıkarılan aktivite isimleri / tipleri {"names": [...], "types": [...]}
+    plan_terms = Column(JSONB, nullable=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -71,6 +79,128 @@ class Trip(Base):
     
     # Relationships
     user = relationship("User", back_populates="trips")
+    # Blob sadece detay sorgularında açıkça yüklenir (joinedload); listeler dokunmaz
+    plan_blob = relationship("TripPlanBlob", lazy="raise")
+
+    __table_args__ = (
+        # Keyset sayfalama: user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        Index("ix_trips_user_created_id", "user_id", "created_at", "id"),
+        # Kayıtlı listesi: aynı sorgu + is_saved = true
+        Index("ix_trips_user_saved_created_id", "user_id", "is_saved", "created_at", "id"),
+        # Arama: interests @> '["kultur"]', plan_terms @> '{"types": ["museum"]}'
+        Index("ix_trips_interests_gin", "interests", postgresql_using="gin", postgresql_ops={"interests": "jsonb_path_ops"}),
+        Index("ix_trips_plan_terms_gin", "plan_terms", postgresql_using="gin", postgresql_ops={"plan_terms": "jsonb_path_ops"}),
+        # Tam metin: isim, şehir, aktivite isimleri/tipleri ve ilgi alanları
+        Index(
+            "ix_trips_search",
+            func.trip_search_document(name, city, plan_terms, interests),
+            postgresql_using="gin",
+        ),
+    )
+
+    @property
+    def trip_plan(self) -> dict | None:
+        """Tam plan; blob ilk erişimde açılır ve instance üzerinde saklanır."""
+        plan = self.__dict__.get("_trip_plan")
+        if plan is None:
+            # plan_blob yüklenmemişse lazy="raise" hata verir: sorguya joinedload(Trip.plan_blob) ekleyin
+            plan = self.plan_blob.plan if self.plan_hash is not None else self.legacy_trip_plan
+            self._trip_plan = plan
+        return plan
+
+
+class TripPlanBlob(Base):
+    """İçerik adresli trip_plan: sha256(kanonik JSON) -> sıkıştırılmış JSON (bkz. database/plan_codec.py)"""
+    __tablename__ = "trip_plan_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(8), nullable=False)  # "zstd", "zlib"
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)  # Kanonik JSON byte sayısı
+    stored_size = Column(Integer, nullable=False)  # Sıkıştırılmış byte sayısı
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def plan(self) -> dict:
+        return decompress_plan(self.codec, self.data)
+
+
+class TripHistoryArchive(Base):
+    """
+    Saklama süresini aşan kaydedilmemiş geçmiş trip'ler (bkz. services/trip_retention.py).
+    created_at'e göre aylık RANGE partition'lı; partition'lar iş tarafından gerektikçe açılır,
+    süresi dolanlar tek DROP TABLE ile atılır.
+    """
+    __tablename__ = "trip_history_archive"
+
+    id = Column(Integer, primary_key=True)  # trips.id ile aynı
+    created_at = Column(DateTime, primary_key=True)  # Partition anahtarı PK'de olmak zorunda
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=True)
+    city = Column(String, nullable=False)
+    country = Column(String, nullable=True)
+    duration_days = Column(Integer, nullable=False)
+    travelers = Column(String, nullable=False)
+    interests = Column(JSONB, nullable=False)
+    budget = Column(String, nullable=True)
+    transport = Column(String, nullable=True)
+    plan_hash = Column(String(64), ForeignKey("trip_plan_blobs.hash"), nullable=True)
+    trip_plan = Column(JSONB, nullable=True)  # Blob'a taşınmamış eski satırlar
+    summary = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_trip_history_archive_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# ix_trips_search'in kullandığı IMMUTABLE fonksiyon (migration c2d94e7b1f35 ile aynı tanım).
+# Arama sorgusu aynı ifadeyi kullanmalı ki indeks seçilsin.
+TRIP_SEARCH_DOCUMENT_DDL = """
+CREATE OR REPLACE FUNCTION trip_search_document(name text, city text, plan_terms jsonb, interests jsonb)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, ''))
+        || jsonb_to_tsvector('simple', coalesce(plan_terms, '{}'::jsonb), '["string"]')
+        || jsonb_to_tsvector('simple', coalesce(interests, '[]'::jsonb), '["string"]')
+$$
+"""
+
+# create_all (ör. bench_queries.py) indeksten önce fonksiyonu oluştursun
+event.listen(Trip.__table__, "before_create", DDL(TRIP_SEARCH_DOCUMENT_DDL))
+
+
+def summarize_trip_plan(trip_plan: dict | None) -> dict:
+    """Liste görünümü için trip_plan özeti (hedef, kapak görseli, gün başlıkları)."""
+    trip_plan = trip_plan if isinstance(trip_plan, dict) else {}
+    trip_summary = trip_plan.get("trip_summary") if isinstance(trip_plan.get("trip_summary"), dict) else {}
+    days = trip_plan.get("daily_itinerary") if isinstance(trip_plan.get("daily_itinerary"), list) else []
+    return {
+        "destination": trip_summary.get("destination"),
+        "city_image": trip_plan.get("city_image"),
+        "day_titles": [day.get("title") for day in days if isinstance(day, dict)],
+    }
+
+
+def plan_search_terms(trip_plan: dict | None) -> dict:
+    """Arama için aktivite isimleri ve (küçük harf) tipleri; tekrarlar atılır."""
+    names, types = [], []
+    trip_plan = trip_plan if isinstance(trip_plan, dict) else {}
+    days = trip_plan.get("daily_itinerary") if isinstance(trip_plan.get("daily_itinerary"), list) else []
+    for day in days:
+        for activity in (day.get("activities") or []) if isinstance(day, dict) else []:
+            if not isinstance(activity, dict):
+                continue
+            if isinstance(activity.get("name"), str) and activity["name"] not in names:
+                names.append(activity["name"])
+            if isinstance(activity.get("type"), str):
+                place_type = activity["type"].strip().lower()
+                if place_type and place_type not in types:
+                    types.append(place_type)
+    return {"names": names, "types": types}
 
 
 class FavoritePlace(Base):
@@ -91,6 +221,11 @@ class FavoritePlace(Base):
     # Relationships
     user = relationship("User", back_populates="favorites")
 
+    __table_args__ = (
+        # Favori listesi: user_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_favorite_places_user_created_id", "user_id", "created_at", "id"),
+    )
+
 
 class Subscription(Base):
     """Premium abonelik sistemi"""
@@ -134,3 +269,48 @@ class ContactMessage(Base):
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False, index=True)  # Okundu mu?
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class Place(Base):
+    """
+    Üretilen itinerary'lerden çıkarılan normalize mekân kataloğu.
+    Aynı mekân isim + coğrafi yakınlığa göre tek satırda birleştirilir (bkz. services/place_catalog.py).
+    """
+    __tablename__ = "places"
+
+    id = Column(Integer, primary_key=True, index=True)
+    city = Column(String, nullable=False)  # normalize (küçük harf)
+    country = Column(String, nullable=True)
+    name = Column(String, nullable=False)
+    normalized_name = Column(String, nullable=False)
+    type = Column(String, nullable=True)  # normalize (küçük harf): museum, restaurant, ...
+    address = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    geohash = Column(String(9), nullable=False)  # ~5 m hassasiyet
+    geocell = Column(String(6), nullable=False)  # geohash[:6] (~1.2 x 0.6 km): yakınlık araması bu hücrelerle
+
+    mention_count = Column(Integer, default=1, nullable=False)  # Kaç trip'te geçti
+    last_trip_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Şehir + tip bazlı "en popüler" sorgusu
+        Index("ix_places_city_type_mentions", "city", "type", "mention_count"),
+        Index("ix_places_city_normalized_name", "city", "normalized_name"),
+        # Mekânsal indeks: aday arama `city = ? AND geocell IN (3x3 komşu hücre)`
+        Index("ix_places_city_geocell", "city", "geocell"),
+    )
+
+
+class JobWatermark(Base):
+    """Artımlı arka plan işlerinin kaldığı yer (ör. işlenen son trip id'si)"""
+    __tablename__ = "job_watermarks"
+
+    job = Column(String, primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+    # last_id'nin altındaki tekrar tarama penceresinde zaten işlenmiş id'ler
+    recent_ids = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
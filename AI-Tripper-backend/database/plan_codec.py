@@ -0,0 +1,54 @@
+"""
+trip_plan blob'ları için kanonik JSON, içerik hash'i ve sıkıştırma.
+
+Aynı plan (önbellekten gelen / tekrar üretilen, geçmiş + kayıtlı kopyası) aynı hash'e
+düşer ve trip_plan_blobs'ta bir kez saklanır. zstandard kuruluysa zstd, değilse zlib
+kullanılır; codec her blob'la birlikte yazıldığı için ikisi aynı tabloda yaşayabilir.
+"""
+import hashlib
+import json
+import os
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # opsiyonel bağımlılık
+    zstandard = None
+
+from services import metrics
+
+PLAN_ZSTD_LEVEL = int(os.getenv("PLAN_ZSTD_LEVEL", 10))
+PLAN_ZLIB_LEVEL = int(os.getenv("PLAN_ZLIB_LEVEL", 9))
+
+
+def canonical_json(plan: dict) -> bytes:
+    """Anahtar sırası / boşluktan bağımsız tek bir byte dizisi (hash ve sıkıştırma girdisi)."""
+    return json.dumps(plan, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def plan_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compress_plan(raw: bytes) -> tuple[str, bytes]:
+    """(codec, sıkıştırılmış veri)"""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=PLAN_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, PLAN_ZLIB_LEVEL)
+
+
+def decompress_plan(codec: str, data: bytes) -> dict:
+    """Blob'u aç; okuma maliyeti trip_plan.decode_ms histogramına yazılır."""
+    started_at = time.perf_counter()
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("trip plan blob is zstd-compressed but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown trip plan codec: {codec}")
+    plan = json.loads(raw)
+    metrics.observe("trip_plan.decode_ms", (time.perf_counter() - started_at) * 1000, codec=codec)
+    return plan
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -83,22 +83,61 @@ class FavoritePlace(FavoritePlaceCreate):
         from_attributes = True
 
 
+class CatalogPlace(PlaceBase):
+    """Itinerary'lerden derlenen mekân kataloğu satırı"""
+    id: int
+    city: str
+    country: Optional[str] = None
+    type: Optional[str] = None
+    geohash: str
+    mention_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class DestinationRecommendation(BaseModel):
+    """Profil + kaydedilen trip'lerden hesaplanan destinasyon önerisi"""
+    city: str
+    country: Optional[str] = None
+    score: float
+    content_score: float
+    collaborative_score: float
+
+
 # Trip Schemas (Unified SavedRoute + RouteHistory)
 class TripCreate(BaseModel):
-    """Create a new trip (either saved or just history)"""
-    city: str
+    """Create a new trip (either saved or just history).
+
+    Either send draft_id (returned by /api/trip-planner) or the full trip fields.
+    """
+    draft_id: Optional[str] = None  # Sunucudaki taslak; verilirse aşağıdaki alanlar gerekmez
+    city: Optional[str] = None
     country: Optional[str] = None
-    duration_days: int
-    travelers: str  # "yalniz", "cift", "aile", "arkadaslar"
-    interests: List[str]
+    duration_days: Optional[int] = None
+    travelers: Optional[str] = None  # "yalniz", "cift", "aile", "arkadaslar"
+    interests: Optional[List[str]] = None
     budget: Optional[str] = None
     transport: Optional[str] = None
-    mode: Optional[str] = None  # deprecated
-    trip_plan: dict
-    places: Optional[List[dict]] = None  # deprecated
+    mode: Optional[str] = None  # deprecated, ignored
+    trip_plan: Optional[dict] = None
+    places: Optional[List[dict]] = None  # deprecated, ignored
     is_saved: bool = False
     name: Optional[str] = None  # Only for saved trips
 
+    @model_validator(mode="after")
+    def require_draft_or_plan(self):
+        if self.draft_id:
+            return self
+        missing = [
+            field
+            for field in ("city", "duration_days", "travelers", "interests", "trip_plan")
+            if getattr(self, field) is None
+        ]
+        if missing:
+            raise ValueError(f"draft_id or these fields are required: {', '.join(missing)}")
+        return self
+
 class TripUpdate(BaseModel):
     """Update trip (mainly for marking as saved or renaming)"""
     is_saved: Optional[bool] = None
@@ -117,9 +156,7 @@ class Trip(BaseModel):
     interests: List[str]
     budget: Optional[str] = None
     transport: Optional[str] = None
-    mode: Optional[str] = None
     trip_plan: dict
-    places: Optional[List[dict]] = None
     created_at: datetime
     updated_at: datetime
     
@@ -127,6 +164,38 @@ class Trip(BaseModel):
         from_attributes = True
 
 
+class TripPlanSummary(BaseModel):
+    """trip_plan'dan yazarken çıkarılan liste özeti"""
+    destination: Optional[str] = None
+    city_image: Optional[str] = None
+    day_titles: List[Optional[str]] = []
+
+class TripListItem(BaseModel):
+    """Liste kartı: trip_plan olmadan (tam plan detay endpoint'inden alınır)"""
+    id: int
+    user_id: int
+    is_saved: bool
+    name: Optional[str] = None
+    city: str
+    country: Optional[str] = None
+    duration_days: int
+    travelers: str
+    interests: List[str]
+    budget: Optional[str] = None
+    transport: Optional[str] = None
+    summary: Optional[TripPlanSummary] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TripPage(BaseModel):
+    """Keyset sayfası; next_cursor None ise son sayfa"""
+    items: List[TripListItem]
+    next_cursor: Optional[str] = None
+
+
 # Backwards compatibility (deprecated schemas)
 class SavedRouteCreate(TripCreate):
     """Deprecated: Use TripCreate with is_saved=True"""
@@ -0,0 +1,285 @@
+"""
+Yerel Gemini stand-in'i (geliştirme ve yük testleri için).
+
+generateContent ve cachedContents (create / get / patch / delete) uçlarını taklit eder.
+Gecikme, önbelleklenmemiş girdi token sayısıyla orantılıdır; böylece context caching'in
+girdi maliyeti ve yanıt süresi üzerindeki etkisi /api/metrics üzerinden ölçülebilir.
+
+Çalıştırma:
+    uvicorn gemini_stub:app --port 8090
+    GEMINI_API_BASE=http://localhost:8090/v1beta GOOGLE_API_KEY=local uvicorn main:app
+
+Ortam değişkenleri:
+    STUB_BASE_LATENCY        sabit gecikme (s), varsayılan 0.3
+    STUB_PREFILL_PER_TOKEN   önbelleklenmemiş girdi tokenı başına gecikme (s), varsayılan 0.0005
+    STUB_OUTPUT_PER_TOKEN    çıktı tokenı başına gecikme (s), varsayılan 0.0002
+    STUB_ERROR_RATE          429 dönme olasılığı, varsayılan 0
+    STUB_SLOW_RATE           uzun kuyruk olasılığı (gecikme x10), varsayılan 0
+    STUB_OVERLOADED_MODELS   virgülle ayrılmış, her zaman 503 dönen modeller (fallback testi)
+    STUB_CACHE_MIN_TOKENS    bundan küçük cachedContents reddedilir (gerçek API gibi), varsayılan 1024
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Local Gemini stand-in")
+
+BASE_LATENCY = float(os.getenv("STUB_BASE_LATENCY", 0.3))
+PREFILL_PER_TOKEN = float(os.getenv("STUB_PREFILL_PER_TOKEN", 0.0005))
+OUTPUT_PER_TOKEN = float(os.getenv("STUB_OUTPUT_PER_TOKEN", 0.0002))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", 0))
+SLOW_RATE = float(os.getenv("STUB_SLOW_RATE", 0))
+OVERLOADED_MODELS = {m.strip() for m in os.getenv("STUB_OVERLOADED_MODELS", "").split(",") if m.strip()}
+CACHE_MIN_TOKENS = int(os.getenv("STUB_CACHE_MIN_TOKENS", 1024))
+
+# name -> {"model", "text", "tokens", "expires_at"}
+CACHES: dict[str, dict] = {}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _parts_text(content: dict | None) -> str:
+    if not content:
+        return ""
+    return "\n".join(part.get("text", "") for part in content.get("parts", []))
+
+
+def _ttl_seconds(value: str | None) -> float:
+    return float(value.rstrip("s")) if value else 3600.0
+
+
+def _cache_view(name: str) -> dict:
+    entry = CACHES[name]
+    return {
+        "name": name,
+        "model": entry["model"],
+        "expireTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["expires_at"])),
+        "usageMetadata": {"totalTokenCount": entry["tokens"]},
+    }
+
+
+def _get_live_cache(name: str) -> dict:
+    entry = CACHES.get(name)
+    if entry is None or entry["expires_at"] < time.time():
+        CACHES.pop(name, None)
+        raise HTTPException(status_code=404, detail=f"CachedContent not found: {name}")
+    return entry
+
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(body: dict):
+    text = _parts_text(body.get("systemInstruction")) + "".join(_parts_text(c) for c in body.get("contents", []))
+    if _tokens(text) < CACHE_MIN_TOKENS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cached content is too small. total_token_count={_tokens(text)}, min_total_token_count={CACHE_MIN_TOKENS}",
+        )
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    CACHES[name] = {
+        "model": body.get("model", ""),
+        "text": text,
+        "tokens": _tokens(text),
+        "expires_at": time.time() + _ttl_seconds(body.get("ttl")),
+    }
+    return _cache_view(name)
+
+
+@app.get("/v1beta/cachedContents/{cache_id}")
+async def get_cached_content(cache_id: str):
+    name = f"cachedContents/{cache_id}"
+    _get_live_cache(name)
+    return _cache_view(name)
+
+
+@app.patch("/v1beta/cachedContents/{cache_id}")
+async def update_cached_content(cache_id: str, body: dict):
+    name = f"cachedContents/{cache_id}"
+    entry = _get_live_cache(name)
+    entry["expires_at"] = time.time() + _ttl_seconds(body.get("ttl"))
+    return _cache_view(name)
+
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    CACHES.pop(f"cachedContents/{cache_id}", None)
+    return {}
+
+
+def _fake_catalog_schedule(prompt: str) -> dict:
+    match = re.search(r"Plan a (\d+)-day trip to", prompt)
+    days = int(match.group(1)) if match else 3
+    ids = [int(i) for i in re.findall(r"^(\d+)\|", prompt, re.MULTILINE)]
+    per_day = max(1, min(4, len(ids) // days))
+    return {
+        "trip_summary": {
+            "travelers": "string",
+            "total_estimated_cost": "1000 USD",
+            "best_season": "Spring",
+            "weather_forecast": "Sunny",
+        },
+        "days": [
+            {
+                "day": day,
+                "title": f"Day {day}",
+                "stops": [
+                    [place_id, slot, "2h", "10 USD"]
+                    for place_id, slot in zip(ids[(day - 1) * per_day : day * per_day], ["09:00", "12:00", "15:00", "19:00"])
+                ],
+                "estimated_daily_budget": "100 USD",
+                "transportation_note": "Walk",
+            }
+            for day in range(1, days + 1)
+        ],
+    }
+
+
+def _fake_refine_patch(prompt: str) -> dict:
+    days = re.findall(r"^/daily_itinerary/(\d+) ", prompt, re.MULTILINE)
+    last_day = days[-1] if days else "0"
+    return {
+        "patch": [
+            {"op": "replace", "path": f"/daily_itinerary/{last_day}/title", "value": "Refined day"},
+            {
+                "op": "add",
+                "path": f"/daily_itinerary/{last_day}/activities/-",
+                "value": {
+                    "time": "20:00",
+                    "name": "Refined place",
+                    "type": "restaurant",
+                    "address": "Refined street 1",
+                    "coordinates": {"lat": 41.01, "lng": 28.97},
+                    "duration": "1h",
+                    "cost": "20 USD",
+                    "description": "Added by the refine instruction.",
+                },
+            },
+        ]
+    }
+
+
+def _fake_personalized_plan(prompt: str) -> dict:
+    match = re.search(r"recommendations must have (\d+) days", prompt)
+    days = int(match.group(1)) if match else 5
+    return {
+        "destination": "Lisbon",
+        "trip_duration": f"{days} gün",
+        "trip_theme": "Kültür ve deniz",
+        "recommendations": [
+            {
+                "day": day,
+                "title": f"Gün {day}",
+                "activities": ["Yürüyüş turu", "Yerel yemek"],
+                "places": [f"Lisbon place {day}"],
+                "tips": "Rahat ayakkabı giyin.",
+            }
+            for day in range(1, days + 1)
+        ],
+        "personal_notes": "Profilinize uygun.",
+        "budget_estimate": "800 EUR",
+        "best_time": "Mayıs",
+    }
+
+
+def _fake_itinerary(prompt: str) -> dict:
+    match = re.search(r"Create a (\d+)-day travel itinerary for (.+?) in (\w+)", prompt)
+    days = int(match.group(1)) if match else 3
+    city = match.group(2) if match else "Istanbul"
+    lat, lng = 41.0 + random.random() / 10, 28.9 + random.random() / 10
+    return {
+        "trip_summary": {
+            "destination": city,
+            "duration_days": days,
+            "travelers": "string",
+            "total_estimated_cost": "1000 USD",
+            "best_season": "Spring",
+            "weather_forecast": "Sunny",
+        },
+        "daily_itinerary": [
+            {
+                "day": day,
+                "date": "",
+                "title": f"{city} day {day}",
+                "activities": [
+                    {
+                        "time": slot,
+                        "name": f"{city} place {day}-{i}",
+                        "type": random.choice(["museum", "restaurant", "park", "landmark"]),
+                        "address": f"{city} street {i}",
+                        "coordinates": {"lat": lat + i / 100, "lng": lng + day / 100},
+                        "duration": "2h",
+                        "cost": "10 USD",
+                        "description": "Short description.",
+                    }
+                    for i, slot in enumerate(["09:00", "13:00", "19:00"], start=1)
+                ],
+                "estimated_daily_budget": "100 USD",
+                "transportation_note": "Walk",
+            }
+            for day in range(1, days + 1)
+        ],
+    }
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    model, _, action = model_action.partition(":")
+    if action != "generateContent":
+        raise HTTPException(status_code=404, detail=f"Unsupported action: {action}")
+
+    body = await request.json()
+    if model in OVERLOADED_MODELS:
+        raise HTTPException(status_code=503, detail="The model is overloaded (stub)")
+    if random.random() < ERROR_RATE:
+        raise HTTPException(status_code=429, detail="Resource exhausted (stub)")
+
+    cached_tokens = 0
+    cached_text = ""
+    if body.get("cachedContent"):
+        entry = _get_live_cache(body["cachedContent"])
+        cached_tokens, cached_text = entry["tokens"], entry["text"]
+
+    request_text = _parts_text(body.get("systemInstruction")) + "".join(
+        _parts_text(c) for c in body.get("contents", [])
+    )
+    prompt = cached_text + request_text
+    uncached_tokens = _tokens(request_text)
+
+    translate = re.search(r"Translate every string in this JSON array into (.+?)\.\n", prompt)
+    if translate:
+        # Dizi, çeviri isteminin son satırıdır
+        language, strings = translate.group(1), json.loads(prompt.strip().splitlines()[-1])
+        answer = {"translations": [f"[{language}] {text}" for text in strings]}
+    elif "Traveler profile:" in prompt:
+        answer = _fake_personalized_plan(prompt)
+    elif "\nInstruction: " in prompt:
+        answer = _fake_refine_patch(prompt)
+    elif re.search(r"Candidate places in .+ \(id\|name\|type\):", prompt):
+        answer = _fake_catalog_schedule(prompt)
+    else:
+        answer = _fake_itinerary(prompt)
+    answer_text = json.dumps(answer, ensure_ascii=False)
+    output_tokens = _tokens(answer_text)
+
+    latency = BASE_LATENCY + uncached_tokens * PREFILL_PER_TOKEN + output_tokens * OUTPUT_PER_TOKEN
+    if random.random() < SLOW_RATE:
+        latency *= 10
+    await asyncio.sleep(latency)
+
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": answer_text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {
+            "promptTokenCount": cached_tokens + uncached_tokens,
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": cached_tokens + uncached_tokens + output_tokens,
+        },
+        "modelVersion": model,
+    }
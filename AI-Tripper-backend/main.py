@@ -1,7 +1,10 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from typing import Any
 
 from fastapi import FastAPI, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+import hmac
 import traceback
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, ValidationError
@@ -10,11 +13,28 @@ import httpx
 import os
 import logging
 
-from services.llm_service import generate_detailed_trip_itinerary
-from database.database import get_db
+from services.llm_service import (
+    generate_detailed_trip_itinerary,
+    generate_personalized_trip_plan,
+    personalization_profile,
+    refine_itinerary,
+)
+from services.credit_ledger import credit_ledger
+from services.concurrency import ClientDisconnected, run_until_disconnected
+from services.admission import trip_admission
+from services.plans import get_user_plan
+from services.retry import OUTBOUND_RETRY_POLICY, parse_request_timeout, request_deadline
+from services.place_catalog import INGEST_INTERVAL, run_catalog_worker
+from services.recommender import RECOMMENDER_INTERVAL, run_recommender_worker
+from services.trip_retention import TRIP_RETENTION_INTERVAL, run_retention_worker
+from services.trip_drafts import create_draft
+from services import metrics
+from database.database import WEB_CONCURRENCY, get_db, init_redis, close_redis, publish_pool_metrics
 from database import models
-from routes import auth, routes, favorites, history, contact, subscription
+from routes import auth, routes, favorites, history, contact, subscription, places, recommendations
 from auth.security import get_current_active_user
+from middleware.access_log import AccessLogMiddleware
+from middleware.rate_limit import RateLimitMiddleware
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,7 +42,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger("aitripper")
 
-app = FastAPI(title="AI Tripper API", version="2.0.0")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_redis()
+    # Yeni trip'lerden mekân kataloğunu artımlı doldur (PLACE_CATALOG_INTERVAL=0 ile kapatılır)
+    catalog_task = asyncio.create_task(run_catalog_worker()) if INGEST_INTERVAL > 0 else None
+    # Öneri indeksini (özellik vektörleri + co-occurrence) artımlı güncelle (RECOMMENDER_INTERVAL=0 ile kapatılır)
+    recommender_task = asyncio.create_task(run_recommender_worker()) if RECOMMENDER_INTERVAL > 0 else None
+    # Eski kaydedilmemiş geçmişi arşiv partition'larına taşı (TRIP_RETENTION_INTERVAL=0 ile kapatılır)
+    retention_task = asyncio.create_task(run_retention_worker()) if TRIP_RETENTION_INTERVAL > 0 else None
+    yield
+    for task in (catalog_task, recommender_task, retention_task):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await close_redis()
+
+
+app = FastAPI(title="AI Tripper API", version="2.0.0", lifespan=lifespan)
+
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    # İstemci gitti: yanıt kimseye ulaşmaz, hata değil (run_until_disconnected zaten sayıp logladı)
+    return Response(status_code=499)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     # Sunucu logları için hatayı terminale yazdır
@@ -37,6 +85,9 @@ async def global_exception_handler(request: Request, exc: Exception):
             "detail": str(exc)  # Geliştirme aşamasında hatayı görebilmek için
         }
     )
+# Plan bazlı rate limiting (CORS'un içinde kalsın ki 429 yanıtları da CORS başlığı alsın)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS ayarları
 app.add_middleware(
     CORSMiddleware,
@@ -44,8 +95,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# En dışta: gecikme rate limit ve CORS dahil ölçülür, 429'lar da loglanır (gövde okunmaz)
+app.add_middleware(AccessLogMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(routes.router)
@@ -53,6 +108,8 @@ app.include_router(favorites.router)
 app.include_router(history.router)
 app.include_router(contact.router)
 app.include_router(subscription.router)
+app.include_router(places.router)
+app.include_router(recommendations.router)
 
 @app.get("/")
 async def root():
@@ -63,6 +120,29 @@ async def root():
         "status": "running"
     }
 
+# Ayarlıysa /api/metrics "Authorization: Bearer <METRICS_TOKEN>" ister; yoksa sadece localhost'tan okunur
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_metrics_access(request: Request) -> None:
+    if METRICS_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            return
+    elif request.client and request.client.host in LOOPBACK_HOSTS:
+        return
+    raise HTTPException(status_code=403, detail="Not allowed")
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_access)])
+async def get_metrics():
+    """In-process metrikler (sayaçlar, gauge'lar, gecikme histogramları); bkz. METRICS_TOKEN"""
+    # Havuz gauge'ları olay başına değil, okunurken güncellenir
+    publish_pool_metrics()
+    return metrics.snapshot()
+
+
 class TripPlanRequest(BaseModel):
     city: str = Field(..., min_length=1)
     days: int = Field(..., ge=1, le=30)
@@ -83,6 +163,12 @@ class DetailedTripItineraryModel(BaseModel):
     country_flag: str | None = None
     city_image: str | None = None
 
+
+class TripRefineRequest(BaseModel):
+    itinerary: DetailedTripItineraryModel
+    instruction: str = Field(..., min_length=1, max_length=500)
+    language: str = "Turkish"
+
 async def get_city_image(city: str = "istanbul") -> str:
     """Fetch a single city-level hero image to avoid one API call per activity."""
 
@@ -103,15 +189,17 @@ async def get_city_image(city: str = "istanbul") -> str:
         query = f"{city_lower} skyline travel"
         
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.unsplash.com/search/photos",
-                params={
-                    "query": query,
-                    "per_page": 1,
-                    "orientation": "landscape"
-                },
-                headers={"Authorization": f"Client-ID {unsplash_access_key}"},
-                timeout=5.0
+            response = await OUTBOUND_RETRY_POLICY.run(
+                lambda attempt: client.get(
+                    "https://api.unsplash.com/search/photos",
+                    params={
+                        "query": query,
+                        "per_page": 1,
+                        "orientation": "landscape"
+                    },
+                    headers={"Authorization": f"Client-ID {unsplash_access_key}"},
+                    timeout=5.0
+                )
             )
             if response.status_code == 200:
                 data = response.json()
@@ -123,15 +211,6 @@ async def get_city_image(city: str = "istanbul") -> str:
 
     return fallback
 
-# Debug middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    if request.method == "POST":
-        body = await request.body()
-        logger.info(f"RECEIVED BODY: {body.decode()}")
-    response = await call_next(request)
-    return response
-
 @app.get("/api/country-info/{country_name}")
 async def get_country_info(country_name: str):
     """REST Countries API'den ülke bilgilerini çek"""
@@ -139,9 +218,11 @@ async def get_country_info(country_name: str):
         import httpx
         async with httpx.AsyncClient() as client:
             # REST Countries API v3.1
-            response = await client.get(
-                f"https://restcountries.com/v3.1/name/{country_name}?fullText=false",
-                timeout=10.0
+            response = await OUTBOUND_RETRY_POLICY.run(
+                lambda attempt: client.get(
+                    f"https://restcountries.com/v3.1/name/{country_name}?fullText=false",
+                    timeout=10.0
+                )
             )
             
             if response.status_code == 200:
@@ -174,44 +255,37 @@ async def get_country_info(country_name: str):
 
 @app.post("/api/personalized-trip")
 async def create_personalized_trip(
+    request: Request,
     db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Kullanıcının özelliklerine göre kişiselleştirilmiş AI tatil planı"""
-    
-    # Kullanıcı profilini dict'e çevir
-    user_profile = {
-        "full_name": current_user.full_name,
-        "bio": current_user.bio,
-        "hobbies": current_user.hobbies or [],
-        "interests": current_user.interests or [],
-        "gender": current_user.gender,
-        "preferred_countries": current_user.preferred_countries or [],
-        "vacation_types": current_user.vacation_types or [],
-        "travel_style": current_user.travel_style,
-        "age_range": current_user.age_range,
-    }
-    
-    # AI ile kişiselleştirilmiş plan oluştur
-    plan = await generate_personalized_trip_plan(user_profile)
-    
-    # Plan geçmişine kaydet (is_saved=False)
-    trip_entry = models.Trip(
-        user_id=current_user.id,
-        city=plan.get("destination", "Personalized Trip"),
-        country=None,
-        duration_days=5,
-        travelers="yalniz",
-        interests=current_user.interests or ["kişiselleştirilmiş"],
-        trip_plan=plan,
-        is_saved=False
-    )
-    db.add(trip_entry)
-    await db.commit()
-    
+    """
+    Kullanıcının özelliklerine göre kişiselleştirilmiş AI tatil planı.
+    Profil değişmedikçe önbellekteki plan döner (yeni LLM çağrısı ve Trip satırı yok).
+    """
+    plan = await get_user_plan(db, current_user.id)
+    user_profile = personalization_profile(current_user)
+
+    async def build_personalized() -> tuple[dict, bool]:
+        return await generate_personalized_trip_plan(current_user.id, user_profile, plan=plan)
+
+    try:
+        with request_deadline(parse_request_timeout(request.headers.get("X-Request-Timeout"))):
+            personalized, cached = await run_until_disconnected(request, build_personalized())
+    except (ClientDisconnected, HTTPException):
+        raise
+    except Exception as e:
+        print(f"❌ Kişiselleştirilmiş plan hatası: {e}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Kişiselleştirilmiş plan oluşturulurken bir hata oluştu: {str(e)}"
+        )
+
     return {
         "success": True,
-        "plan": plan,
+        "plan": personalized,
+        "cached": cached,
         "message": "Kişiselleştirilmiş tatil planınız hazır!"
     }
 
@@ -219,6 +293,7 @@ async def create_personalized_trip(
 @app.post("/api/trip-planner")
 async def create_detailed_trip_plan(
     trip_request: TripPlanRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
@@ -229,69 +304,141 @@ async def create_detailed_trip_plan(
     
     print(f"📝 Trip plan talebi alındı: {trip_request.city}, {trip_request.days} gün")
     
-    # Kredi kontrolü
+    # Yoğunlukta işe başlamadan (ve kredi ayırmadan) 503 + Retry-After ile reddet
+    plan = await get_user_plan(db, current_user.id)
+    trip_admission.check(plan)
+
+    # Form verilerini dict'e çevir
+    trip_data = {
+        "city": trip_request.city,
+        "days": trip_request.days,
+        "travelers": trip_request.travelers,
+        "interests": trip_request.interests,
+        "transport": trip_request.transport,
+        "budget": trip_request.budget,
+        "start_date": trip_request.start_date,
+        "language": trip_request.language,
+    }
+
+    async def build_itinerary() -> dict:
+        # AI ile detaylı itinerary oluştur
+        raw_itinerary = await generate_detailed_trip_itinerary(trip_data, plan=plan)
+
+        try:
+            itinerary = DetailedTripItineraryModel.model_validate(raw_itinerary).model_dump()
+        except ValidationError as validation_error:
+            print(f"Invalid AI itinerary payload: {validation_error}")
+            raise HTTPException(
+                status_code=502,
+                detail="Gemini returned an invalid itinerary payload. Please try again.",
+            )
+
+        itinerary["city_image"] = await get_city_image(trip_request.city)
+        return itinerary
+
+    # Kredi tek bir koşullu UPDATE ile ayrılır; hata veya bağlantı kopmasında iade edilir
+    async with credit_ledger.hold(current_user.id) as reservation:
+        try:
+            # İstemci sekmeyi kapatırsa Gemini isteği ve retry beklemeleri iptal edilir.
+            # Tüm dış çağrılar istemcinin süre bütçesini (X-Request-Timeout) aşmaz.
+            with request_deadline(parse_request_timeout(request.headers.get("X-Request-Timeout"))):
+                itinerary = await run_until_disconnected(request, build_itinerary())
+
+            # NOT: Artık veritabanına otomatik kaydetmiyoruz!
+            # Kullanıcı "Kaydet" butonuna basarsa o zaman kaydedilecek.
+
+        except (ClientDisconnected, HTTPException):
+            raise
+        except Exception as e:
+            print(f"❌ Trip plan oluşturma hatası: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Tatil planı oluşturulurken bir hata oluştu: {str(e)}"
+            )
+
+    print(f"✅ {trip_request.days} günlük plan başarıyla oluşturuldu (kalan kredi: {reservation.remaining_routes})")
+
+    # Kaydet / geçmiş çağrıları planı tekrar yüklemesin diye sunucuda taslak olarak tut
+    draft_id = await create_draft(current_user.id, {
+        "city": trip_request.city,
+        "country": (itinerary.get("trip_summary") or {}).get("destination"),
+        "duration_days": trip_request.days,
+        "travelers": trip_request.travelers,
+        "interests": trip_request.interests,
+        "budget": trip_request.budget,
+        "transport": trip_request.transport,
+        "trip_plan": itinerary,
+    })
+
+    return {
+        "success": True,
+        "itinerary": itinerary,
+        "draft_id": draft_id,
+        "remaining_routes": reservation.remaining_routes,
+        "message": f"{trip_request.city} için {trip_request.days} günlük tatil planınız hazır!"
+    }
+
+
+@app.post("/api/trip-planner/refine")
+async def refine_trip_plan(
+    refine_request: TripRefineRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Mevcut planı talimata göre düzenle ("3. gün daha az yürüyüş" gibi).
+    Sadece değişen gün/aktiviteler üretilir; kredi düşülmez ama kredisi bitmiş
+    kullanıcılar düzenleme yapamaz (aksi halde ücretsiz sınırsız üretim olurdu).
+    """
     if current_user.remaining_routes == 0:
         raise HTTPException(
             status_code=403,
             detail="Rota oluşturma hakkınız kalmadı. Lütfen premium plan satın alın."
         )
-    
-    try:
-        # Form verilerini dict'e çevir
-        trip_data = {
-            "city": trip_request.city,
-            "days": trip_request.days,
-            "travelers": trip_request.travelers,
-            "interests": trip_request.interests,
-            "transport": trip_request.transport,
-            "budget": trip_request.budget,
-            "start_date": trip_request.start_date,
-            "language": trip_request.language,
-        }
-        
-        # AI ile detaylı itinerary oluştur
-        raw_itinerary = await generate_detailed_trip_itinerary(trip_data)
+    plan = await get_user_plan(db, current_user.id)
+    trip_admission.check(plan)
 
+    async def build_refinement() -> tuple[dict, list[dict]]:
+        refined, ops = await refine_itinerary(
+            refine_request.itinerary.model_dump(),
+            refine_request.instruction,
+            plan=plan,
+            language=refine_request.language,
+        )
         try:
-            itinerary = DetailedTripItineraryModel.model_validate(raw_itinerary).model_dump()
+            itinerary = DetailedTripItineraryModel.model_validate(refined).model_dump()
         except ValidationError as validation_error:
-            print(f"Invalid AI itinerary payload: {validation_error}")
+            print(f"Invalid refined itinerary payload: {validation_error}")
             raise HTTPException(
                 status_code=502,
                 detail="Gemini returned an invalid itinerary payload. Please try again.",
             )
+        return itinerary, ops
 
-        itinerary["city_image"] = await get_city_image(trip_request.city)
-        
-        # Kalan rota hakkını azalt (unlimited değilse)
-        if current_user.remaining_routes > 0:
-            current_user.remaining_routes -= 1
-            await db.commit()
-            await db.refresh(current_user)
-            print(f"✅ Kullanıcı kredisi güncellendi: {current_user.remaining_routes} kaldı")
-        
-        # NOT: Artık veritabanına otomatik kaydetmiyoruz!
-        # Kullanıcı "Kaydet" butonuna basarsa o zaman kaydedilecek.
-        
-        print(f"✅ {trip_request.days} günlük plan başarıyla oluşturuldu")
-        
-        return {
-            "success": True,
-            "itinerary": itinerary,
-            "remaining_routes": current_user.remaining_routes,
-            "message": f"{trip_request.city} için {trip_request.days} günlük tatil planınız hazır!"
-        }
-        
+    try:
+        with request_deadline(parse_request_timeout(request.headers.get("X-Request-Timeout"))):
+            itinerary, ops = await run_until_disconnected(request, build_refinement())
+    except (ClientDisconnected, HTTPException):
+        raise
     except Exception as e:
-        print(f"❌ Trip plan oluşturma hatası: {e}")
-        import traceback
+        print(f"❌ Trip plan düzenleme hatası: {e}")
         traceback.print_exc()
         raise HTTPException(
             status_code=500,
-            detail=f"Tatil planı oluşturulurken bir hata oluştu: {str(e)}"
+            detail=f"Tatil planı düzenlenirken bir hata oluştu: {str(e)}"
         )
 
+    return {
+        "success": True,
+        "itinerary": itinerary,
+        "patch": ops,
+    }
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Havuz boyutları WEB_CONCURRENCY'ye göre bölünür; worker sayısı aynı değişkenden gelir
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=WEB_CONCURRENCY)
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Yapılandırılmış (JSON) erişim logu (saf ASGI middleware).
+
+Gövde okunmaz ve tamponlanmaz; sadece yanıt başlığından durum kodu alınır, gövde
+parçalarının boyutu sayılır. Satır başına bir JSON nesnesi "aitripper.access" logger'ına yazılır:
+
+    {"request_id": "...", "method": "GET", "route": "/api/routes/saved/{trip_id}", "status": 200,
+     "latency_ms": 12.3, "bytes": 512, "user_id": 42, "query": {"page": "2"}}
+
+- route: eşleşen route şablonu (path parametreleri loglanmaz); eşleşme yoksa null.
+- request_id: gelen X-Request-ID (makul uzunluktaysa) yoksa yeni üretilir, yanıta da eklenir.
+- user_id: auth dependency'nin doğruladığı token'dan (services.user_cache); JWT tekrar çözülmez.
+- Örnekleme: ACCESS_LOG_SAMPLE_RATE oranında; 5xx ve ACCESS_LOG_SLOW_MS'ten yavaş istekler her zaman.
+- Query string'deki hassas anahtarların (password, token, ...) değerleri maskelenir.
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+from urllib.parse import parse_qsl
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from services import user_cache
+
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 0.1))  # 0-1
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", 1000))
+
+REDACTED = "[redacted]"
+SENSITIVE_KEYS = re.compile(r"pass|token|secret|key|auth|session|code|signature", re.IGNORECASE)
+# İstemciden gelen id log satırını bozmasın
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+access_logger = logging.getLogger("aitripper.access")
+
+
+def redact_query(query_string: bytes) -> dict | None:
+    if not query_string:
+        return None
+    return {
+        key: REDACTED if SENSITIVE_KEYS.search(key) else value
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    }
+
+
+class AccessLogMiddleware:
+    def __init__(self, app, sample_rate: float = ACCESS_LOG_SAMPLE_RATE, slow_ms: float = ACCESS_LOG_SLOW_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def _emit(self, scope, request_id: str, status: int, latency_ms: float, size: int) -> None:
+        route = scope.get("route")
+        authorization = Headers(scope=scope).get("authorization", "")
+        user_id = user_cache.cached_token_user(authorization[7:]) if authorization[:7].lower() == "bearer " else None
+        access_logger.info(json.dumps({
+            "request_id": request_id,
+            "method": scope["method"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "latency_ms": round(latency_ms, 2),
+            "bytes": size,
+            "user_id": user_id,
+            "query": redact_query(scope.get("query_string", b"")),
+        }, ensure_ascii=False, separators=(",", ":")))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        incoming = Headers(scope=scope).get("x-request-id", "")
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid4().hex
+        # Handler'lar request.state.request_id ile okuyabilir
+        scope.setdefault("state", {})["request_id"] = request_id
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency_ms = (time.perf_counter() - started_at) * 1000
+            if status >= 500 or latency_ms >= self.slow_ms or random.random() < self.sample_rate:
+                self._emit(scope, request_id, status, latency_ms, size)
@@ -0,0 +1,195 @@
+"""
+Plan ve rota grubu bazlı API rate limiting (saf ASGI middleware).
+
+GCRA (Generic Cell Rate Algorithm) kullanılır: anahtar başına tek bir
+"theoretical arrival time" tutulur. Redis varsa her kontrol tek bir
+EVALSHA çağrısıdır; yoksa aynı algoritma süreç içi bellekte çalışır.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+from auth.security import ALGORITHM, SECRET_KEY
+from services import metrics
+from services.plans import get_user_plan
+
+# (yol öneki, grup) — ilk eşleşen kazanır
+ROUTE_GROUPS = [
+    ("/api/auth/login", "auth_login"),
+    ("/api/auth/register", "auth_login"),
+    ("/api/trip-planner", "trip_planner"),
+    ("/api/country-info", "country_info"),
+    ("/api/history", "history"),
+    ("/api/", "api"),
+]
+
+# Rate limit dışı yollar (Stripe webhook'u, sağlık kontrolleri vb.)
+EXEMPT_PREFIXES = ("/api/subscription/webhook", "/api/metrics")
+
+# grup -> plan -> "istek/periyot"; RATE_LIMIT_<GRUP>_<PLAN> ile ezilebilir
+DEFAULT_LIMITS = {
+    "auth_login": {"free": "10/minute", "premium": "10/minute", "pro": "10/minute"},
+    "trip_planner": {"free": "5/minute", "premium": "20/minute", "pro": "40/minute"},
+    "country_info": {"free": "30/minute", "premium": "120/minute", "pro": "240/minute"},
+    "history": {"free": "60/minute", "premium": "240/minute", "pro": "480/minute"},
+    "api": {"free": "120/minute", "premium": "600/minute", "pro": "1200/minute"},
+}
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+MEMORY_MAX_KEYS = 10000
+
+# KEYS[1] = anahtar; ARGV = aralık (ms), tolerans (ms). Zaman Redis'ten alınır (worker saat farkı olmaz).
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    return {0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, 0, new_tat - now}
+"""
+
+
+def parse_limit(value: str) -> tuple[int, int]:
+    """ "60/minute" -> (60, 60) """
+    count, _, period = value.partition("/")
+    return int(count), PERIODS[period.strip().rstrip("s") or "minute"]
+
+
+def _load_limits() -> dict[str, dict[str, tuple[int, int]]]:
+    limits = {}
+    for group, plans in DEFAULT_LIMITS.items():
+        limits[group] = {}
+        for plan, default in plans.items():
+            override = os.getenv(f"RATE_LIMIT_{group.upper()}_{plan.upper()}")
+            limits[group][plan] = parse_limit(override or default)
+    return limits
+
+
+class _MemoryGCRA:
+    """Redis yokken kullanılan süreç içi GCRA (LRU ile sınırlı)."""
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self._max_keys = max_keys
+
+    def check(self, key: str, interval_ms: float, tolerance_ms: float) -> tuple[bool, float, float]:
+        now = time.monotonic() * 1000
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + interval_ms
+        allow_at = new_tat - tolerance_ms
+        if allow_at > now:
+            return False, allow_at - now, tat - now
+        self._tats[key] = new_tat
+        self._tats.move_to_end(key)
+        while len(self._tats) > self._max_keys:
+            self._tats.popitem(last=False)
+        return True, 0.0, new_tat - now
+
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.limits = _load_limits()
+        self._memory = _MemoryGCRA()
+        self._script = None
+        self._script_client = None
+
+    def _group_for(self, path: str) -> str | None:
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        for prefix, group in ROUTE_GROUPS:
+            if path.startswith(prefix):
+                return group
+        return None
+
+    async def _identify(self, scope) -> tuple[str, str]:
+        """(kimlik, plan): geçerli bir token varsa kullanıcı id'si, yoksa istemci IP'si."""
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+                sub = str(payload.get("sub") or "")
+                if sub.isdigit():
+                    try:
+                        plan = await get_user_plan(None, int(sub))
+                    except Exception as e:
+                        print(f"Plan lookup failed for rate limit, 'free' varsayılıyor: {e}")
+                        plan = "free"
+                    return f"user:{sub}", plan
+                if sub:
+                    return f"user:{sub}", "free"
+            except JWTError:
+                pass
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", "free"
+
+    async def _check(self, key: str, interval_ms: float, tolerance_ms: float) -> tuple[bool, float, float]:
+        from database.database import redis_client
+
+        if redis_client:
+            try:
+                if self._script is None or self._script_client is not redis_client:
+                    self._script = redis_client.register_script(GCRA_LUA)
+                    self._script_client = redis_client
+                allowed, retry_ms, reset_ms = await self._script(keys=[key], args=[interval_ms, tolerance_ms])
+                return bool(int(allowed)), float(retry_ms), float(reset_ms)
+            except Exception as e:
+                print(f"Redis rate limit error, bellek içi fallback kullanılıyor: {e}")
+        return self._memory.check(key, interval_ms, tolerance_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        group = self._group_for(scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        identity, plan = await self._identify(scope)
+        count, period = self.limits[group].get(plan, self.limits[group]["free"])
+        interval_ms = period * 1000 / count
+        tolerance_ms = period * 1000  # tam periyotluk patlamaya izin ver
+
+        allowed, retry_ms, reset_ms = await self._check(f"ratelimit:{group}:{identity}", interval_ms, tolerance_ms)
+        remaining = max(0, math.floor((tolerance_ms - reset_ms) / interval_ms)) if allowed else 0
+        rate_headers = {
+            "RateLimit-Limit": str(count),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(math.ceil(reset_ms / 1000)),
+            "RateLimit-Policy": f"{count};w={period}",
+        }
+
+        if not allowed:
+            metrics.inc("ratelimit.rejected", group=group, plan=plan)
+            retry_after = max(1, math.ceil(retry_ms / 1000))
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Çok fazla istek gönderildi. Lütfen biraz sonra tekrar deneyin."},
+                headers={**rate_headers, "Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in rate_headers.items():
+                    headers.append(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
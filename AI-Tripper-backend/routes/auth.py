@@ -14,8 +14,11 @@ from auth.security import (
     get_user_by_username,
     get_user_by_email,
     get_current_active_user,
+    get_current_active_user_readonly,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from services.llm_service import invalidate_personalized_trip, personalization_profile
+from services.user_cache import invalidate_user
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
@@ -38,7 +41,7 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db))
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -73,7 +76,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
 
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def read_users_me(current_user: models.User = Depends(get_current_active_user_readonly)):
     return current_user
 
 
@@ -84,6 +87,7 @@ async def update_user_profile(
     current_user: models.User = Depends(get_current_active_user)
 ):
     new_username = user_update.username.strip() if user_update.username is not None else None
+    profile_before = personalization_profile(current_user)
 
     if user_update.email is not None and user_update.email != current_user.email:
         raise HTTPException(status_code=400, detail="Можно изменить только имя пользователя")
@@ -129,6 +133,11 @@ async def update_user_profile(
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Имя пользователя или email уже заняты")
+    await invalidate_user(current_user.id)
+
+    # Kişiselleştirmede kullanılan alanlar değiştiyse önbellekteki öneri geçersiz
+    if personalization_profile(current_user) != profile_before:
+        await invalidate_personalized_trip(current_user.id)
     return current_user
 
 
@@ -138,6 +147,8 @@ async def delete_user_account(
     current_user: models.User = Depends(get_current_active_user)
 ):
     # Delete user and all related data (cascade)
+    user_id = current_user.id
     await db.delete(current_user)
     await db.commit()
+    await invalidate_user(user_id)
     return None
@@ -4,8 +4,8 @@ from sqlalchemy import select
 from typing import List
 
 from database import models, schemas
-from database.database import get_db
-from auth.security import get_current_active_user
+from database.database import get_db, get_read_db
+from auth.security import get_current_active_user, get_current_active_user_readonly
 
 router = APIRouter(prefix="/api/favorites", tags=["favorites"])
 
@@ -27,12 +27,13 @@ async def create_favorite(
 async def get_favorites(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
 ):
     result = await db.execute(
         select(models.FavoritePlace)
         .filter(models.FavoritePlace.user_id == current_user.id)
+        .order_by(models.FavoritePlace.created_at.desc(), models.FavoritePlace.id.desc())
         .offset(skip)
         .limit(limit)
     )
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from sqlalchemy.orm import joinedload
+from typing import Optional
 
 from database import models, schemas
-from database.database import get_db
-from auth.security import get_current_active_user
+from database.database import get_db, get_read_db
+from auth.security import get_current_active_user, get_current_active_user_readonly
+from services.plan_store import build_trip
+from services.trip_drafts import trip_fields
+from services.trip_listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, list_trips
 
 router = APIRouter(prefix="/api/history", tags=["history"])
 
@@ -17,31 +21,42 @@ async def create_history(
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Create a trip history entry (is_saved=False)"""
-    trip_data = history.dict()
+    trip_data = await trip_fields(history, current_user.id)
     trip_data['user_id'] = current_user.id
     trip_data['is_saved'] = False  # History entries are not saved
     
-    db_trip = models.Trip(**trip_data)
+    db_trip = await build_trip(db, trip_data)
     db.add(db_trip)
     await db.commit()
     await db.refresh(db_trip)
     return db_trip
 
 
-@router.get("/", response_model=List[schemas.Trip])
+@router.get("/", response_model=schemas.TripPage)
 async def get_history(
-    skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
+):
+    """Get trip history (both saved and unsaved), newest first, as summary cards with a next_cursor"""
+    return await list_trips(db, current_user.id, cursor=cursor, limit=limit)
+
+
+@router.get("/{trip_id}", response_model=schemas.Trip)
+async def get_history_entry(
+    trip_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
 ):
-    """Get all trip history (both saved and unsaved)"""
+    """Get a single trip with its full plan"""
     result = await db.execute(
-        select(models.Trip)
-        .filter(models.Trip.user_id == current_user.id)
-        .order_by(models.Trip.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        select(models.Trip).options(joinedload(models.Trip.plan_blob)).filter(
+            models.Trip.id == trip_id,
+            models.Trip.user_id == current_user.id
+        )
     )
-    history = result.scalars().all()
-    return history
+    trip = result.scalar_one_or_none()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return trip
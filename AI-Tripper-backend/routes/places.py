@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from database import schemas
+from database.database import get_read_db
+from services.place_catalog import top_places
+
+router = APIRouter(prefix="/api/places", tags=["places"])
+
+
+@router.get("/", response_model=List[schemas.CatalogPlace])
+async def get_top_places(
+    city: str = Query(..., min_length=1),
+    type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get the most mentioned catalog places for a city (optionally filtered by type)"""
+    return await top_places(db, city, place_type=type, limit=limit)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from auth.security import get_current_active_user
+from database import models, schemas
+from services.llm_service import personalization_profile
+from services.recommender import recommendation_index
+
+router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
+
+
+@router.get("/", response_model=List[schemas.DestinationRecommendation])
+async def get_recommendations(
+    limit: int = Query(10, ge=1, le=50),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Profile-based destination suggestions from the in-memory index (no LLM call)"""
+    # İlk istekte indeks henüz kurulmadıysa bir kez kur; sonrası sadece matris çarpımı
+    await recommendation_index.ensure_ready()
+    return recommendation_index.recommend(current_user.id, personalization_profile(current_user), limit=limit)
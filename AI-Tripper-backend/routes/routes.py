@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from sqlalchemy.orm import joinedload
+from typing import Optional
 
 from database import models, schemas
-from database.database import get_db
-from auth.security import get_current_active_user
+from database.database import get_db, get_read_db
+from auth.security import get_current_active_user, get_current_active_user_readonly
+from services.plan_store import build_trip
+from services.trip_drafts import trip_fields
+from services.trip_listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, list_trips, search_trips
 
 router = APIRouter(prefix="/api/routes", tags=["routes"])
 
@@ -17,47 +21,53 @@ async def create_saved_route(
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Save a trip to user's saved trips"""
-    trip_data = route.dict()
+    trip_data = await trip_fields(route, current_user.id)
     trip_data['user_id'] = current_user.id
     trip_data['is_saved'] = True  # Mark as saved
     
-    db_trip = models.Trip(**trip_data)
+    db_trip = await build_trip(db, trip_data)
     db.add(db_trip)
     await db.commit()
     await db.refresh(db_trip)
     return db_trip
 
 
-@router.get("/saved", response_model=List[schemas.Trip])
+@router.get("/saved", response_model=schemas.TripPage)
 async def get_saved_routes(
-    skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
 ):
-    """Get all saved trips (is_saved=True)"""
-    result = await db.execute(
-        select(models.Trip)
-        .filter(
-            models.Trip.user_id == current_user.id,
-            models.Trip.is_saved == True
-        )
-        .offset(skip)
-        .limit(limit)
+    """Get saved trips (is_saved=True), newest first, as summary cards with a next_cursor"""
+    return await list_trips(db, current_user.id, saved_only=True, cursor=cursor, limit=limit)
+
+
+@router.get("/saved/search", response_model=schemas.TripPage)
+async def search_saved_routes(
+    q: Optional[str] = Query(None, max_length=200),
+    type: Optional[str] = None,
+    interest: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
+):
+    """Search saved trips by place/trip name (prefix), activity type or interest"""
+    return await search_trips(
+        db, current_user.id, q=q, place_type=type, interest=interest, cursor=cursor, limit=limit
     )
-    routes = result.scalars().all()
-    return routes
 
 
 @router.get("/saved/{trip_id}", response_model=schemas.Trip)
 async def get_saved_route(
     trip_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user_readonly)
 ):
     """Get a specific saved trip"""
     result = await db.execute(
-        select(models.Trip).filter(
+        select(models.Trip).options(joinedload(models.Trip.plan_blob)).filter(
             models.Trip.id == trip_id,
             models.Trip.user_id == current_user.id,
             models.Trip.is_saved == True
@@ -78,7 +88,7 @@ async def update_saved_route(
 ):
     """Update a saved trip (rename or mark as unsaved)"""
     result = await db.execute(
-        select(models.Trip).filter(
+        select(models.Trip).options(joinedload(models.Trip.plan_blob)).filter(
             models.Trip.id == trip_id,
             models.Trip.user_id == current_user.id
         )
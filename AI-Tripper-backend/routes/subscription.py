@@ -6,9 +6,11 @@ import stripe
 import os
 from datetime import datetime
 
-from database.database import get_db
+from database.database import AsyncSessionLocal, get_db, get_read_db
 from database.models import Subscription, User
-from auth.security import get_current_user
+from auth.security import get_current_user, get_current_user_readonly
+from services.plans import invalidate_user_plan
+from services.user_cache import invalidate_user
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/subscription", tags=["subscription"])
@@ -121,27 +123,34 @@ def get_plans():
 
 @router.get("/current", response_model=SubscriptionResponse)
 async def get_current_subscription(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_readonly)
 ):
     """Kullanıcının mevcut aboneliğini getir"""
     result = await db.execute(
         select(Subscription).filter(Subscription.user_id == current_user.id)
     )
     subscription = result.scalar_one_or_none()
-    
-    # Abonelik yoksa, Free plan oluştur
-    if not subscription:
-        subscription = Subscription(
-            user_id=current_user.id,
-            plan="free",
-            status="active",
-            amount=0.0,
-            currency="usd"
+    if subscription:
+        return subscription
+
+    # Abonelik yoksa (veya replikaya henüz gelmediyse) primary'de kontrol et / Free plan oluştur
+    async with AsyncSessionLocal() as primary:
+        result = await primary.execute(
+            select(Subscription).filter(Subscription.user_id == current_user.id)
         )
-        db.add(subscription)
-        await db.commit()
-        await db.refresh(subscription)
+        subscription = result.scalar_one_or_none()
+        if not subscription:
+            subscription = Subscription(
+                user_id=current_user.id,
+                plan="free",
+                status="active",
+                amount=0.0,
+                currency="usd"
+            )
+            primary.add(subscription)
+            await primary.commit()
+            await primary.refresh(subscription)
     
     return subscription
 
@@ -295,6 +304,8 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
                 print(f"   ✅ User routes güncellendi: {old_routes} -> -1 (unlimited)")
             
             await db.commit()
+            await invalidate_user_plan(user_id)
+            await invalidate_user(user_id)
             print(f"🎊 Webhook işlendi ve commit edildi!")
         else:
             print(f"   ⚠️ Subscription bulunamadı, yeni oluşturuluyor...")
@@ -320,6 +331,8 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
                 print(f"   ✅ User routes güncellendi: -1 (unlimited)")
             
             await db.commit()
+            await invalidate_user_plan(user_id)
+            await invalidate_user(user_id)
             print(f"🎊 Yeni subscription oluşturuldu ve commit edildi!")
     
     # Abonelik yenilendi
@@ -369,6 +382,8 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
                 user.remaining_routes = 0  # No more free routes
             
             await db.commit()
+            await invalidate_user_plan(subscription.user_id)
+            await invalidate_user(subscription.user_id)
     
     return {"status": "success"}
 
@@ -0,0 +1,129 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from services import metrics
+from services.key_pool import key_pool
+
+# Küçük sayı = yüksek öncelik; pro/premium en son reddedilir
+PLAN_PRIORITY = {"pro": 0, "premium": 1, "free": 2}
+
+# Plan başına kabul edilebilir tahmini kuyruk bekleme süresi (saniye)
+WAIT_BUDGETS = {
+    "pro": float(os.getenv("ADMISSION_BUDGET_PRO", 60)),
+    "premium": float(os.getenv("ADMISSION_BUDGET_PREMIUM", 45)),
+    "free": float(os.getenv("ADMISSION_BUDGET_FREE", 15)),
+}
+
+# İlk ölçümler gelene kadar kullanılan tahmini üretim süresi
+DEFAULT_SERVICE_SECONDS = float(os.getenv("ADMISSION_DEFAULT_SERVICE_SECONDS", 20))
+EWMA_ALPHA = 0.2
+
+
+class AdmissionController:
+    """
+    Trip planner üretimleri için kabul kontrolü.
+    Uçuştaki üretimleri, kuyruk bekleme sürelerini ve anahtar havuzu kapasitesini izler;
+    tahmini bekleme plan bütçesini aşarsa isteği işe başlamadan 503 ile reddeder.
+    """
+
+    def __init__(self, capacity=key_pool.capacity):
+        self._capacity = capacity
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._avg_service_seconds = DEFAULT_SERVICE_SECONDS
+
+    def _queued_ahead(self, priority: int) -> int:
+        return sum(1 for p, _, fut in self._waiters if p <= priority and not fut.done())
+
+    def _queued(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    def estimated_wait(self, plan: str) -> float:
+        capacity = max(self._capacity(), 1)
+        priority = PLAN_PRIORITY.get(plan, PLAN_PRIORITY["free"])
+        ahead = self._queued_ahead(priority)
+        if self._in_flight < capacity and ahead == 0:
+            return 0.0
+        # Önümüzdekiler + biz, kapasite kadar paralel ilerler
+        return (ahead + 1) / capacity * self._avg_service_seconds
+
+    def _reject(self, plan: str, wait: float):
+        retry_after = max(1, math.ceil(wait))
+        metrics.inc("admission.shed", plan=plan)
+        print(f"🚦 Yük atıldı: plan={plan}, tahmini bekleme={wait:.1f}s, retry-after={retry_after}s")
+        raise HTTPException(
+            status_code=503,
+            detail="Sistem şu an çok yoğun. Lütfen biraz sonra tekrar deneyin.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def check(self, plan: str) -> None:
+        """İşe (ve kredi ayırmaya) başlamadan önce erken reddetme."""
+        wait = self.estimated_wait(plan)
+        if wait > WAIT_BUDGETS.get(plan, WAIT_BUDGETS["free"]):
+            self._reject(plan, wait)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission.in_flight", self._in_flight)
+        metrics.set_gauge("admission.queued", self._queued())
+        metrics.set_gauge("admission.capacity", self._capacity())
+
+    async def _acquire(self, plan: str) -> None:
+        if self._in_flight < max(self._capacity(), 1) and self._queued() == 0:
+            self._in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PLAN_PRIORITY.get(plan, 2), next(self._seq), future))
+        self._publish()
+        budget = WAIT_BUDGETS.get(plan, WAIT_BUDGETS["free"])
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=budget)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._reject(plan, self.estimated_wait(plan))
+            # Slot tam zaman aşımı anında verildi: kullan
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self._release()  # Slot verildi ama artık istenmiyor
+            else:
+                future.cancel()
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        capacity = max(self._capacity(), 1)
+        while self._waiters and self._in_flight < capacity:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self, plan: str):
+        """Bir Gemini üretimi için sıraya gir; öncelik plana göredir."""
+        queued_at = time.monotonic()
+        await self._acquire(plan)
+        started_at = time.monotonic()
+        metrics.observe("admission.queue_wait_seconds", started_at - queued_at, plan=plan)
+        self._publish()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            self._avg_service_seconds += EWMA_ALPHA * (elapsed - self._avg_service_seconds)
+            self._release()
+
+
+trip_admission = AdmissionController()
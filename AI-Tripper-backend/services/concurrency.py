@@ -0,0 +1,63 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from services import metrics
+
+T = TypeVar("T")
+
+# Referanslar tutulmazsa event loop arka plan görevlerini GC ile kaybedebilir
+_background_tasks: set[asyncio.Task] = set()
+
+
+class ClientDisconnected(Exception):
+    """İstemci yanıtı beklemeden bağlantıyı kapattı."""
+
+
+def spawn_background(coro: Awaitable) -> asyncio.Task:
+    """İstek iptal edilse bile tamamlanması gereken işi ayrı bir görevde başlat."""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def unwrap_group(exc: BaseException) -> BaseException:
+    """TaskGroup hataları ExceptionGroup'a sarar; çağıranlar orijinal hatayı (ör. HTTPException) bekler."""
+    while isinstance(exc, BaseExceptionGroup):
+        exc = exc.exceptions[0]
+    return exc
+
+
+async def run_until_disconnected(request: Request, coro: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    `coro`'yu çalıştır, istemci koparsa hemen iptal et.
+    İptal, TaskGroup üzerinden iç içe tüm alt görevlere (Gemini isteği,
+    retry beklemeleri, zenginleştirme çağrıları) yayılır.
+    """
+
+    async def watch_disconnect():
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_interval)
+        raise ClientDisconnected()
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            watcher = tg.create_task(watch_disconnect())
+
+            async def run():
+                try:
+                    return await coro
+                finally:
+                    watcher.cancel()
+
+            work = tg.create_task(run())
+    except BaseExceptionGroup as group:
+        if group.subgroup(ClientDisconnected) is not None:
+            metrics.inc("requests.client_disconnected", route=request.url.path)
+            print(f"🔌 İstemci bağlantıyı kapattı, iş iptal edildi: {request.url.path}")
+            raise ClientDisconnected() from None
+        raise unwrap_group(group) from None
+
+    return work.result()
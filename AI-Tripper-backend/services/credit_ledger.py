@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from sqlalchemy import case, update
+
+from database.database import AsyncSessionLocal
+from database import models
+from services.concurrency import spawn_background
+from services.user_cache import invalidate_user
+
+
+@dataclass
+class CreditReservation:
+    """A single route credit taken from a user before generation starts."""
+
+    user_id: int
+    remaining_routes: int
+    unlimited: bool
+    settled: bool = False
+
+
+class CreditLedger:
+    """
+    Route credits are reserved with one conditional UPDATE ... RETURNING,
+    so concurrent requests can never spend more than the user has.
+    A reservation is kept on success and given back on failure/disconnect.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+
+    async def reserve(self, user_id: int) -> CreditReservation:
+        # -1 means unlimited (premium/pro): matched but left untouched
+        stmt = (
+            update(models.User)
+            .where(models.User.id == user_id, models.User.remaining_routes != 0)
+            .values(
+                remaining_routes=case(
+                    (models.User.remaining_routes > 0, models.User.remaining_routes - 1),
+                    else_=models.User.remaining_routes,
+                )
+            )
+            .returning(models.User.remaining_routes)
+            .execution_options(synchronize_session=False)
+        )
+        async with self._session_factory() as session:
+            remaining = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+
+        if remaining is None:
+            raise HTTPException(
+                status_code=403,
+                detail="Rota oluşturma hakkınız kalmadı. Lütfen premium plan satın alın."
+            )
+        if remaining >= 0:
+            # Önbellekteki kullanıcı snapshot'ı eski kredi sayısını gösterirdi
+            await invalidate_user(user_id)
+        return CreditReservation(user_id=user_id, remaining_routes=remaining, unlimited=remaining < 0)
+
+    def commit(self, reservation: CreditReservation) -> None:
+        """The decrement is already durable; committing only closes the reservation."""
+        reservation.settled = True
+
+    async def release(self, reservation: CreditReservation) -> None:
+        if reservation.settled:
+            return
+        reservation.settled = True
+        if reservation.unlimited:
+            return
+
+        # Skip users who switched to unlimited while the request was running
+        stmt = (
+            update(models.User)
+            .where(models.User.id == reservation.user_id, models.User.remaining_routes >= 0)
+            .values(remaining_routes=models.User.remaining_routes + 1)
+            .returning(models.User.remaining_routes)
+            .execution_options(synchronize_session=False)
+        )
+        async with self._session_factory() as session:
+            remaining = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+
+        if remaining is not None:
+            reservation.remaining_routes = remaining
+            await invalidate_user(reservation.user_id)
+        print(f"↩️ Kredi iade edildi: user={reservation.user_id}, kalan={reservation.remaining_routes}")
+
+    async def _release_shielded(self, reservation: CreditReservation) -> None:
+        # A disconnect cancels the request task; the refund must still finish.
+        await asyncio.shield(spawn_background(self.release(reservation)))
+
+    @asynccontextmanager
+    async def hold(self, user_id: int):
+        """Reserve a credit for the duration of the block; refund it if the block fails."""
+        reservation = await self.reserve(user_id)
+        try:
+            yield reservation
+        except BaseException:
+            await self._release_shielded(reservation)
+            raise
+        self.commit(reservation)
+
+
+credit_ledger = CreditLedger()
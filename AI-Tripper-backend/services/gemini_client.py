@@ -0,0 +1,277 @@
+"""
+Gemini generateContent HTTP çağrıları.
+
+Context caching: isteklerde ortak olan statik prompt öneki (kurallar + JSON şekli)
+Gemini cachedContents API'sine bir kez kaydedilir, her istek sadece kısa bir
+son ek gönderir. Önbellek girdisi anahtar (proje) ve model başınadır; oluşturma ve
+TTL yenileme arka planda yapılır, hazır olmayan önbellek için istek inline gider.
+Modelin minimum önbellek boyutunun altındaki önekler hiç denenmez (bkz. bench_context_cache.py).
+
+Opsiyonel hedging: birincil istek gözlenen p90 gecikmesini aşarsa aynı istek
+havuzdaki farklı bir anahtarla tekrar gönderilir, ilk başarılı yanıt kazanır
+ve diğeri iptal edilir. Ek çağrılar GEMINI_HEDGE_BUDGET oranıyla sınırlıdır.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from services import metrics
+from services.concurrency import spawn_background
+from services.key_pool import key_pool
+
+GEMINI_MODEL = "gemini-2.5-flash"
+# Yerel stand-in için: GEMINI_API_BASE=http://localhost:8090/v1beta (bkz. gemini_stub.py)
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") == "1"
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", 3600))
+# TTL'nin son %20'sine girilince arka planda uzatılır
+CONTEXT_CACHE_REFRESH_MARGIN = max(60, CONTEXT_CACHE_TTL // 5)
+# Oluşturma reddedilirse bir süre inline gönder
+CONTEXT_CACHE_FAILURE_BACKOFF = 600
+# API bu boyutun altındaki önekleri reddeder (2.5 Flash: 1024, 2.5 Pro: 4096 token); 0 = model varsayılanı
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", 0))
+
+HEDGING_ENABLED = os.getenv("GEMINI_HEDGING", "0") == "1"
+# Birincil çağrılara oranla en fazla bu kadar ek (hedge) çağrı
+HEDGE_BUDGET = float(os.getenv("GEMINI_HEDGE_BUDGET", 0.05))
+HEDGE_QUANTILE = float(os.getenv("GEMINI_HEDGE_QUANTILE", 0.9))
+# Eşik güvenilir olana kadar hedge yapılmaz
+HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", 2.0))
+
+
+def min_cache_tokens(model: str) -> int:
+    if CONTEXT_CACHE_MIN_TOKENS:
+        return CONTEXT_CACHE_MIN_TOKENS
+    return 4096 if "-pro" in model else 1024
+
+
+def estimate_tokens(text: str) -> int:
+    """Kaba tahmin (~4 karakter/token); gerçek sayı için countTokens (bench_context_cache.py)."""
+    return len(text) // 4
+
+
+@dataclass
+class _CachedPrefix:
+    name: str
+    expires_at: float
+
+
+class ContextCache:
+    """Statik prompt önekleri için cachedContents kaydı (anahtar, model, önek özeti) başına."""
+
+    def __init__(self):
+        self._entries: dict[tuple[str, str, str], _CachedPrefix] = {}
+        self._failed_until: dict[tuple[str, str, str], float] = {}
+        # Arka planda oluşturulan/yenilenen girdiler (aynı önek için tek çağrı)
+        self._pending: set[tuple[str, str, str]] = set()
+
+    @staticmethod
+    def inline(payload: dict, static_prefix: str) -> dict:
+        return {**payload, "systemInstruction": {"parts": [{"text": static_prefix}]}}
+
+    def apply(self, key: str, model: str, payload: dict, static_prefix: str) -> dict:
+        """Önek önbellekteyse `cachedContent` referansı, değilse inline systemInstruction ekle."""
+        name = None
+        if CONTEXT_CACHE_ENABLED:
+            if estimate_tokens(static_prefix) < min_cache_tokens(model):
+                metrics.inc("gemini.context_cache.skipped", model=model, reason="below_min_tokens")
+            else:
+                name = self._resolve(key, model, static_prefix)
+        if name is None:
+            return self.inline(payload, static_prefix)
+        return {**payload, "cachedContent": name}
+
+    def invalidate(self, name: str) -> None:
+        for cache_id, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[cache_id]
+
+    def _resolve(self, key: str, model: str, static_prefix: str) -> str | None:
+        """İstek yolunda hiç beklemez: eksik/yaşlanan girdi arka planda oluşturulur veya uzatılır."""
+        cache_id = (key, model, hashlib.sha256(static_prefix.encode()).hexdigest()[:16])
+        now = time.monotonic()
+        entry = self._entries.get(cache_id)
+        if entry and entry.expires_at - now > CONTEXT_CACHE_REFRESH_MARGIN:
+            return entry.name
+        if entry and entry.expires_at > now:
+            self._start(cache_id, self._refresh(cache_id, entry))
+            return entry.name
+        if self._failed_until.get(cache_id, 0) > now:
+            return None
+
+        self._start(cache_id, self._create(cache_id, key, model, static_prefix))
+        metrics.inc("gemini.context_cache.inline_on_miss", model=model)
+        return None
+
+    def _start(self, cache_id, coro) -> None:
+        if cache_id in self._pending:
+            coro.close()
+            return
+        self._pending.add(cache_id)
+        task = spawn_background(coro)
+        task.add_done_callback(lambda _: self._pending.discard(cache_id))
+
+    async def _create(self, cache_id, key: str, model: str, static_prefix: str) -> str | None:
+        body = {
+            "model": f"models/{model}",
+            "systemInstruction": {"parts": [{"text": static_prefix}]},
+            "ttl": f"{CONTEXT_CACHE_TTL}s",
+            "displayName": f"planner-prefix-{cache_id[2]}",
+        }
+        try:
+            async with httpx.AsyncClient(timeout=15.0) as client:
+                response = await client.post(f"{GEMINI_API_BASE}/cachedContents?key={key}", json=body)
+        except httpx.RequestError as exc:
+            response = None
+            print(f"Gemini context cache oluşturulamadı: {exc}")
+        if response is None or response.status_code != 200:
+            if response is not None:
+                print(f"Gemini context cache oluşturulamadı ({response.status_code}): {response.text[:300]}")
+            metrics.inc("gemini.context_cache.create_failed", model=model)
+            self._failed_until[cache_id] = time.monotonic() + CONTEXT_CACHE_FAILURE_BACKOFF
+            return None
+
+        name = response.json()["name"]
+        self._entries[cache_id] = _CachedPrefix(name=name, expires_at=time.monotonic() + CONTEXT_CACHE_TTL)
+        metrics.inc("gemini.context_cache.created", model=model)
+        print(f"🗂️ Gemini context cache oluşturuldu: {name} ({model})")
+        return name
+
+    async def _refresh(self, cache_id, entry: _CachedPrefix) -> None:
+        key = cache_id[0]
+        try:
+            async with httpx.AsyncClient(timeout=15.0) as client:
+                response = await client.patch(
+                    f"{GEMINI_API_BASE}/{entry.name}?key={key}&updateMask=ttl",
+                    json={"ttl": f"{CONTEXT_CACHE_TTL}s"},
+                )
+        except httpx.RequestError as exc:
+            print(f"Gemini context cache yenilenemedi: {exc}")
+            return
+        if response.status_code == 200:
+            entry.expires_at = time.monotonic() + CONTEXT_CACHE_TTL
+            metrics.inc("gemini.context_cache.refreshed")
+        else:
+            # Sunucuda silinmiş/dolmuş: bir sonraki istek yeniden oluşturur
+            self.invalidate(entry.name)
+
+
+context_cache = ContextCache()
+
+
+def _record_usage(response: httpx.Response, model: str) -> None:
+    try:
+        usage = response.json().get("usageMetadata", {})
+    except ValueError:
+        return
+    prompt_tokens = usage.get("promptTokenCount", 0)
+    cached_tokens = usage.get("cachedContentTokenCount", 0)
+    metrics.inc("gemini.tokens", prompt_tokens - cached_tokens, model=model, kind="input_uncached")
+    metrics.inc("gemini.tokens", cached_tokens, model=model, kind="input_cached")
+    metrics.inc("gemini.tokens", usage.get("candidatesTokenCount", 0), model=model, kind="output")
+
+
+async def post_generate_content(
+    key: str,
+    payload: dict,
+    timeout: httpx.Timeout,
+    model: str = GEMINI_MODEL,
+    static_prefix: str | None = None,
+) -> httpx.Response:
+    """Tek bir generateContent isteği; başarılı gecikmeler hedge eşiği için kaydedilir."""
+    url = f"{GEMINI_API_BASE}/models/{model}:generateContent?key={key}"
+    body = payload if static_prefix is None else context_cache.apply(key, model, payload, static_prefix)
+    started_at = time.monotonic()
+    with key_pool.lease(key):
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.post(url, headers={"Content-Type": "application/json"}, json=body)
+            if "cachedContent" in body and response.status_code in {400, 403, 404}:
+                # Önbellek sunucu tarafında düşmüş: referansı unut, bu isteği inline tekrarla
+                context_cache.invalidate(body["cachedContent"])
+                metrics.inc("gemini.context_cache.miss_on_use", model=model)
+                body = context_cache.inline(payload, static_prefix)
+                response = await client.post(url, headers={"Content-Type": "application/json"}, json=body)
+    metrics.inc("gemini.requests", model=model, status=response.status_code)
+    if response.status_code == 200:
+        elapsed = time.monotonic() - started_at
+        metrics.observe("gemini.request_seconds", elapsed, model=model)
+        metrics.observe("gemini.latency_by_prefix_cache_seconds", elapsed, model=model, cached="cachedContent" in body)
+        _record_usage(response, model)
+    return response
+
+
+def _hedge_threshold(model: str) -> float | None:
+    if metrics.histogram_count("gemini.request_seconds", model=model) < HEDGE_MIN_SAMPLES:
+        return None
+    observed = metrics.percentile("gemini.request_seconds", HEDGE_QUANTILE, model=model)
+    return max(observed or 0.0, HEDGE_MIN_DELAY)
+
+
+def _hedge_budget_left() -> bool:
+    primaries = metrics.counter_value("gemini.primary_calls")
+    return metrics.counter_value("gemini.hedge.sent") + 1 <= primaries * HEDGE_BUDGET
+
+
+def _estimated_primary_remaining(model: str, elapsed: float) -> float:
+    """E[L | L > elapsed] - elapsed: hedge kazandığında birincilin daha ne kadar süreceği tahmini."""
+    slower = [s for s in metrics.samples("gemini.request_seconds", model=model) if s > elapsed]
+    if not slower:
+        return 0.0
+    return sum(slower) / len(slower) - elapsed
+
+
+async def generate_content(
+    key: str,
+    payload: dict,
+    timeout: httpx.Timeout,
+    model: str = GEMINI_MODEL,
+    static_prefix: str | None = None,
+) -> httpx.Response:
+    """generateContent çağrısı; hedging açıksa ve bütçe elveriyorsa ikinci anahtarla yarıştırılır."""
+    metrics.inc("gemini.primary_calls")
+    started_at = time.monotonic()
+
+    threshold = _hedge_threshold(model) if HEDGING_ENABLED else None
+    if threshold is None or len(key_pool.keys()) < 2:
+        return await post_generate_content(key, payload, timeout, model, static_prefix)
+
+    primary = asyncio.create_task(post_generate_content(key, payload, timeout, model, static_prefix))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=threshold)
+        if done or not _hedge_budget_left():
+            return await primary
+
+        hedge_key = key_pool.pick(exclude={key})
+        metrics.inc("gemini.hedge.sent")
+        hedge = asyncio.create_task(post_generate_content(hedge_key, payload, timeout, model, static_prefix))
+        tasks.add(hedge)
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result().status_code == 200:
+                    elapsed = time.monotonic() - started_at
+                    if task is hedge:
+                        metrics.inc("gemini.hedge.won")
+                        metrics.observe(
+                            "gemini.hedge.latency_saved_seconds",
+                            _estimated_primary_remaining(model, elapsed),
+                            model=model,
+                        )
+                    metrics.observe("gemini.hedged_call_seconds", elapsed, model=model)
+                    return task.result()
+
+        # İkisi de başarısız: retry döngüsü birincilin sonucunu değerlendirsin
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,142 @@
+"""
+Itinerary'ler için kısıtlı JSON Patch (RFC 6902 alt kümesi).
+
+Sadece add / replace / remove desteklenir ve yalnızca gün/aktivite alanlarına
+dokunabilir; gün sayısı ve trip_summary'nin yapısı değiştirilemez. İşlemler
+sırayla uygulanır (her indeks önceki işlemlerden sonraki dokümana göredir).
+"""
+import copy
+import re
+from typing import Any
+
+MAX_PATCH_OPS = 40
+
+ACTIVITY_STRING_FIELDS = ("time", "name", "type", "address", "duration", "cost", "description")
+DAY_STRING_FIELDS = ("title", "estimated_daily_budget", "transportation_note")
+SUMMARY_STRING_FIELDS = ("total_estimated_cost", "best_season", "weather_forecast")
+
+_PATH = re.compile(
+    r"^/daily_itinerary/(?P<day>\d+)/(?:"
+    rf"(?P<day_field>{'|'.join(DAY_STRING_FIELDS)})"
+    r"|activities/(?P<activity>\d+|-)"
+    rf"(?:/(?P<activity_field>{'|'.join(ACTIVITY_STRING_FIELDS)}|coordinates))?"
+    r")$"
+    rf"|^/trip_summary/(?P<summary_field>{'|'.join(SUMMARY_STRING_FIELDS)})$"
+)
+
+
+class PatchError(ValueError):
+    """Patch şeması veya uygulanması geçersiz."""
+
+
+def _validate_coordinates(value: Any) -> dict:
+    if not isinstance(value, dict):
+        raise PatchError("coordinates must be an object")
+    try:
+        lat, lng = float(value["lat"]), float(value["lng"])
+    except (KeyError, TypeError, ValueError):
+        raise PatchError("coordinates need numeric lat and lng") from None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise PatchError("coordinates out of range")
+    return {"lat": lat, "lng": lng}
+
+
+def _validate_activity(value: Any) -> dict:
+    if not isinstance(value, dict) or not str(value.get("name") or "").strip():
+        raise PatchError("activity must be an object with a name")
+    activity = {field: str(value.get(field) or "") for field in ACTIVITY_STRING_FIELDS}
+    activity["coordinates"] = _validate_coordinates(value.get("coordinates"))
+    return activity
+
+
+def validate_patch(ops: Any) -> list[dict]:
+    """LLM çıktısını doğrula ve normalize et; geçersizse PatchError."""
+    if not isinstance(ops, list):
+        raise PatchError("patch must be a list of operations")
+    if len(ops) > MAX_PATCH_OPS:
+        raise PatchError(f"patch has more than {MAX_PATCH_OPS} operations")
+
+    normalized = []
+    for op in ops:
+        if not isinstance(op, dict) or op.get("op") not in {"add", "replace", "remove"}:
+            raise PatchError(f"unsupported operation: {op!r}"[:200])
+        path = str(op.get("path") or "")
+        match = _PATH.match(path)
+        if not match:
+            raise PatchError(f"path not allowed: {path}"[:200])
+
+        kind = op["op"]
+        is_activity = match["activity"] is not None and match["activity_field"] is None
+        if kind == "remove":
+            # Sadece bütün bir aktivite silinebilir (alanlar boş bırakılmaz)
+            if not is_activity or match["activity"] == "-":
+                raise PatchError(f"remove is only allowed on an activity index: {path}")
+            normalized.append({"op": "remove", "path": path})
+            continue
+
+        if "value" not in op:
+            raise PatchError(f"{kind} needs a value: {path}")
+        if kind == "add" and not is_activity:
+            raise PatchError(f"add is only allowed for activities: {path}")
+        if kind == "replace" and match["activity"] == "-":
+            raise PatchError(f"replace needs an activity index: {path}")
+
+        if is_activity:
+            value = _validate_activity(op["value"])
+        elif match["activity_field"] == "coordinates":
+            value = _validate_coordinates(op["value"])
+        else:
+            if not isinstance(op["value"], (str, int, float)):
+                raise PatchError(f"value must be a string: {path}")
+            value = str(op["value"])
+        normalized.append({"op": kind, "path": path, "value": value})
+    return normalized
+
+
+def apply_patch(itinerary: dict, ops: list[dict]) -> dict:
+    """Doğrulanmış patch'i kopya üzerinde uygula; indeks hatalarında PatchError."""
+    document = copy.deepcopy(itinerary)
+    days = document.get("daily_itinerary") or []
+
+    for op in ops:
+        match = _PATH.match(op["path"])
+        if match["summary_field"]:
+            document.setdefault("trip_summary", {})[match["summary_field"]] = op["value"]
+            continue
+
+        day_index = int(match["day"])
+        if day_index >= len(days):
+            raise PatchError(f"day index out of range: {op['path']}")
+        day = days[day_index]
+
+        if match["day_field"]:
+            day[match["day_field"]] = op["value"]
+            continue
+
+        activities = day.setdefault("activities", [])
+        position = match["activity"]
+        if op["op"] == "add":
+            index = len(activities) if position == "-" else int(position)
+            if index > len(activities):
+                raise PatchError(f"activity index out of range: {op['path']}")
+            activities.insert(index, op["value"])
+            continue
+
+        index = int(position)
+        if index >= len(activities):
+            raise PatchError(f"activity index out of range: {op['path']}")
+        if op["op"] == "remove":
+            activities.pop(index)
+        elif match["activity_field"]:
+            activities[index][match["activity_field"]] = op["value"]
+        else:
+            activities[index] = op["value"]
+
+    if any(not day.get("activities") for day in days):
+        raise PatchError("patch left a day without activities")
+    return document
+
+
+def touched_days(ops: list[dict]) -> list[int]:
+    days = {int(m["day"]) for op in ops if (m := _PATH.match(op["path"])) and m["day"] is not None}
+    return sorted(days)
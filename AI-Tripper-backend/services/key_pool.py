@@ -0,0 +1,77 @@
+import os
+import time
+from contextlib import contextmanager
+
+from services import metrics
+
+# Bir anahtarın aynı anda taşıyabileceği Gemini isteği (kota tahmini)
+GEMINI_CONCURRENCY_PER_KEY = int(os.getenv("GEMINI_CONCURRENCY_PER_KEY", 4))
+
+
+class KeyPool:
+    """
+    Gemini API anahtar havuzu: anahtar başına uçuştaki istek sayısını ve
+    429/503 sonrası soğuma sürelerini takip eder.
+    """
+
+    def __init__(self, per_key_concurrency: int = GEMINI_CONCURRENCY_PER_KEY):
+        self.per_key_concurrency = per_key_concurrency
+        self._in_flight: dict[str, int] = {}
+        self._cooldown_until: dict[str, float] = {}
+
+    def keys(self) -> list[str]:
+        """Collect all available Gemini API keys (read lazily so .env edits are picked up)."""
+        keys = []
+        primary = os.getenv("GOOGLE_API_KEY", "").strip()
+        if primary:
+            keys.append(primary)
+        for i in range(2, 6):
+            extra = os.getenv(f"GOOGLE_API_KEY_{i}", "").strip()
+            if extra:
+                keys.append(extra)
+        return keys
+
+    def _healthy(self, keys: list[str]) -> list[str]:
+        now = time.monotonic()
+        return [k for k in keys if self._cooldown_until.get(k, 0) <= now]
+
+    def capacity(self) -> int:
+        """Şu an soğumada olmayan anahtarların toplam eşzamanlılık kapasitesi."""
+        return len(self._healthy(self.keys())) * self.per_key_concurrency
+
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def pressure(self) -> float:
+        """0 = boş, 1 = tam dolu, >1 = kapasitenin üzerinde."""
+        capacity = self.capacity()
+        if capacity == 0:
+            return float("inf") if self.keys() else 0.0
+        return self.in_flight() / capacity
+
+    def pick(self, exclude: set[str] | None = None) -> str:
+        """En az yüklü sağlıklı anahtarı seç; hepsi soğumadaysa yine de en az yüklü olanı dön."""
+        keys = self.keys()
+        if not keys:
+            raise LookupError("No Gemini API key configured")
+        exclude = exclude or set()
+        candidates = [k for k in self._healthy(keys) if k not in exclude]
+        if not candidates:
+            candidates = [k for k in keys if k not in exclude] or keys
+        return min(candidates, key=lambda k: self._in_flight.get(k, 0))
+
+    def cool_down(self, key: str, seconds: float) -> None:
+        self._cooldown_until[key] = max(self._cooldown_until.get(key, 0), time.monotonic() + seconds)
+
+    @contextmanager
+    def lease(self, key: str):
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        metrics.set_gauge("gemini.keys.in_flight", self.in_flight())
+        try:
+            yield key
+        finally:
+            self._in_flight[key] -= 1
+            metrics.set_gauge("gemini.keys.in_flight", self.in_flight())
+
+
+key_pool = KeyPool()
@@ -1,16 +1,209 @@
 import asyncio
+import copy
+import hashlib
 import json
 import os
 import re
-from typing import Any
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable
 import random
 
 import httpx
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
+from database.database import AsyncSessionLocal
+from services import metrics
+from services.admission import trip_admission
+from services.concurrency import spawn_background, unwrap_group
+from services.gemini_client import GEMINI_MODEL, generate_content
+from services.key_pool import key_pool
+from services.itinerary_patch import PatchError, apply_patch, touched_days, validate_patch
+from services.model_router import ModelChoice, route, route_refine, route_translation
+from services.place_catalog import normalize_name, top_places
+from services.retry import GEMINI_RETRY_POLICY, OUTBOUND_RETRY_POLICY, DeadlineExceeded
+
 load_dotenv()
 
+ITINERARY_CACHE_TTL = int(os.getenv("ITINERARY_CACHE_TTL", 86400))
+# Çeviri belleği (tm:{dil}:{metin özeti}) daha uzun yaşar; aynı cümleler farklı planlarda tekrar eder
+TRANSLATION_MEMORY_TTL = int(os.getenv("TRANSLATION_MEMORY_TTL", 30 * 86400))
+# Sık kullanılan çeviriler için süreç içi LRU katmanı (Redis yoksa tek katman)
+TRANSLATION_MEMORY_LOCAL_SIZE = 20000
+_local_translations: OrderedDict[str, str] = OrderedDict()
+
+# Çeviri modunda sadece bu metin alanları çevrilir; mekân adları, adresler,
+# koordinatlar ve yapı kaynak itinerary'den aynen alınır.
+SUMMARY_TEXT_FIELDS = ("travelers", "total_estimated_cost", "best_season", "weather_forecast")
+DAY_TEXT_FIELDS = ("title", "estimated_daily_budget", "transportation_note")
+ACTIVITY_TEXT_FIELDS = ("type", "duration", "cost", "description")
+
+TRANSLATION_PROMPT = """Translate every string in this JSON array into {language}.
+Keep numbers, prices, currency codes, times and place names unchanged.
+Return only {{"translations": [...]}} with the same number of items in the same order.
+{strings}"""
+
+# Katalog destekli mod: şehir için yeterli aday mekân varsa LLM sadece seçim ve
+# sıralama yapar; adres, koordinat ve açıklamalar katalogdan doldurulur.
+CATALOG_ASSEMBLY_ENABLED = os.getenv("CATALOG_ASSEMBLY", "1") == "1"
+CATALOG_CANDIDATE_LIMIT = int(os.getenv("CATALOG_CANDIDATE_LIMIT", 60))
+CATALOG_MIN_PLACES = int(os.getenv("CATALOG_MIN_PLACES", 20))
+CATALOG_STOPS_PER_DAY = 4
+CATALOG_CANDIDATE_TTL = 3600
+# Bu hatalarda serbest üretime düşülmez (aynı kota/deadline onu da etkiler)
+CATALOG_NO_FALLBACK_STATUSES = {429, 503, 504}
+
+CATALOG_PROMPT_PREFIX = """
+You are a travel planner that schedules trips from a numbered list of candidate places.
+Return only one JSON object.
+
+Rules:
+- Use only ids from the candidate list; never invent places.
+- Do not use the same place twice.
+- Put places that are close to each other on the same day, 3-5 stops per day.
+- Match the requested budget, traveler type and interests.
+- Write every text field in the requested language and keep it short.
+
+JSON shape (each stop is [id, "time", "duration", "cost"]):
+{
+    "trip_summary": {
+        "travelers": "string",
+        "total_estimated_cost": "string",
+        "best_season": "string",
+        "weather_forecast": "string"
+    },
+    "days": [
+        {
+            "day": 1,
+            "title": "string",
+            "stops": [[0, "09:00", "2h", "string"]],
+            "estimated_daily_budget": "string",
+            "transportation_note": "string"
+        }
+    ]
+}
+"""
+
+# Düzenleme (refine): LLM sadece değişen gün/aktiviteler için JSON Patch üretir
+REFINE_PROMPT_PREFIX = """
+You edit an existing travel itinerary according to a user instruction.
+Return only {"patch": [...]} where the patch is a list of JSON Patch operations.
+
+Rules:
+- Change only what the instruction needs; leave everything else untouched.
+- Allowed operations: "add", "replace", "remove".
+- Allowed paths (indexes are zero-based, exactly as shown in the outline):
+  /daily_itinerary/{d}/title, /daily_itinerary/{d}/estimated_daily_budget,
+  /daily_itinerary/{d}/transportation_note,
+  /daily_itinerary/{d}/activities/{i} (add, replace or remove a whole activity),
+  /daily_itinerary/{d}/activities/- (append an activity),
+  /daily_itinerary/{d}/activities/{i}/{field} (replace one field),
+  /trip_summary/total_estimated_cost.
+- Operations are applied in order; when removing several activities from one day, remove the highest index first.
+- Never remove a whole day and never leave a day without activities.
+- New activities must be real places with accurate coordinates.
+- Write every text field in the requested language.
+
+Activity shape:
+{"time": "string", "name": "string", "type": "string", "address": "string",
+ "coordinates": {"lat": 0.0, "lng": 0.0}, "duration": "string", "cost": "string", "description": "string"}
+"""
+
+# Kişiselleştirilmiş öneri: sonuç, kullanılan profil alanlarının özetiyle birlikte saklanır
+PERSONALIZED_CACHE_TTL = int(os.getenv("PERSONALIZED_CACHE_TTL", 7 * 86400))
+PERSONALIZED_TRIP_DAYS = 5
+PERSONALIZATION_FIELDS = (
+    "bio",
+    "hobbies",
+    "interests",
+    "gender",
+    "preferred_countries",
+    "vacation_types",
+    "travel_style",
+    "age_range",
+)
+
+PERSONALIZED_PROMPT_PREFIX = """
+You are a travel advisor who picks one destination that fits a traveler profile and outlines a short trip.
+Return only one JSON object.
+
+Rules:
+- Choose a single real destination (city) that matches the profile; prefer the preferred countries if given.
+- Explain briefly why it fits in personal_notes.
+- Keep every text short and practical.
+- Write every text field in Turkish.
+
+JSON shape:
+{
+    "destination": "string",
+    "trip_duration": "string",
+    "trip_theme": "string",
+    "recommendations": [
+        {
+            "day": 1,
+            "title": "string",
+            "activities": ["string"],
+            "places": ["string"],
+            "tips": "string"
+        }
+    ],
+    "personal_notes": "string",
+    "budget_estimate": "string",
+    "best_time": "string"
+}
+"""
+
+# Tüm planner isteklerinde aynı olan kısım: Gemini context cache'e bir kez kaydedilir.
+# Değiştirilirse yeni bir önbellek girdisi otomatik oluşturulur.
+ITINERARY_PROMPT_PREFIX = """
+You are a travel planner that writes compact day-by-day itineraries.
+Return only one JSON object.
+
+Rules:
+- Use real, geographically plausible places.
+- Keep descriptions very short.
+- Match the requested budget level.
+- Follow the traveler type guidance for pacing and venue choice.
+- Respect the requested interests, transport and start date.
+- Write every text field in the requested language.
+- Keep the itinerary practical and concise.
+
+JSON shape:
+{
+    "trip_summary": {
+        "destination": "string",
+        "duration_days": 0,
+        "travelers": "string",
+        "total_estimated_cost": "string",
+        "best_season": "string",
+        "weather_forecast": "string"
+    },
+    "daily_itinerary": [
+        {
+            "day": 1,
+            "date": "string",
+            "title": "string",
+            "activities": [
+                {
+                    "time": "string",
+                    "name": "string",
+                    "type": "string",
+                    "address": "string",
+                    "coordinates": {"lat": 0.0, "lng": 0.0},
+                    "duration": "string",
+                    "cost": "string",
+                    "description": "string"
+                }
+            ],
+            "estimated_daily_budget": "string",
+            "transportation_note": "string"
+        }
+    ]
+}
+"""
+
 
 def _fix_json_string(s: str) -> str:
     """Fix common JSON issues: trailing commas, unescaped characters."""
@@ -87,15 +280,17 @@ async def resolve_country_name_from_city(city: str) -> str:
     try:
         async with httpx.AsyncClient(timeout=timeout) as client:
             # Primary: Nominatim city lookup
-            nominatim = await client.get(
-                "https://nominatim.openstreetmap.org/search",
-                params={
-                    "q": city,
-                    "format": "json",
-                    "limit": 1,
-                    "addressdetails": 1,
-                },
-                headers={"User-Agent": "AI-Trip-Planner/2.0"},
+            nominatim = await OUTBOUND_RETRY_POLICY.run(
+                lambda attempt: client.get(
+                    "https://nominatim.openstreetmap.org/search",
+                    params={
+                        "q": city,
+                        "format": "json",
+                        "limit": 1,
+                        "addressdetails": 1,
+                    },
+                    headers={"User-Agent": "AI-Trip-Planner/2.0"},
+                )
             )
             if nominatim.status_code == 200:
                 rows = nominatim.json()
@@ -112,9 +307,11 @@ async def resolve_country_name_from_city(city: str) -> str:
 
             # Fallback: REST Countries by capital
             if not country_result:
-                by_capital = await client.get(
-                    f"https://restcountries.com/v3.1/capital/{city_clean}",
-                    timeout=8.0,
+                by_capital = await OUTBOUND_RETRY_POLICY.run(
+                    lambda attempt: client.get(
+                        f"https://restcountries.com/v3.1/capital/{city_clean}",
+                        timeout=8.0,
+                    )
                 )
                 if by_capital.status_code == 200:
                     rows = by_capital.json()
@@ -141,8 +338,10 @@ async def get_country_context(city: str) -> tuple[str, str]:
             return ("", "")
 
         async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"https://restcountries.com/v3.1/name/{country_name}?fullText=false"
+            response = await OUTBOUND_RETRY_POLICY.run(
+                lambda attempt: client.get(
+                    f"https://restcountries.com/v3.1/name/{country_name}?fullText=false"
+                )
             )
 
         if response.status_code != 200:
@@ -172,39 +371,376 @@ async def get_country_context(city: str) -> tuple[str, str]:
         return ("", "")
 
 
-def _get_api_keys() -> list:
-    """Collect all available Gemini API keys (supports key rotation for rate limits)."""
-    keys = []
-    primary = os.getenv("GOOGLE_API_KEY", "").strip()
-    if primary:
-        keys.append(primary)
-    for i in range(2, 6):
-        extra = os.getenv(f"GOOGLE_API_KEY_{i}", "").strip()
-        if extra:
-            keys.append(extra)
-    return keys
+def _normalized_language(trip_data: dict) -> str:
+    return (trip_data.get("language") or "Turkish").strip().lower() or "turkish"
+
+
+def _itinerary_shape_digest(trip_data: dict) -> str:
+    """Dilden bağımsız gezi şekli: aynı form girdisi aynı özeti üretir (ilgi alanı sırası önemsiz)."""
+    shape = {
+        "city": str(trip_data.get("city", "")).strip().lower(),
+        "days": int(trip_data.get("days", 3)),
+        "travelers": str(trip_data.get("travelers", "")).lower(),
+        "interests": sorted(str(i).lower() for i in trip_data.get("interests", [])),
+        "transport": str(trip_data.get("transport", "")).lower(),
+        "budget": str(trip_data.get("budget", "")).lower(),
+        "start_date": trip_data.get("start_date", ""),
+    }
+    return hashlib.sha256(json.dumps(shape, sort_keys=True).encode()).hexdigest()
+
+
+def _itinerary_cache_key(trip_data: dict, language: str | None = None) -> str:
+    return f"itinerary:{_itinerary_shape_digest(trip_data)}:{language or _normalized_language(trip_data)}"
+
+
+def _itinerary_languages_key(trip_data: dict) -> str:
+    """Bu gezi şekli için önbellekte üretilmiş itinerary'si bulunan dillerin Redis set'i."""
+    return f"itinerary_languages:{_itinerary_shape_digest(trip_data)}"
+
+
+async def _cache_get_json(key: str) -> Any:
+    from database.database import redis_client
+
+    try:
+        if redis_client:
+            cached = await redis_client.get(key)
+            if cached:
+                return json.loads(cached)
+    except Exception as e:
+        print(f"Redis get error: {e}")
+    return None
+
+
+async def _cache_set_json(key: str, value: Any, ttl: int) -> None:
+    from database.database import redis_client
+
+    try:
+        if redis_client:
+            await redis_client.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+    except Exception as e:
+        print(f"Redis set error: {e}")
+
+
+async def _cache_itinerary(trip_data: dict, itinerary: dict, translation_source: bool = True) -> None:
+    """Itinerary'yi önbelleğe yaz; üretilmiş (çevrilmemiş) olanlar çeviri kaynağı olarak işaretlenir."""
+    from database.database import redis_client
+
+    await _cache_set_json(_itinerary_cache_key(trip_data), itinerary, ITINERARY_CACHE_TTL)
+    try:
+        if redis_client and translation_source:
+            languages_key = _itinerary_languages_key(trip_data)
+            await redis_client.sadd(languages_key, _normalized_language(trip_data))
+            await redis_client.expire(languages_key, ITINERARY_CACHE_TTL)
+    except Exception as e:
+        print(f"Redis set error: {e}")
+
+
+async def _cached_itinerary_in_other_language(trip_data: dict) -> dict | None:
+    """Aynı gezi şeklinin başka bir dilde önbellekteki itinerary'si (varsa)."""
+    from database.database import redis_client
+
+    try:
+        if not redis_client:
+            return None
+        languages = await redis_client.smembers(_itinerary_languages_key(trip_data))
+    except Exception as e:
+        print(f"Redis get error: {e}")
+        return None
+
+    target = _normalized_language(trip_data)
+    for language in sorted(languages):
+        language = language.decode() if isinstance(language, bytes) else language
+        if language == target:
+            continue
+        source = await _cache_get_json(_itinerary_cache_key(trip_data, language))
+        if source:
+            return source
+    return None
+
+
+def _translatable_slots(itinerary: dict) -> list[tuple[dict, str]]:
+    """Çevrilecek (sözlük, alan) çiftleri; sadece harf içeren metinler (ör. "2h" değil "2 hours")."""
+    slots = []
+
+    def collect(container: Any, fields: tuple[str, ...]) -> None:
+        if not isinstance(container, dict):
+            return
+        for field in fields:
+            value = container.get(field)
+            if isinstance(value, str) and re.search(r"[^\W\d_]{2,}", value):
+                slots.append((container, field))
+
+    collect(itinerary.get("trip_summary"), SUMMARY_TEXT_FIELDS)
+    for day in itinerary.get("daily_itinerary") or []:
+        collect(day, DAY_TEXT_FIELDS)
+        for activity in (day.get("activities") or []) if isinstance(day, dict) else []:
+            collect(activity, ACTIVITY_TEXT_FIELDS)
+    return slots
 
 
-async def generate_detailed_trip_itinerary(trip_data: dict):
-    """Generate a compact day-by-day itinerary as strict JSON using Gemini 2.5 Flash."""
+def _translation_memory_key(language: str, text: str) -> str:
+    return f"tm:{language}:{hashlib.sha256(text.encode()).hexdigest()[:32]}"
 
-    api_keys = _get_api_keys()
-    if not api_keys:
+
+def _remember_locally(key: str, translated: str) -> None:
+    _local_translations[key] = translated
+    _local_translations.move_to_end(key)
+    while len(_local_translations) > TRANSLATION_MEMORY_LOCAL_SIZE:
+        _local_translations.popitem(last=False)
+
+
+async def _translation_memory_get(language: str, texts: list[str]) -> dict[str, str]:
+    from database.database import redis_client
+
+    found = {}
+    remote = []
+    for text in texts:
+        key = _translation_memory_key(language, text)
+        if key in _local_translations:
+            _local_translations.move_to_end(key)
+            found[text] = _local_translations[key]
+        else:
+            remote.append(text)
+
+    try:
+        if redis_client and remote:
+            values = await redis_client.mget([_translation_memory_key(language, t) for t in remote])
+            for text, value in zip(remote, values):
+                if value is not None:
+                    found[text] = value.decode() if isinstance(value, bytes) else value
+                    _remember_locally(_translation_memory_key(language, text), found[text])
+    except Exception as e:
+        print(f"Redis get error: {e}")
+    return found
+
+
+async def _translation_memory_set(language: str, translations: dict[str, str]) -> None:
+    from database.database import redis_client
+
+    for text, translated in translations.items():
+        _remember_locally(_translation_memory_key(language, text), translated)
+    try:
+        if redis_client and translations:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for text, translated in translations.items():
+                    pipe.set(_translation_memory_key(language, text), translated, ex=TRANSLATION_MEMORY_TTL)
+                await pipe.execute()
+    except Exception as e:
+        print(f"Redis set error: {e}")
+
+
+async def _translate_strings(texts: list[str], language: str) -> dict[str, str]:
+    """Metin listesini tek, kısa bir Gemini isteğiyle çevir (lite model, thinking kapalı)."""
+    strings = json.dumps(texts, ensure_ascii=False)
+    payload = {
+        "contents": [{"parts": [{"text": TRANSLATION_PROMPT.format(language=language, strings=strings)}]}],
+        "generationConfig": {"temperature": 0.2, "response_mime_type": "application/json"},
+    }
+
+    def quality(answer: dict) -> str:
+        translations = answer.get("translations") if isinstance(answer, dict) else None
+        if not isinstance(translations, list) or len(translations) != len(texts):
+            return "wrong_length"
+        return "ok"
+
+    answer = await _call_gemini_json(payload, choices=route_translation(len(strings)), quality_check=quality)
+    if not isinstance(answer, dict):
+        # Çağıran (ör. önbellekten çeviri) ValueError'da yeniden üretime düşer
+        raise ValueError("Translation answer is not a JSON object")
+    if quality(answer) != "ok":
+        raise ValueError("Translation returned a different number of strings")
+    return {text: str(translated) for text, translated in zip(texts, answer["translations"])}
+
+
+async def _translate_slots(slots: list[tuple[dict, str]], trip_data: dict, plan: str) -> None:
+    """Verilen (sözlük, alan) metinlerini yerinde çevir: önce çeviri belleği, kalanlar tek kısa istekle."""
+    language = _normalized_language(trip_data)
+    texts = list(dict.fromkeys(container[field] for container, field in slots))
+
+    memory = await _translation_memory_get(language, texts)
+    missing = [text for text in texts if text not in memory]
+    metrics.inc("translation_memory.hit", len(texts) - len(missing))
+    metrics.inc("translation_memory.miss", len(missing))
+
+    if missing:
+        async with trip_admission.slot(plan):
+            fresh = await _translate_strings(missing, (trip_data.get("language") or "Turkish").strip())
+        memory.update(fresh)
+        spawn_background(_translation_memory_set(language, fresh))
+
+    for container, field in slots:
+        container[field] = memory[container[field]]
+
+
+async def _translate_cached_itinerary(trip_data: dict, plan: str) -> dict | None:
+    """
+    Başka dilde önbellekte olan itinerary'yi hedef dile çevir: yalnızca metin alanları,
+    önce çeviri belleğinden, kalanlar tek bir kısa istekle. Yapı ve koordinatlar korunur.
+    """
+    source = await _cached_itinerary_in_other_language(trip_data)
+    if source is None:
+        return None
+
+    translated = copy.deepcopy(source)
+    await _translate_slots(_translatable_slots(translated), trip_data, plan)
+    return translated
+
+
+async def generate_detailed_trip_itinerary(trip_data: dict, plan: str = "free"):
+    """Generate a compact day-by-day itinerary as strict JSON using the routed Gemini model."""
+
+    if not key_pool.keys():
         raise HTTPException(
             status_code=500,
             detail="GOOGLE_API_KEY was not found. Check your .env file.",
         )
 
+    cache_key = _itinerary_cache_key(trip_data)
+    cached_itinerary = await _cache_get_json(cache_key)
+    if cached_itinerary:
+        metrics.inc("itinerary_cache.hit")
+        print(f"⚡ Itinerary cache hit: {trip_data.get('city')}")
+        return cached_itinerary
+    metrics.inc("itinerary_cache.miss")
+
+    # Aynı gezi başka bir dilde üretilmişse yeniden üretmek yerine metinleri çevir
+    try:
+        translated = await _translate_cached_itinerary(trip_data, plan)
+    except (HTTPException, ValueError) as exc:
+        print(f"Itinerary translation failed, regenerating: {getattr(exc, 'detail', exc)}")
+        translated = None
+    if translated is not None:
+        metrics.inc("itinerary_cache.translated")
+        print(f"🌐 Itinerary translated from cache: {trip_data.get('city')}")
+        # Çeviriden çeviri yapılmasın diye kaynak olarak işaretlenmez
+        spawn_background(_cache_itinerary(trip_data, translated, translation_source=False))
+        return translated
+
     city = trip_data.get("city", "Istanbul")
     days = int(trip_data.get("days", 3))
+    target_language = (trip_data.get("language") or "Turkish").strip() or "Turkish"
+
+    prompt = f"""
+Create a {days}-day travel itinerary for {city} in {target_language}.
+{_trip_preferences(trip_data)}
+- trip_summary.duration_days must be {days} and daily_itinerary must have {days} days.
+"""
+    payload = _itinerary_payload(prompt)
+    candidates = await _catalog_candidates(city) if CATALOG_ASSEMBLY_ENABLED else []
+
+    context_task = gemini_task = None
+    try:
+        async with asyncio.TaskGroup() as tg:
+            context_task = tg.create_task(get_country_context(city))
+            gemini_task = tg.create_task(_plan_itinerary(trip_data, payload, plan, candidates))
+    except asyncio.CancelledError:
+        gemini_done = gemini_task is not None and gemini_task.done() and not gemini_task.cancelled()
+        metrics.inc("llm.cancelled", stage="enrichment" if gemini_done else "gemini")
+        # Gemini yanıtı geldiyse sadece zenginleştirme kaldı: sonucu yine de cache'le
+        if gemini_done and gemini_task.exception() is None:
+            spawn_background(_cache_itinerary(trip_data, gemini_task.result()))
+        raise
+    except BaseExceptionGroup as group:
+        raise unwrap_group(group) from None
+
+    itinerary = gemini_task.result()
+    _, country_flag = context_task.result()
+    if country_flag:
+        itinerary["country_flag"] = country_flag
+
+    spawn_background(_cache_itinerary(trip_data, itinerary))
+    return itinerary
+
+
+def personalization_profile(user: Any) -> dict:
+    """Kullanıcının kişiselleştirmede kullanılan alanları (normalize: listeler sıralı, metinler kırpılmış)."""
+    profile = {}
+    for field in PERSONALIZATION_FIELDS:
+        value = getattr(user, field, None)
+        if isinstance(value, list):
+            value = sorted({str(item).strip().lower() for item in value if str(item).strip()})
+        elif isinstance(value, str):
+            value = value.strip() or None
+        profile[field] = value or None
+    return profile
+
+
+def _profile_hash(profile: dict) -> str:
+    return hashlib.sha256(json.dumps(profile, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _personalized_cache_key(user_id: int) -> str:
+    return f"personalized:{user_id}"
+
+
+async def invalidate_personalized_trip(user_id: int) -> None:
+    """Profil alanları değiştiğinde (PUT /api/auth/me) çağrılır."""
+    from database.database import redis_client
+
+    try:
+        if redis_client:
+            await redis_client.delete(_personalized_cache_key(user_id))
+    except Exception as e:
+        print(f"Redis delete error: {e}")
+
+
+async def generate_personalized_trip_plan(user_id: int, profile: dict, plan: str = "free") -> tuple[dict, bool]:
+    """
+    Profile göre destinasyon + kısa gezi önerisi. Sonuç kullanıcı başına, profil özetiyle
+    birlikte önbelleklenir; profil değişmedikçe tekrar istek LLM'e gitmez. (plan, cache_hit) döner.
+    """
+    cache_key = _personalized_cache_key(user_id)
+    profile_hash = _profile_hash(profile)
+    cached = await _cache_get_json(cache_key)
+    if cached and cached.get("profile_hash") == profile_hash:
+        metrics.inc("personalized_cache.hit")
+        return cached["plan"], True
+    metrics.inc("personalized_cache.miss")
+
+    if not key_pool.keys():
+        raise HTTPException(
+            status_code=500,
+            detail="GOOGLE_API_KEY was not found. Check your .env file.",
+        )
+
+    profile_lines = "\n".join(
+        f"- {field}: {', '.join(value) if isinstance(value, list) else value}"
+        for field, value in profile.items()
+        if value
+    )
+    prompt = f"""
+Traveler profile:
+{profile_lines or '- no preferences given'}
+- recommendations must have {PERSONALIZED_TRIP_DAYS} days.
+"""
+    payload = _itinerary_payload(prompt)
+
+    def quality(answer: dict) -> str:
+        recommendations = answer.get("recommendations")
+        if not answer.get("destination") or not isinstance(recommendations, list) or not recommendations:
+            return "missing_recommendations"
+        return "ok"
+
+    async with trip_admission.slot(plan):
+        result = await _call_gemini_json(
+            payload, PERSONALIZED_PROMPT_PREFIX, route(PERSONALIZED_TRIP_DAYS, plan), quality
+        )
+    if quality(result) != "ok":
+        raise HTTPException(status_code=502, detail="Gemini returned an invalid personalized plan. Please try again.")
+
+    spawn_background(
+        _cache_set_json(cache_key, {"profile_hash": profile_hash, "plan": result}, PERSONALIZED_CACHE_TTL)
+    )
+    return result, False
+
+
+def _trip_preferences(trip_data: dict) -> str:
+    """Prompt'un kullanıcı tercihleri kısmı (serbest ve katalog modunda ortak)."""
     travelers = trip_data.get("travelers", "yalniz")
     interests = trip_data.get("interests", [])
     budget = trip_data.get("budget", "orta")
     transport = trip_data.get("transport", "farketmez")
     start_date = trip_data.get("start_date", "")
-    target_language = (trip_data.get("language") or "Turkish").strip() or "Turkish"
-
-    _, country_flag = await get_country_context(city)
 
     interests_text = ", ".join(interests) if interests else "general tourism"
 
@@ -223,61 +759,15 @@ async def generate_detailed_trip_itinerary(trip_data: dict):
     }
     budget_context = budget_guides.get(str(budget).lower(), "mid-range")
 
-    prompt = f"""
-Create a {days}-day travel itinerary for {city} in {target_language}.
-Return only one JSON object.
-
-Rules:
-- Use real, geographically plausible places.
-- Keep descriptions very short.
-- Match a {budget_context} budget.
+    return f"""- Budget: {budget_context}
 - Traveler type: {traveler_context}
 - Interests: {interests_text}
 - Transport: {transport}
-- Start date: {start_date or 'not provided'}
-- Keep the itinerary practical and concise.
+- Start date: {start_date or 'not provided'}"""
 
-JSON shape:
-{{
-    "trip_summary": {{
-        "destination": "string",
-        "duration_days": {days},
-        "travelers": "string",
-        "total_estimated_cost": "string",
-        "best_season": "string",
-        "weather_forecast": "string"
-    }},
-    "daily_itinerary": [
-        {{
-            "day": 1,
-            "date": "string",
-            "title": "string",
-            "activities": [
-                {{
-                    "time": "string",
-                    "name": "string",
-                    "type": "string",
-                    "address": "string",
-                    "coordinates": {{"lat": 0.0, "lng": 0.0}},
-                    "duration": "string",
-                    "cost": "string",
-                    "description": "string"
-                }}
-            ],
-            "estimated_daily_budget": "string",
-            "transportation_note": "string"
-        }}
-    ]
-}}
-"""
 
-    # Retry delays: Attempt 0->1: 2s, 1->2: 4s, 2->3: 8s
-    RATE_LIMIT_DELAYS = [2, 4, 8]
-    MAX_ATTEMPTS = len(RATE_LIMIT_DELAYS) + 1  # 4 total
-
-    timeout = httpx.Timeout(connect=30.0, read=120.0, write=30.0, pool=30.0)
-
-    payload = {
+def _itinerary_payload(prompt: str) -> dict:
+    return {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {
             "temperature": 0.5,
@@ -294,23 +784,358 @@ JSON shape:
         ],
     }
 
-    response = None
-    last_error_detail = None
-    key_index = 0
 
-    for attempt in range(MAX_ATTEMPTS):
-        # Rotate to next API key on each retry (if multiple keys available)
-        current_key = api_keys[key_index % len(api_keys)]
-        key_index += 1
+async def _catalog_candidates(city: str) -> list[dict]:
+    """Şehir için en popüler katalog mekânları (Redis'te 1 saat; boş sonuç da cache'lenir)."""
+    cache_key = f"catalog_candidates:{normalize_name(city)}"
+    cached = await _cache_get_json(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        async with AsyncSessionLocal() as db:
+            places = await top_places(db, city, limit=CATALOG_CANDIDATE_LIMIT)
+    except Exception as e:
+        print(f"Place catalog lookup failed: {e}")
+        return []
+
+    candidates = [
+        {
+            "id": place.id,
+            "name": place.name,
+            "type": place.type,
+            "address": place.address,
+            "description": place.description,
+            "lat": place.lat,
+            "lng": place.lng,
+        }
+        for place in places
+    ]
+    spawn_background(_cache_set_json(cache_key, candidates, CATALOG_CANDIDATE_TTL))
+    return candidates
+
 
-        url = (
-            "https://generativelanguage.googleapis.com/v1beta/models/"
-            f"gemini-2.5-flash:generateContent?key={current_key}"
+def _parse_stop(stop: Any) -> tuple[Any, str, str, str]:
+    """[id, time, duration, cost] (veya aynı alanlara sahip bir obje)."""
+    if isinstance(stop, dict):
+        return stop.get("id"), stop.get("time", ""), stop.get("duration", ""), stop.get("cost", "")
+    if isinstance(stop, list) and stop:
+        padded = list(stop) + [""] * 3
+        return padded[0], str(padded[1]), str(padded[2]), str(padded[3])
+    return None, "", "", ""
+
+
+def _catalog_stop_ids(answer: dict, candidates_by_id: dict[int, dict]) -> list[list[int]]:
+    """Gün başına geçerli, tekrar etmeyen aday id'leri (bilinmeyenler atılır)."""
+    used, result = set(), []
+    for day in answer.get("days") or []:
+        ids = []
+        for stop in (day.get("stops") or []) if isinstance(day, dict) else []:
+            try:
+                stop_id = int(_parse_stop(stop)[0])
+            except (TypeError, ValueError):
+                continue
+            if stop_id in candidates_by_id and stop_id not in used:
+                used.add(stop_id)
+                ids.append(stop_id)
+        result.append(ids)
+    return result
+
+
+def _catalog_quality(days: int, candidates_by_id: dict[int, dict]) -> Callable[[dict], str]:
+    def check(answer: dict) -> str:
+        stop_ids = _catalog_stop_ids(answer, candidates_by_id)
+        if len(stop_ids) != days:
+            return "wrong_days"
+        if any(not ids for ids in stop_ids):
+            return "missing_activities"
+        return "ok"
+
+    return check
+
+
+def _build_catalog_itinerary(answer: dict, trip_data: dict, candidates_by_id: dict[int, dict]) -> dict:
+    """LLM'in seçtiği id'lerden standart itinerary şeklini sunucu tarafında kur."""
+    days = int(trip_data.get("days", 3))
+    summary = answer.get("trip_summary") or {}
+    try:
+        start = date.fromisoformat(trip_data.get("start_date") or "")
+    except ValueError:
+        start = None
+
+    daily_itinerary = []
+    for index, (day, ids) in enumerate(zip(answer["days"], _catalog_stop_ids(answer, candidates_by_id)), start=1):
+        stops = {}
+        for stop in day.get("stops") or []:
+            stop_id, time_, duration, cost = _parse_stop(stop)
+            try:
+                stops.setdefault(int(stop_id), (time_, duration, cost))
+            except (TypeError, ValueError):
+                continue
+
+        activities = []
+        for stop_id in ids:
+            place = candidates_by_id[stop_id]
+            time_, duration, cost = stops[stop_id]
+            activities.append(
+                {
+                    "time": time_,
+                    "name": place["name"],
+                    "type": place.get("type") or "",
+                    "address": place.get("address") or "",
+                    "coordinates": {"lat": place["lat"], "lng": place["lng"]},
+                    "duration": duration,
+                    "cost": cost,
+                    "description": place.get("description") or "",
+                }
+            )
+        daily_itinerary.append(
+            {
+                "day": index,
+                "date": (start + timedelta(days=index - 1)).isoformat() if start else "",
+                "title": day.get("title", ""),
+                "activities": activities,
+                "estimated_daily_budget": day.get("estimated_daily_budget", ""),
+                "transportation_note": day.get("transportation_note", ""),
+            }
+        )
+
+    return {
+        "trip_summary": {
+            "destination": trip_data.get("city", ""),
+            "duration_days": days,
+            "travelers": summary.get("travelers", ""),
+            "total_estimated_cost": summary.get("total_estimated_cost", ""),
+            "best_season": summary.get("best_season", ""),
+            "weather_forecast": summary.get("weather_forecast", ""),
+        },
+        "daily_itinerary": daily_itinerary,
+    }
+
+
+async def _assemble_from_catalog(trip_data: dict, plan: str, candidates: list[dict]) -> dict:
+    """
+    Katalog destekli mod: LLM'e sadece aday id + kısa isim gönderilir, o da seçip
+    günlere dağıtır. Çıktı birkaç yüz token olur; detaylar katalogdan doldurulur.
+    """
+    city = trip_data.get("city", "Istanbul")
+    days = int(trip_data.get("days", 3))
+    target_language = (trip_data.get("language") or "Turkish").strip() or "Turkish"
+    candidates_by_id = {candidate["id"]: candidate for candidate in candidates}
+    candidate_lines = "\n".join(f"{c['id']}|{c['name']}|{c.get('type') or ''}" for c in candidates)
+
+    # Aday listesi istek gövdesinde gider: önek şehirden bağımsız kalır (şehir başına cache açılmaz)
+    prompt = f"""
+Candidate places in {normalize_name(city)} (id|name|type):
+{candidate_lines}
+
+Plan a {days}-day trip to {city} in {target_language} using only the candidate places.
+{_trip_preferences(trip_data)}
+- "days" must have {days} items.
+"""
+    quality = _catalog_quality(days, candidates_by_id)
+    async with trip_admission.slot(plan):
+        answer = await _call_gemini_json(_itinerary_payload(prompt), CATALOG_PROMPT_PREFIX, route(days, plan), quality)
+    outcome = quality(answer)
+    if outcome != "ok":
+        raise ValueError(f"Catalog assembly rejected ({outcome})")
+
+    itinerary = _build_catalog_itinerary(answer, trip_data, candidates_by_id)
+
+    # Katalog metinleri başka bir dilde olabilir: tip ve açıklamaları çeviri belleğiyle yerelleştir
+    slots = [
+        (activity, field)
+        for day in itinerary["daily_itinerary"]
+        for activity in day["activities"]
+        for field in ("type", "description")
+        if activity[field]
+    ]
+    await _translate_slots(slots, trip_data, plan)
+    return itinerary
+
+
+async def _plan_itinerary(trip_data: dict, payload: dict, plan: str, candidates: list[dict]) -> dict[str, Any]:
+    """Katalogda yeterli aday varsa katalog modu, yoksa (veya reddedilirse) serbest üretim."""
+    days = int(trip_data.get("days", 3))
+    started_at = time.monotonic()
+
+    if len(candidates) >= max(CATALOG_MIN_PLACES, days * CATALOG_STOPS_PER_DAY):
+        try:
+            itinerary = await _assemble_from_catalog(trip_data, plan, candidates)
+            metrics.observe("itinerary.generation_seconds", time.monotonic() - started_at, mode="catalog")
+            return itinerary
+        except ValueError as exc:
+            metrics.inc("itinerary.catalog_fallback", reason="rejected")
+            print(f"Catalog assembly failed, falling back to free-form: {exc}")
+        except HTTPException as exc:
+            # Kota, aşırı yük ve deadline hataları serbest üretimde de tekrarlanır: doğrudan dön
+            if exc.status_code in CATALOG_NO_FALLBACK_STATUSES:
+                raise
+            metrics.inc("itinerary.catalog_fallback", reason=str(exc.status_code))
+            print(f"Catalog assembly failed ({exc.status_code}), falling back to free-form: {exc.detail}")
+
+    itinerary = await _request_gemini_itinerary(payload, plan, ITINERARY_PROMPT_PREFIX, days)
+    metrics.observe("itinerary.generation_seconds", time.monotonic() - started_at, mode="freeform")
+    return itinerary
+
+
+def _itinerary_outline(itinerary: dict) -> str:
+    """Düzenleme istemi için kısa özet: patch yolları + saat, isim, tip (açıklama/adres yok)."""
+    lines = []
+    for d, day in enumerate(itinerary.get("daily_itinerary") or []):
+        lines.append(f'/daily_itinerary/{d} (day {day.get("day", d + 1)}): {day.get("title", "")}')
+        for i, activity in enumerate(day.get("activities") or []):
+            lines.append(
+                f"  /activities/{i} {activity.get('time', '')} {activity.get('name', '')}"
+                f" | {activity.get('type', '')} | {activity.get('duration', '')}"
+            )
+    return "\n".join(lines)
+
+
+async def refine_itinerary(
+    itinerary: dict,
+    instruction: str,
+    plan: str = "free",
+    language: str = "Turkish",
+) -> tuple[dict, list[dict]]:
+    """
+    Mevcut itinerary'yi talimata göre artımlı düzenle. LLM yalnızca bir JSON Patch döner;
+    çıktı boyutu ve süre değişiklikle orantılıdır, gezi uzunluğuyla değil.
+    """
+    if not key_pool.keys():
+        raise HTTPException(
+            status_code=500,
+            detail="GOOGLE_API_KEY was not found. Check your .env file.",
+        )
+
+    city = (itinerary.get("trip_summary") or {}).get("destination", "")
+    prompt = f"""
+Itinerary for {city} (write new text in {language.strip() or 'Turkish'}):
+{_itinerary_outline(itinerary)}
+
+Instruction: {instruction.strip()}
+"""
+    payload = _itinerary_payload(prompt)
+    payload["generationConfig"]["temperature"] = 0.3
+
+    def patch_of(answer: Any) -> Any:
+        # Model bazen nesne yerine çıplak bir dizi/metin döner: geçersiz patch sayılır (500 değil 502)
+        return answer.get("patch") if isinstance(answer, dict) else None
+
+    def quality(answer: dict) -> str:
+        try:
+            apply_patch(itinerary, validate_patch(patch_of(answer)))
+        except PatchError:
+            return "invalid_patch"
+        return "ok"
+
+    async with trip_admission.slot(plan):
+        answer = await _call_gemini_json(payload, REFINE_PROMPT_PREFIX, route_refine(plan), quality)
+
+    try:
+        ops = validate_patch(patch_of(answer))
+        refined = apply_patch(itinerary, ops)
+    except PatchError as exc:
+        print(f"Invalid refine patch: {exc}")
+        raise HTTPException(
+            status_code=502,
+            detail="Gemini returned an invalid change set. Please rephrase and try again.",
         )
 
+    metrics.observe("refine.patch_ops", len(ops))
+    print(f"✏️ Refine: {len(ops)} işlem, değişen günler: {[d + 1 for d in touched_days(ops)]}")
+    return refined, ops
+
+
+def _itinerary_quality(days: int) -> Callable[[dict], str]:
+    """Model kalitesi metriği için kaba yapı kontrolü (istenen gün sayısı ve aktiviteler)."""
+
+    def check(itinerary: dict) -> str:
+        daily = itinerary.get("daily_itinerary")
+        if not isinstance(daily, list) or len(daily) != days:
+            return "wrong_days"
+        if any(not day.get("activities") for day in daily if isinstance(day, dict)):
+            return "missing_activities"
+        return "ok"
+
+    return check
+
+
+async def _request_gemini_itinerary(payload: dict, plan: str, static_prefix: str, days: int) -> dict[str, Any]:
+    """Wait for an admission slot, then call Gemini and parse the itinerary JSON."""
+
+    async with trip_admission.slot(plan):
+        # Model, slot alındığı andaki havuz baskısına göre seçilir
+        choices = route(days, plan)
+        return await _call_gemini_json(payload, static_prefix, choices, _itinerary_quality(days))
+
+
+def _finish_reason(response: httpx.Response) -> str | None:
+    try:
+        return response.json()["candidates"][0].get("finishReason")
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+async def _call_gemini_json(
+    payload: dict,
+    static_prefix: str | None = None,
+    choices: list[ModelChoice] | None = None,
+    quality_check: Callable[[dict], str] | None = None,
+) -> dict[str, Any]:
+    """Call Gemini with key rotation and the shared retry policy, then parse the JSON answer.
+
+    `choices` is the model routing chain: a 503 from one model moves the next attempt to the
+    following model. Without it the payload is sent unchanged to the default model.
+    """
+
+    timeout = httpx.Timeout(connect=30.0, read=120.0, write=30.0, pool=30.0)
+    current_key = None
+    key_count = len(key_pool.keys())
+    choice_index = 0
+    started_at = time.monotonic()
+
+    def current_model() -> str:
+        return choices[choice_index].model if choices else GEMINI_MODEL
+
+    def current_payload() -> dict:
+        if not choices:
+            return payload
+        generation_config = choices[choice_index].generation_config(payload.get("generationConfig", {}))
+        return {**payload, "generationConfig": generation_config}
+
+    async def attempt_call(attempt: int) -> httpx.Response:
+        nonlocal current_key
+        # Rotate to the least-loaded other key on each retry (if multiple keys available)
+        current_key = key_pool.pick(exclude={current_key} if current_key else None)
+        return await generate_content(
+            current_key, current_payload(), timeout, model=current_model(), static_prefix=static_prefix
+        )
+
+    def on_retry(attempt: int, wait_sec: float, response: httpx.Response | None, error: Exception | None):
+        nonlocal choice_index
+        if response is not None and response.status_code == 503 and choices and choice_index + 1 < len(choices):
+            # Model aşırı yüklü: bir sonraki denemeyi yedek modelle yap
+            metrics.inc("gemini.model_fallback", from_model=current_model(), to_model=choices[choice_index + 1].model)
+            print(f"🔀 {current_model()} 503 döndü, {choices[choice_index + 1].model} modeline geçiliyor")
+            choice_index += 1
+        key_hint = f" (deneniyor: {key_count} anahtarlı havuz)" if key_count > 1 else ""
+        if response is not None:
+            key_pool.cool_down(current_key, wait_sec)
+            reason = f"HATA KODU: {response.status_code}"
+        else:
+            reason = f"Ağ hatası: {type(error).__name__}"
+        metrics.inc("gemini.retries", reason=response.status_code if response is not None else type(error).__name__)
+        print(f"⚠️ {reason}. ⏳ Yeniden deneniyor (deneme {attempt + 1}/{GEMINI_RETRY_POLICY.max_attempts}). {wait_sec:.1f}s bekleniyor{key_hint}...")
+
+    async def send() -> httpx.Response:
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(url, headers={"Content-Type": "application/json"}, json=payload)
+            return await GEMINI_RETRY_POLICY.run(attempt_call, on_retry=on_retry)
+        except DeadlineExceeded:
+            raise HTTPException(
+                status_code=504,
+                detail="Gemini API did not answer within the request deadline. Try fewer days and retry.",
+            )
         except httpx.ConnectTimeout:
             raise HTTPException(
                 status_code=504,
@@ -324,20 +1149,22 @@ JSON shape:
         except httpx.RequestError as exc:
             raise HTTPException(status_code=500, detail=f"Gemini request failed: {exc}")
 
-        if response.status_code == 200:
-            break
+    response = await send()
+    if response.status_code == 200 and _finish_reason(response) == "MAX_TOKENS":
+        # Çıktı bütçesi yetmedi (JSON yarım kalır): bir kez daha büyük bütçeyle dene
+        metrics.inc("llm.quality", model=current_model(), outcome="truncated")
+        expanded = choices[choice_index].expanded() if choices else None
+        if expanded is not None:
+            print(f"✂️ {current_model()} çıktısı {choices[choice_index].max_output_tokens} tokenda kesildi, {expanded.max_output_tokens} ile tekrar deneniyor")
+            choices = [*choices[:choice_index], expanded, *choices[choice_index + 1:]]
+            response = await send()
+            if response.status_code == 200 and _finish_reason(response) == "MAX_TOKENS":
+                metrics.inc("llm.quality", model=current_model(), outcome="truncated")
 
-        response_text = response.text[:600]
-        last_error_detail = f"Gemini API error ({response.status_code}): {response_text}"
+    if response.status_code != 200:
+        last_error_detail = f"Gemini API error ({response.status_code}): {response.text[:600]}"
         is_rate_limit = response.status_code in {429, 503}
 
-        if is_rate_limit and attempt < MAX_ATTEMPTS - 1:
-            wait_sec = RATE_LIMIT_DELAYS[attempt]
-            key_hint = f" (deneniyor: anahtar {key_index % len(api_keys) + 1}/{len(api_keys)})" if len(api_keys) > 1 else ""
-            print(f"⚠️ HATA KODU: {response.status_code}. ⏳ Yeniden deneniyor (deneme {attempt + 1}/{MAX_ATTEMPTS}). {wait_sec}s bekleniyor{key_hint}...")
-            await asyncio.sleep(wait_sec)
-            continue
-
         # Non-retryable error or exhausted retries
         if response.status_code == 503:
             error_msg = f"Gemini API şu an Google sunucularındaki yoğunluk nedeniyle yanıt veremiyor (503 Service Unavailable).\nDetay: {last_error_detail}"
@@ -351,9 +1178,6 @@ JSON shape:
             detail=error_msg,
         )
 
-    if response is None:
-        raise HTTPException(status_code=500, detail="Gemini API request failed before a response was received.")
-
     data = response.json()
     candidates = data.get("candidates", [])
     if not candidates:
@@ -364,9 +1188,11 @@ JSON shape:
     except (KeyError, IndexError, TypeError):
         raise HTTPException(status_code=500, detail="Gemini response shape is invalid.")
 
+    model = current_model()
     try:
         itinerary = _extract_json_object(ai_text)
     except json.JSONDecodeError as parse_err:
+        metrics.inc("llm.quality", model=model, outcome="invalid_json")
         # Log the raw AI text for debugging
         print(f"⚠️ JSON parse failed. Raw AI text (first 1000 chars): {ai_text[:1000]}")
         print(f"⚠️ Parse error: {parse_err}")
@@ -374,8 +1200,15 @@ JSON shape:
             status_code=500,
             detail="AI returned invalid JSON. Please try again.",
         )
+    if not isinstance(itinerary, dict):
+        # json.loads çıplak bir dizi/metin de döndürebilir; kalite kontrolleri ve çağıranlar nesne bekler
+        metrics.inc("llm.quality", model=model, outcome="not_object")
+        print(f"⚠️ AI answer is not a JSON object ({type(itinerary).__name__}): {ai_text[:300]}")
+        raise HTTPException(
+            status_code=502,
+            detail="AI returned a non-object answer. Please try again.",
+        )
 
-    if country_flag:
-        itinerary["country_flag"] = country_flag
-
+    metrics.inc("llm.quality", model=model, outcome=quality_check(itinerary) if quality_check else "ok")
+    metrics.observe("llm.generation_seconds", time.monotonic() - started_at, model=model)
     return itinerary
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Küçük, bağımlılıksız in-process metrik kaydı.
+Sayaç, gauge ve histogram tutar; /api/metrics bunların anlık görüntüsünü döner.
+"""
+import threading
+from collections import deque
+
+# Histogram başına saklanan son örnek sayısı (yüzdelik hesapları için)
+HISTOGRAM_WINDOW = 2048
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_histograms: dict[str, "_Histogram"] = {}
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples: deque[float] = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+        }
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram()
+        histogram.observe(value)
+
+
+def counter_value(name: str, **labels) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def percentile(name: str, q: float, **labels) -> float | None:
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        return histogram.percentile(q) if histogram else None
+
+
+def samples(name: str, **labels) -> list[float]:
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        return list(histogram.samples) if histogram else []
+
+
+def histogram_count(name: str, **labels) -> int:
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        return histogram.count if histogram else 0
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {key: h.summary() for key, h in _histograms.items()},
+        }
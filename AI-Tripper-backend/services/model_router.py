@@ -0,0 +1,106 @@
+"""
+Gemini model yönlendirme.
+
+Her istek için model, maxOutputTokens ve thinking bütçesi seçilir:
+- Kısa geziler (varsayılan 1-2 gün) lite modele gider.
+- Anahtar havuzu baskısı yüksekse (overload) ücretsiz plan lite modele düşer,
+  ücretli planlarda thinking kapatılır.
+- Tercih edilen model 503 dönerse zincirdeki bir sonraki modele geçilir.
+
+Eşikler ortam değişkenleriyle ayarlanabilir; ayar için /api/metrics altındaki
+gemini.request_seconds{model} ve llm.quality{model,outcome} metriklerine bakın.
+"""
+import os
+from dataclasses import dataclass, replace
+
+from services.gemini_client import GEMINI_MODEL
+from services.key_pool import key_pool
+
+STANDARD_MODEL = os.getenv("GEMINI_MODEL_STANDARD", GEMINI_MODEL)
+LITE_MODEL = os.getenv("GEMINI_MODEL_LITE", "gemini-2.5-flash-lite")
+
+# Bu gün sayısına kadar (dahil) lite model yeterli
+LITE_MAX_DAYS = int(os.getenv("ROUTER_LITE_MAX_DAYS", 2))
+# key_pool.pressure() bu değeri aşarsa overload sayılır
+OVERLOAD_PRESSURE = float(os.getenv("ROUTER_OVERLOAD_PRESSURE", 0.85))
+
+# Plan başına thinking bütçesi (token); 0 = kapalı
+THINKING_BUDGETS = {"free": 0, "premium": 512, "pro": 1024}
+
+# Çıktı bütçesi: sabit kısım + gün başına (thinking tokenları da bu sınıra dahildir).
+# llm.quality{outcome="truncated"} artıyorsa yükseltin
+OUTPUT_TOKENS_BASE = int(os.getenv("ROUTER_OUTPUT_TOKENS_BASE", 600))
+OUTPUT_TOKENS_PER_DAY = int(os.getenv("ROUTER_OUTPUT_TOKENS_PER_DAY", 900))
+MAX_OUTPUT_TOKENS = 8192
+# finishReason=MAX_TOKENS olursa tek tekrar bu katsayıyla büyütülmüş bütçeyle yapılır
+TRUNCATION_RETRY_FACTOR = 2
+
+
+@dataclass(frozen=True)
+class ModelChoice:
+    model: str
+    max_output_tokens: int
+    thinking_budget: int
+    reason: str
+
+    def generation_config(self, base: dict) -> dict:
+        return {
+            **base,
+            "maxOutputTokens": self.max_output_tokens,
+            "thinkingConfig": {"thinkingBudget": self.thinking_budget},
+        }
+
+    def expanded(self) -> "ModelChoice | None":
+        """Çıktı kesildiğinde tekrar için daha büyük bütçe; zaten tavandaysa None."""
+        if self.max_output_tokens >= MAX_OUTPUT_TOKENS:
+            return None
+        budget = min(MAX_OUTPUT_TOKENS, self.max_output_tokens * TRUNCATION_RETRY_FACTOR)
+        return replace(self, max_output_tokens=budget, reason=f"{self.reason}+truncated")
+
+
+def _output_tokens(days: int, thinking_budget: int) -> int:
+    return min(MAX_OUTPUT_TOKENS, OUTPUT_TOKENS_BASE + OUTPUT_TOKENS_PER_DAY * max(1, days) + thinking_budget)
+
+
+def route(days: int, plan: str = "free", pressure: float | None = None) -> list[ModelChoice]:
+    """Tercih sırasına göre model seçenekleri; ilki birincil, diğerleri 503 yedekleri."""
+    pressure = key_pool.pressure() if pressure is None else pressure
+    overloaded = pressure >= OVERLOAD_PRESSURE
+    thinking = 0 if overloaded else THINKING_BUDGETS.get(plan, 0)
+
+    if days <= LITE_MAX_DAYS:
+        primary, reason = LITE_MODEL, "short_trip"
+    elif overloaded and plan == "free":
+        primary, reason = LITE_MODEL, "overload"
+    else:
+        primary, reason = STANDARD_MODEL, "overload_no_thinking" if overloaded else "default"
+
+    # Lite modelde thinking varsayılan olarak kapalıdır; açık bütçe vermiyoruz
+    primary_thinking = 0 if primary == LITE_MODEL else thinking
+    fallback = STANDARD_MODEL if primary == LITE_MODEL else LITE_MODEL
+    fallback_thinking = 0 if fallback == LITE_MODEL else thinking
+
+    choices = [ModelChoice(primary, _output_tokens(days, primary_thinking), primary_thinking, reason)]
+    if fallback != primary:
+        choices.append(ModelChoice(fallback, _output_tokens(days, fallback_thinking), fallback_thinking, "fallback"))
+    return choices
+
+
+def route_translation(source_chars: int) -> list[ModelChoice]:
+    """Çeviri her zaman lite modelde ve thinking kapalı yapılır; çıktı girdi uzunluğuyla orantılıdır."""
+    output_tokens = min(MAX_OUTPUT_TOKENS, 256 + source_chars // 2)
+    return [
+        ModelChoice(LITE_MODEL, output_tokens, 0, "translation"),
+        ModelChoice(STANDARD_MODEL, output_tokens, 0, "fallback"),
+    ]
+
+
+def route_refine(plan: str = "free", pressure: float | None = None) -> list[ModelChoice]:
+    """Düzenleme: çıktı sadece patch olduğu için küçük bir sabit bütçe yeterli."""
+    pressure = key_pool.pressure() if pressure is None else pressure
+    thinking = 0 if pressure >= OVERLOAD_PRESSURE else THINKING_BUDGETS.get(plan, 0)
+    output_tokens = 2048
+    return [
+        ModelChoice(STANDARD_MODEL, output_tokens + thinking, thinking, "refine"),
+        ModelChoice(LITE_MODEL, output_tokens, 0, "fallback"),
+    ]
@@ -0,0 +1,99 @@
+"""
+bcrypt işlemlerini event loop dışında, sınırlı bir thread havuzunda çalıştırır.
+
+Tek bir bcrypt hash/verify ~100-250 ms CPU'dur; handler içinde senkron çalışınca o worker'daki
+tüm istekler bekler. bcrypt GIL'i bıraktığı için thread havuzu yeterlidir (process gerekmez).
+
+- En fazla PASSWORD_HASH_WORKERS işlem aynı anda çalışır (CPU sayısıyla sınırlı).
+- Bekleyen iş sayısı PASSWORD_HASH_MAX_QUEUE'yu aşarsa veya sıra PASSWORD_HASH_QUEUE_TIMEOUT
+  içinde gelmezse istek işe başlamadan 503 + Retry-After ile reddedilir (login fırtınası
+  diğer endpoint'lerin CPU'sunu tüketmesin).
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from services import metrics
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 5))  # saniye
+
+
+class PasswordHasher:
+    """CryptContext işlemlerini (hash, verify, verify_and_update) havuzda çalıştırır."""
+
+    def __init__(
+        self,
+        context: CryptContext,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        self.context = context
+        self._workers = max(1, workers)
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="password-hash")
+        self._slots = asyncio.Semaphore(self._workers)
+        self._queued = 0
+        self._in_flight = 0
+
+    def _publish(self) -> None:
+        metrics.set_gauge("auth.hash.in_flight", self._in_flight)
+        metrics.set_gauge("auth.hash.queued", self._queued)
+
+    def _reject(self, op: str, reason: str):
+        metrics.inc("auth.hash.rejected", op=op, reason=reason)
+        print(f"🚦 Parola işlemi reddedildi: op={op}, sebep={reason}, kuyruk={self._queued}")
+        raise HTTPException(
+            status_code=503,
+            detail="Sistem şu an çok yoğun. Lütfen biraz sonra tekrar deneyin.",
+            headers={"Retry-After": "1"},
+        )
+
+    def _finished(self, future) -> None:
+        # İstek iptal edilse bile slot, thread'deki iş gerçekten bittiğinde bırakılır
+        self._in_flight -= 1
+        self._slots.release()
+        self._publish()
+
+    async def _run(self, op: str, fn, *args):
+        if self._queued >= self._max_queue:
+            self._reject(op, "queue_full")
+
+        queued_at = time.perf_counter()
+        self._queued += 1
+        self._publish()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(op, "queue_timeout")
+        finally:
+            self._queued -= 1
+        started_at = time.perf_counter()
+        metrics.observe("auth.hash.queue_wait_ms", (started_at - queued_at) * 1000, op=op)
+
+        self._in_flight += 1
+        self._publish()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(self._finished)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                metrics.observe("auth.hash.ms", (time.perf_counter() - started_at) * 1000, op=op)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Doğrula; hash eski parametrelerle (ör. daha düşük bcrypt cost) üretildiyse yenisini de döndür."""
+        return await self._run("verify", self.context.verify_and_update, password, hashed_password)
@@ -0,0 +1,265 @@
+"""
+Mekân kataloğu: trip planları içindeki aktivitelerden normalize `places` tablosu.
+
+- Artımlı: job_watermarks tablosunda işlenen son trip id'si tutulur, her turda sadece
+  daha yeni trip'ler okunur. id'ler commit sırasına göre gelmediği için (uzun süren bir
+  transaction daha küçük id'yi sonra commit edebilir) watermark'ın altındaki son
+  TRIP_INGEST_RESCAN_WINDOW id de tekrar taranır; bu penceredeki işlenmiş id'ler
+  (recent_ids) atlanır. Birden fazla worker varsa advisory lock ile tek biri çalışır.
+- Tekilleştirme: aynı şehirde aynı normalize isimle ~1 km içinde ya da çok benzer isimle
+  ~80 m içinde olan mekân tek satırdır; tekrar görüldükçe mention_count artar.
+- Mekânsal indeks: geohash hücresi (geocell); yakın aday araması 3x3 komşu hücreyle yapılır.
+"""
+import asyncio
+import math
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import models
+from database.database import AsyncSessionLocal
+from database.plan_codec import decompress_plan
+from services import metrics
+
+JOB_NAME = "place_catalog"
+# pg_try_advisory_xact_lock anahtarı (sabit, job başına tekil)
+ADVISORY_LOCK_ID = 0x706C6163
+
+INGEST_BATCH_SIZE = int(os.getenv("PLACE_CATALOG_BATCH", 200))
+# Saniye; 0 = arka plan işi kapalı (admin_panel ile elle çalıştırılabilir)
+INGEST_INTERVAL = int(os.getenv("PLACE_CATALOG_INTERVAL", 300))
+# Watermark'ın altında tekrar taranan id aralığı (geç commit edilen trip'ler için)
+TRIP_INGEST_RESCAN_WINDOW = int(os.getenv("TRIP_INGEST_RESCAN_WINDOW", 1000))
+
+GEOHASH_PRECISION = 9
+GEOCELL_PRECISION = 6
+SAME_NAME_RADIUS_M = 1000
+SIMILAR_NAME_RADIUS_M = 80
+SIMILAR_NAME_RATIO = 0.8
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        bounds, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits, bounds[0] = bits * 2 + 1, mid
+        else:
+            bits, bounds[1] = bits * 2, mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def neighbor_cells(lat: float, lng: float, precision: int = GEOCELL_PRECISION) -> list[str]:
+    """Noktanın hücresi ve 8 komşusu (hücre sınırındaki eşleşmeler kaçmasın diye)."""
+    lat_bits, lng_bits = precision * 5 // 2, (precision * 5 + 1) // 2
+    dlat, dlng = 180.0 / 2**lat_bits, 360.0 / 2**lng_bits
+    cells = {
+        geohash_encode(max(-90.0, min(90.0, lat + i * dlat)), (lng + j * dlng + 180.0) % 360.0 - 180.0, precision)
+        for i in (-1, 0, 1)
+        for j in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def normalize_name(value: str) -> str:
+    """Aksan/büyük harf/noktalama farklarını yok say ("Ayasofya Camii" == "ayasofya camii.")."""
+    decomposed = unicodedata.normalize("NFKD", value.replace("ı", "i").replace("İ", "I"))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return re.sub(r"[\W_]+", " ", stripped).strip()
+
+
+def _coordinate(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_places(trip_plan: dict | None) -> Iterator[dict]:
+    """trip_plan'daki koordinatlı aktiviteler; aynı trip içinde aynı isim bir kez sayılır."""
+    seen = set()
+    for day in (trip_plan or {}).get("daily_itinerary") or []:
+        if not isinstance(day, dict):
+            continue
+        for activity in day.get("activities") or []:
+            if not isinstance(activity, dict):
+                continue
+            name = str(activity.get("name") or "").strip()
+            coordinates = activity.get("coordinates") or {}
+            lat, lng = _coordinate(coordinates.get("lat")), _coordinate(coordinates.get("lng"))
+            if not name or lat is None or lng is None or (lat == 0 and lng == 0):
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                continue
+            normalized = normalize_name(name)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            yield {
+                "name": name,
+                "normalized_name": normalized,
+                "type": str(activity.get("type") or "").strip().lower() or None,
+                "address": activity.get("address") or None,
+                "description": activity.get("description") or None,
+                "lat": lat,
+                "lng": lng,
+            }
+
+
+def _is_same_place(place: models.Place, candidate: dict) -> bool:
+    distance = haversine_m(place.lat, place.lng, candidate["lat"], candidate["lng"])
+    if place.normalized_name == candidate["normalized_name"]:
+        return distance <= SAME_NAME_RADIUS_M
+    if distance > SIMILAR_NAME_RADIUS_M:
+        return False
+    return SequenceMatcher(None, place.normalized_name, candidate["normalized_name"]).ratio() >= SIMILAR_NAME_RATIO
+
+
+async def upsert_place(db: AsyncSession, city: str, country: str | None, candidate: dict, trip_id: int) -> models.Place:
+    """Yakındaki eşleşen mekânı güncelle ya da yenisini ekle."""
+    cells = neighbor_cells(candidate["lat"], candidate["lng"])
+    result = await db.execute(
+        select(models.Place).where(models.Place.city == city, models.Place.geocell.in_(cells))
+    )
+    for place in result.scalars():
+        if _is_same_place(place, candidate):
+            place.mention_count += 1
+            place.last_trip_id = trip_id
+            # Eksik alanları yeni gözlemle tamamla
+            place.type = place.type or candidate["type"]
+            place.address = place.address or candidate["address"]
+            place.description = place.description or candidate["description"]
+            place.country = place.country or country
+            metrics.inc("place_catalog.places_merged")
+            return place
+
+    geohash = geohash_encode(candidate["lat"], candidate["lng"])
+    place = models.Place(
+        city=city,
+        country=country,
+        geohash=geohash,
+        geocell=geohash[:GEOCELL_PRECISION],
+        mention_count=1,
+        last_trip_id=trip_id,
+        **candidate,
+    )
+    db.add(place)
+    # Aynı batch'teki sonraki trip'ler bu satırı görebilsin
+    await db.flush()
+    metrics.inc("place_catalog.places_created")
+    return place
+
+
+def rescan_floor(last_id: int) -> int:
+    """Bu id'nin üstündeki (watermark altı dahil) trip'ler taranır."""
+    return max(0, last_id - TRIP_INGEST_RESCAN_WINDOW)
+
+
+async def ingest_batch(session_factory=AsyncSessionLocal, batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """Watermark'tan sonraki en fazla `batch_size` trip'i işle; işlenen trip sayısını döner."""
+    async with session_factory() as db:
+        locked = await db.scalar(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_ID)))
+        if not locked:
+            # Başka bir worker şu an çalışıyor
+            return 0
+
+        watermark = await db.get(models.JobWatermark, JOB_NAME)
+        if watermark is None:
+            watermark = models.JobWatermark(job=JOB_NAME, last_id=0)
+            db.add(watermark)
+        recent_ids = set(watermark.recent_ids or [])
+
+        query = (
+            select(
+                models.Trip.id, models.Trip.city, models.Trip.country, models.Trip.legacy_trip_plan,
+                models.TripPlanBlob.codec, models.TripPlanBlob.data,
+            )
+            .outerjoin(models.TripPlanBlob, models.TripPlanBlob.hash == models.Trip.plan_hash)
+            .where(models.Trip.id > rescan_floor(watermark.last_id))
+            .order_by(models.Trip.id.asc())
+            .limit(batch_size)
+        )
+        if recent_ids:
+            query = query.where(models.Trip.id.not_in(recent_ids))
+        trips = (await db.execute(query)).all()
+        if not trips:
+            return 0
+
+        for trip in trips:
+            city = normalize_name(trip.city or "")
+            if not city:
+                continue
+            trip_plan = decompress_plan(trip.codec, trip.data) if trip.codec else trip.legacy_trip_plan
+            for candidate in extract_places(trip_plan):
+                await upsert_place(db, city, trip.country, candidate, trip.id)
+
+        late = sum(1 for trip in trips if trip.id < watermark.last_id)
+        watermark.last_id = max(watermark.last_id, trips[-1].id)
+        floor = rescan_floor(watermark.last_id)
+        watermark.recent_ids = sorted(i for i in recent_ids.union(trip.id for trip in trips) if i > floor)
+        await db.commit()
+
+    if late:
+        metrics.inc("place_catalog.late_trips", late)
+
+    metrics.inc("place_catalog.trips_ingested", len(trips))
+    return len(trips)
+
+
+async def ingest_new_trips(batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """Bekleyen tüm trip'leri batch'ler halinde işle."""
+    total = 0
+    while True:
+        processed = await ingest_batch(batch_size=batch_size)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+async def run_catalog_worker(interval: int = INGEST_INTERVAL) -> None:
+    """Lifespan'de başlatılan periyodik iş."""
+    while True:
+        try:
+            processed = await ingest_new_trips()
+            if processed:
+                print(f"🗺️ Place catalog: {processed} yeni trip işlendi")
+        except Exception as e:
+            metrics.inc("place_catalog.errors")
+            print(f"Place catalog ingestion failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def top_places(
+    db: AsyncSession,
+    city: str,
+    place_type: str | None = None,
+    limit: int = 20,
+) -> list[models.Place]:
+    """Şehirdeki en çok geçen mekânlar (opsiyonel tip filtresiyle)."""
+    query = select(models.Place).where(models.Place.city == normalize_name(city))
+    if place_type:
+        query = query.where(models.Place.type == place_type.strip().lower())
+    query = query.order_by(models.Place.mention_count.desc(), models.Place.id.asc()).limit(limit)
+    result = await db.execute(query)
+    return list(result.scalars().all())
@@ -0,0 +1,188 @@
+"""
+trip_plan'ların içerik adresli, sıkıştırılmış saklanması.
+
+Her trip satırı planın kendisi yerine plan_hash (sha256(kanonik JSON)) tutar; plan
+trip_plan_blobs'ta bir kez ve sıkıştırılmış olarak durur. Önbellekten gelen / aynı şekilde
+tekrar üretilen planlar ve bir planın geçmiş + kayıtlı kopyaları aynı blob'u paylaşır.
+
+Okuma tembeldir: listeler blob'a hiç dokunmaz, detay sorguları blob'u joinedload ile
+sıkıştırılmış halde çeker ve plan sadece Trip.trip_plan okunduğunda açılır.
+
+Eski satırlar (trips.trip_plan dolu) `admin_panel.py trips migrate-plans` ile taşınır;
+`trips plan-storage` kazanılan alanı, `trips plan-gc` sahipsiz blob'ları temizler.
+"""
+from sqlalchemy import JSON, bindparam, func, null, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import models
+from database.database import AsyncSessionLocal
+from database.plan_codec import canonical_json, compress_plan, plan_hash
+from services import metrics
+
+MIGRATE_BATCH_SIZE = 500
+# Yeni yazılmış bir blob, trip'i commit edilmeden silinmesin
+ORPHAN_GRACE = "1 hour"
+
+_trips = models.Trip.__table__
+MIGRATE_ROW = (
+    update(_trips)
+    .where(_trips.c.id == bindparam("trip_id"))
+    .values(
+        plan_hash=bindparam("new_plan_hash"),
+        # None JSON null olarak yazılırdı; SQL NULL gerekiyor
+        trip_plan=null(),
+        summary=bindparam("new_summary", type_=JSON),
+        plan_terms=bindparam("new_plan_terms", type_=JSONB),
+        # Kullanıcı değişikliği değil: onupdate tetiklenmesin
+        updated_at=_trips.c.updated_at,
+    )
+)
+
+# Tabloda artık olmayan, eski istemcilerin hâlâ gönderebildiği alanlar
+DEPRECATED_FIELDS = ("mode", "places")
+
+
+async def store_plans(db: AsyncSession, plans: list[dict]) -> list[str]:
+    """Planları blob olarak yaz (var olanlara dokunma) ve sırayla hash'lerini döndür."""
+    hashes, blobs = [], {}
+    for plan in plans:
+        raw = canonical_json(plan)
+        digest = plan_hash(raw)
+        hashes.append(digest)
+        if digest not in blobs:
+            codec, data = compress_plan(raw)
+            blobs[digest] = {"hash": digest, "codec": codec, "data": data, "raw_size": len(raw), "stored_size": len(data)}
+    if not blobs:
+        return hashes
+
+    result = await db.execute(
+        insert(models.TripPlanBlob)
+        .values(list(blobs.values()))
+        .on_conflict_do_nothing(index_elements=["hash"])
+        .returning(models.TripPlanBlob.hash)
+    )
+    written = set(result.scalars().all())
+    metrics.inc("trip_plan.blobs_written", len(written))
+    metrics.inc("trip_plan.blob_dedup_hits", len(hashes) - len(written))
+    metrics.inc("trip_plan.bytes_saved", sum(blobs[h]["raw_size"] - blobs[h]["stored_size"] for h in written))
+    return hashes
+
+
+async def store_plan(db: AsyncSession, plan: dict) -> str:
+    return (await store_plans(db, [plan]))[0]
+
+
+def plan_columns(plan: dict | None) -> dict:
+    """Plandan yazarken türetilen kolonlar (liste özeti ve arama terimleri)."""
+    return {
+        "summary": models.summarize_trip_plan(plan),
+        "plan_terms": models.plan_search_terms(plan),
+    }
+
+
+async def build_trip(db: AsyncSession, fields: dict) -> models.Trip:
+    """Trip alanlarından (trip_plan dahil) bir Trip oluştur; plan blob olarak saklanır."""
+    fields = {key: value for key, value in fields.items() if key not in DEPRECATED_FIELDS}
+    plan = fields.pop("trip_plan")
+    trip = models.Trip(**fields, plan_hash=await store_plan(db, plan), **plan_columns(plan))
+    # Yanıt için blob'u tekrar okuyup açmaya gerek yok
+    trip._trip_plan = plan
+    return trip
+
+
+async def migrate_batch(session_factory=AsyncSessionLocal, batch_size: int = MIGRATE_BATCH_SIZE) -> int:
+    """trips.trip_plan'ı dolu en fazla `batch_size` satırı blob'a taşı; taşınan satır sayısını döner."""
+    async with session_factory() as db:
+        result = await db.execute(
+            select(models.Trip.id, models.Trip.legacy_trip_plan)
+            .where(models.Trip.legacy_trip_plan.is_not(None))
+            .order_by(models.Trip.id.asc())
+            .limit(batch_size)
+            # Paralel çalışan bir diğer migrate aynı satırları beklemeden atlasın
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if rows:
+            hashes = await store_plans(db, [row.legacy_trip_plan for row in rows])
+            # Tek prepared statement ile executemany (satır başına round-trip yok)
+            await db.execute(
+                MIGRATE_ROW,
+                [
+                    {
+                        "trip_id": row.id,
+                        "new_plan_hash": digest,
+                        "new_summary": models.summarize_trip_plan(row.legacy_trip_plan),
+                        "new_plan_terms": models.plan_search_terms(row.legacy_trip_plan),
+                    }
+                    for row, digest in zip(rows, hashes)
+                ],
+            )
+        await db.commit()
+
+    metrics.inc("trip_plan.rows_migrated", len(rows))
+    return len(rows)
+
+
+async def migrate_legacy_plans(batch_size: int = MIGRATE_BATCH_SIZE) -> int:
+    """Tüm eski satırları batch'ler halinde taşı (her batch ayrı transaction)."""
+    total = 0
+    while True:
+        migrated = await migrate_batch(batch_size=batch_size)
+        total += migrated
+        if migrated < batch_size:
+            return total
+
+
+async def gc_orphan_blobs(db: AsyncSession) -> int:
+    """Hiçbir trip'in (arşivdekiler dahil) göstermediği blob'ları sil."""
+    result = await db.execute(text(
+        f"""
+        DELETE FROM trip_plan_blobs b
+        WHERE b.created_at < now() at time zone 'utc' - interval '{ORPHAN_GRACE}'
+          AND NOT EXISTS (SELECT 1 FROM trips t WHERE t.plan_hash = b.hash)
+          AND NOT EXISTS (SELECT 1 FROM trip_history_archive a WHERE a.plan_hash = b.hash)
+        """
+    ))
+    await db.commit()
+    metrics.inc("trip_plan.blobs_collected", result.rowcount)
+    return result.rowcount
+
+
+async def storage_stats(db: AsyncSession) -> dict:
+    """Blob depolamasının kazancı: sıkıştırma, tekilleştirme ve tablo boyutları."""
+    trips = await db.execute(select(
+        func.count(models.Trip.id),
+        func.count(models.Trip.plan_hash),
+        func.count(models.Trip.legacy_trip_plan),
+    ))
+    trip_count, blob_backed, legacy = trips.one()
+    blobs = await db.execute(select(
+        func.count(models.TripPlanBlob.hash),
+        func.coalesce(func.sum(models.TripPlanBlob.raw_size), 0),
+        func.coalesce(func.sum(models.TripPlanBlob.stored_size), 0),
+    ))
+    blob_count, raw_bytes, stored_bytes = blobs.one()
+    # Blob'suz olsaydı her trip planın tam kopyasını taşıyacaktı
+    referenced_bytes = await db.scalar(
+        select(func.coalesce(func.sum(models.TripPlanBlob.raw_size), 0))
+        .select_from(models.Trip)
+        .join(models.TripPlanBlob, models.TripPlanBlob.hash == models.Trip.plan_hash)
+    )
+    sizes = await db.execute(text(
+        "SELECT pg_total_relation_size('trips'), pg_total_relation_size('trip_plan_blobs')"
+    ))
+    trips_size, blobs_size = sizes.one()
+    return {
+        "trips": trip_count,
+        "blob_backed_trips": blob_backed,
+        "legacy_trips": legacy,
+        "blobs": blob_count,
+        "referenced_plan_bytes": int(referenced_bytes),
+        "unique_plan_bytes": int(raw_bytes),
+        "stored_plan_bytes": int(stored_bytes),
+        "dedup_ratio": round(int(referenced_bytes) / int(raw_bytes), 2) if raw_bytes else None,
+        "compression_ratio": round(int(raw_bytes) / int(stored_bytes), 2) if stored_bytes else None,
+        "trips_table_bytes": trips_size,
+        "blobs_table_bytes": blobs_size,
+    }
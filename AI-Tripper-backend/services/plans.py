@@ -0,0 +1,60 @@
+import os
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Subscription
+
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", 300))
+
+_local_plans: dict[int, tuple[str, float]] = {}
+
+
+async def get_user_plan(db: AsyncSession | None, user_id: int) -> str:
+    """
+    Kullanıcının aktif abonelik planı ("free", "premium", "pro"), kısa süreli cache'li.
+    `db` verilmezse (ör. middleware içinden) sadece cache ıskalanınca kısa bir oturum açılır.
+    """
+    from database.database import AsyncSessionLocal, redis_client
+
+    cached = _local_plans.get(user_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    cache_key = f"user_plan:{user_id}"
+    plan = None
+    try:
+        if redis_client:
+            plan = await redis_client.get(cache_key)
+    except Exception as e:
+        print(f"Redis get error: {e}")
+
+    if not plan:
+        query = select(Subscription.plan, Subscription.status).where(Subscription.user_id == user_id)
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                row = (await session.execute(query)).first()
+        else:
+            row = (await db.execute(query)).first()
+        plan = row.plan if row and row.status == "active" else "free"
+        try:
+            if redis_client:
+                await redis_client.set(cache_key, plan, ex=PLAN_CACHE_TTL)
+        except Exception as e:
+            print(f"Redis set error: {e}")
+
+    _local_plans[user_id] = (plan, time.monotonic() + PLAN_CACHE_TTL)
+    return plan
+
+
+async def invalidate_user_plan(user_id: int) -> None:
+    """Abonelik değiştiğinde çağrılır (webhook, iptal)."""
+    from database.database import redis_client
+
+    _local_plans.pop(user_id, None)
+    try:
+        if redis_client:
+            await redis_client.delete(f"user_plan:{user_id}")
+    except Exception as e:
+        print(f"Redis delete error: {e}")
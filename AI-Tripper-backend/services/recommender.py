@@ -0,0 +1,337 @@
+"""
+LLM'siz, profil tabanlı destinasyon önerileri.
+
+Süreç içi bir indeks tutulur:
+- Şehir özellik vektörleri: trip geçmişindeki ilgi alanı / bütçe / yolcu tipi etiketleri
+  ve mekân kataloğundaki tip dağılımı (log ağırlıklı, L2 normalize, yoğun NumPy matrisi).
+- Şehir-şehir birlikte kaydedilme matrisi: kullanıcıların kaydettiği trip'lerden
+  (SciPy sparse, D^-1/2 C D^-1/2 ile normalize).
+
+Öneri = profil vektörü ile içerik benzerliği + kaydedilen şehirlerden işbirlikçi skor
++ tercih edilen ülke bonusu. Sorgu sadece bellek içi matris çarpımıdır.
+
+Arka plan işi yeni trip'leri id watermark'ı ile artımlı ekler (geç commit edilenler için
+watermark altındaki pencere de taranır, bkz. place_catalog); kaydetmeden vazgeçme gibi
+güncellemeler periyodik tam yeniden kurulumla düzeltilir. İndeks her worker'da ayrıdır.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func, select
+
+from database import models
+from database.database import AsyncSessionLocal
+from services import metrics
+from services.place_catalog import normalize_name, rescan_floor
+
+RECOMMENDER_INTERVAL = int(os.getenv("RECOMMENDER_INTERVAL", 300))  # 0 = kapalı
+RECOMMENDER_REBUILD_INTERVAL = int(os.getenv("RECOMMENDER_REBUILD_INTERVAL", 86400))
+INGEST_BATCH_SIZE = 5000
+
+CONTENT_WEIGHT = 0.6
+COLLABORATIVE_WEIGHT = 0.4
+PREFERRED_COUNTRY_BONUS = 0.2
+POPULARITY_WEIGHT = 0.05
+
+# Profil travel_style -> trip bütçe etiketi
+TRAVEL_STYLE_BUDGET = {"luks": "luks", "butce": "ekonomik", "rahat": "orta"}
+
+
+def _tag(namespace: str, value: str) -> str | None:
+    value = normalize_name(str(value or ""))
+    return f"{namespace}:{value}" if value else None
+
+
+class _IndexData:
+    """Artımlı biriken ham sayımlar. Sadece refresh() (kilit altında) değiştirir; sorgular görmez."""
+
+    def __init__(self):
+        self.last_trip_id = 0
+        # Tekrar tarama penceresinde (rescan_floor üstü) zaten eklenmiş trip id'leri
+        self.recent_trip_ids: set[int] = set()
+        self.city_ids: dict[str, int] = {}
+        self.city_names: list[Counter] = []  # görünen isim adayları (en sık olan kullanılır)
+        self.city_countries: list[Counter] = []
+        self.trip_counts: list[int] = []
+        self.trip_features: list[Counter] = []
+        self.catalog_features: dict[int, Counter] = {}
+        self.feature_ids: dict[str, int] = {}
+        self.user_cities: dict[int, set[int]] = defaultdict(set)
+        self.saved_counts: list[int] = []
+        self.cooccurrence: dict[tuple[int, int], int] = defaultdict(int)
+
+    def _city(self, raw_city: str) -> int | None:
+        key = normalize_name(raw_city or "")
+        if not key:
+            return None
+        city_id = self.city_ids.get(key)
+        if city_id is None:
+            city_id = self.city_ids[key] = len(self.city_ids)
+            self.city_names.append(Counter())
+            self.city_countries.append(Counter())
+            self.trip_counts.append(0)
+            self.trip_features.append(Counter())
+            self.saved_counts.append(0)
+        return city_id
+
+    def _feature(self, tag: str) -> int:
+        feature_id = self.feature_ids.get(tag)
+        if feature_id is None:
+            feature_id = self.feature_ids[tag] = len(self.feature_ids)
+        return feature_id
+
+    def add_trip(self, trip) -> None:
+        city_id = self._city(trip.city)
+        if city_id is None:
+            return
+        self.city_names[city_id][trip.city.strip()] += 1
+        if trip.country:
+            self.city_countries[city_id][trip.country.strip()] += 1
+        self.trip_counts[city_id] += 1
+
+        tags = [_tag("interest", interest) for interest in (trip.interests or [])]
+        tags += [_tag("budget", trip.budget), _tag("travelers", trip.travelers)]
+        for tag in filter(None, tags):
+            self.trip_features[city_id][self._feature(tag)] += 1
+
+        if trip.is_saved:
+            saved = self.user_cities[trip.user_id]
+            if city_id not in saved:
+                for other in saved:
+                    self.cooccurrence[(city_id, other)] += 1
+                    self.cooccurrence[(other, city_id)] += 1
+                saved.add(city_id)
+                self.saved_counts[city_id] += 1
+
+    def set_catalog_types(self, rows) -> None:
+        self.catalog_features = {}
+        for city, place_type, mentions in rows:
+            city_id = self.city_ids.get(city)
+            tag = _tag("type", place_type)
+            if city_id is None or tag is None:
+                continue
+            self.catalog_features.setdefault(city_id, Counter())[self._feature(tag)] += mentions or 0
+
+    def _feature_matrix(self) -> np.ndarray:
+        matrix = np.zeros((len(self.city_ids), max(1, len(self.feature_ids))), dtype=np.float32)
+        for city_id, counts in enumerate(self.trip_features):
+            for feature_id, count in counts.items():
+                matrix[city_id, feature_id] += math.log1p(count)
+        for city_id, counts in self.catalog_features.items():
+            for feature_id, count in counts.items():
+                matrix[city_id, feature_id] += math.log1p(count)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def _similarity_matrix(self) -> sparse.csr_matrix:
+        size = len(self.city_ids)
+        if self.cooccurrence:
+            pairs = np.array(list(self.cooccurrence.keys()), dtype=np.int64)
+            counts = np.fromiter(self.cooccurrence.values(), dtype=np.float32, count=len(self.cooccurrence))
+            matrix = sparse.coo_matrix((counts, (pairs[:, 0], pairs[:, 1])), shape=(size, size)).tocsr()
+        else:
+            matrix = sparse.csr_matrix((size, size), dtype=np.float32)
+        saved = np.asarray(self.saved_counts, dtype=np.float32)
+        scale = sparse.diags(1.0 / np.sqrt(np.where(saved == 0, 1, saved)))
+        return (scale @ matrix @ scale).tocsr()
+
+    def snapshot(self) -> "_IndexSnapshot":
+        """Sorgulanacak değişmez kopya (matrisler dahil). CPU ağır: thread'de çağrılır."""
+        popularity = np.log1p(np.asarray(self.trip_counts, dtype=np.float32))
+        return _IndexSnapshot(
+            features=self._feature_matrix(),
+            similarity=self._similarity_matrix(),
+            feature_ids=dict(self.feature_ids),
+            user_cities={user_id: frozenset(cities) for user_id, cities in self.user_cities.items()},
+            popularity=popularity / max(1.0, float(popularity.max(initial=0.0))),
+            names=[counts.most_common(1)[0][0] for counts in self.city_names],
+            countries=[counts.most_common(1)[0][0] if counts else None for counts in self.city_countries],
+        )
+
+
+class _IndexSnapshot:
+    """Tamamlanmış indeks; sorgular sadece bunu okur, refresh yenisini hazırlayıp referansı değiştirir."""
+
+    def __init__(self, features, similarity, feature_ids, user_cities, popularity, names, countries):
+        self.features: np.ndarray = features
+        self.similarity: sparse.csr_matrix = similarity
+        self.feature_ids: dict[str, int] = feature_ids
+        self.user_cities: dict[int, frozenset[int]] = user_cities
+        self.popularity: np.ndarray = popularity
+        self.names: list[str] = names
+        self.countries: list[str | None] = countries
+
+    def _profile_vector(self, profile: dict) -> np.ndarray:
+        vector = np.zeros(max(1, len(self.feature_ids)), dtype=np.float32)
+        tags = [
+            _tag("interest", value)
+            for field in ("interests", "vacation_types", "hobbies")
+            for value in (profile.get(field) or [])
+        ]
+        style_budget = TRAVEL_STYLE_BUDGET.get(normalize_name(profile.get("travel_style") or ""))
+        if style_budget:
+            tags.append(_tag("budget", style_budget))
+        for tag in filter(None, tags):
+            feature_id = self.feature_ids.get(tag)
+            if feature_id is not None:
+                vector[feature_id] = 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def recommend(self, user_id: int, profile: dict, limit: int = 10) -> list[dict]:
+        size = len(self.names)
+        if size == 0:
+            return []
+
+        content = self.features @ self._profile_vector(profile)
+
+        saved = self.user_cities.get(user_id, frozenset())
+        collaborative = np.zeros(size, dtype=np.float32)
+        if saved:
+            collaborative = np.asarray(self.similarity[sorted(saved)].sum(axis=0)).ravel()
+            collaborative /= max(1.0, float(collaborative.max()))
+
+        preferred = {normalize_name(c) for c in (profile.get("preferred_countries") or [])}
+        bonus = np.array(
+            [PREFERRED_COUNTRY_BONUS if c and normalize_name(c) in preferred else 0.0 for c in self.countries],
+            dtype=np.float32,
+        )
+
+        scores = CONTENT_WEIGHT * content + COLLABORATIVE_WEIGHT * collaborative + bonus + POPULARITY_WEIGHT * self.popularity
+        if saved:
+            scores[list(saved)] = -np.inf  # zaten kaydettiği şehirleri önerme
+
+        limit = min(limit, size)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for city_id in top:
+            if not np.isfinite(scores[city_id]):
+                continue
+            results.append(
+                {
+                    "city": self.names[city_id],
+                    "country": self.countries[city_id],
+                    "score": round(float(scores[city_id]), 4),
+                    "content_score": round(float(content[city_id]), 4),
+                    "collaborative_score": round(float(collaborative[city_id]), 4),
+                }
+            )
+        return results
+
+
+class RecommendationIndex:
+    """
+    Sorgular her zaman son tamamlanmış _IndexSnapshot'tan cevaplanır. refresh ham sayımları
+    (tam kurulumda sıfırdan, ayrı bir _IndexData'da) günceller, matrisleri thread'de kurar ve
+    sonra tek bir referans atamasıyla yeni snapshot'a geçer; kurulum sırasında eski snapshot
+    hizmet vermeye devam eder.
+    """
+
+    def __init__(self):
+        self._data = _IndexData()
+        self._snapshot: _IndexSnapshot | None = None
+        self._lock = asyncio.Lock()
+        self._built_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def recommend(self, user_id: int, profile: dict, limit: int = 10) -> list[dict]:
+        snapshot = self._snapshot
+        return snapshot.recommend(user_id, profile, limit) if snapshot else []
+
+    async def _ingest(self, data: _IndexData) -> int:
+        added = 0
+        cursor = rescan_floor(data.last_trip_id)
+        async with AsyncSessionLocal() as db:
+            while True:
+                query = (
+                    select(
+                        models.Trip.id,
+                        models.Trip.user_id,
+                        models.Trip.city,
+                        models.Trip.country,
+                        models.Trip.interests,
+                        models.Trip.budget,
+                        models.Trip.travelers,
+                        models.Trip.is_saved,
+                    )
+                    .where(models.Trip.id > cursor)
+                    .order_by(models.Trip.id.asc())
+                    .limit(INGEST_BATCH_SIZE)
+                )
+                if data.recent_trip_ids:
+                    query = query.where(models.Trip.id.not_in(data.recent_trip_ids))
+                trips = (await db.execute(query)).all()
+                for trip in trips:
+                    data.add_trip(trip)
+                    data.recent_trip_ids.add(trip.id)
+                if trips:
+                    cursor = trips[-1].id
+                    data.last_trip_id = max(data.last_trip_id, cursor)
+                    floor = rescan_floor(data.last_trip_id)
+                    data.recent_trip_ids = {i for i in data.recent_trip_ids if i > floor}
+                    added += len(trips)
+                if len(trips) < INGEST_BATCH_SIZE:
+                    break
+
+            catalog = await db.execute(
+                select(models.Place.city, models.Place.type, func.sum(models.Place.mention_count))
+                .group_by(models.Place.city, models.Place.type)
+            )
+            data.set_catalog_types(catalog.all())
+        return added
+
+    async def refresh(self, full: bool = False) -> int:
+        """Yeni trip'leri ekle (veya tam yeniden kur); eklenen trip sayısını döner."""
+        async with self._lock:
+            return await self._refresh(full)
+
+    async def _refresh(self, full: bool) -> int:
+        # Tam kurulum canlı indekse dokunmaz; artımlı güncellemede _data'yı sorgular zaten okumaz
+        data = _IndexData() if full else self._data
+        added = await self._ingest(data)
+        # Matrisler sorgu anında değil burada, event loop'u bloklamadan thread'de kurulur
+        snapshot = await asyncio.to_thread(data.snapshot)
+        self._data, self._snapshot = data, snapshot
+        if full:
+            self._built_at = time.monotonic()
+        metrics.set_gauge("recommender.cities", len(snapshot.names))
+        metrics.inc("recommender.trips_ingested", added)
+        return added
+
+    async def ensure_ready(self) -> None:
+        if self.ready:
+            return
+        async with self._lock:
+            # Bekleyen eşzamanlı istekler kurulumu tekrarlamasın
+            if not self.ready:
+                await self._refresh(full=True)
+
+    def rebuild_due(self) -> bool:
+        return time.monotonic() - self._built_at >= RECOMMENDER_REBUILD_INTERVAL
+
+
+recommendation_index = RecommendationIndex()
+
+
+async def run_recommender_worker(interval: int = RECOMMENDER_INTERVAL) -> None:
+    """Lifespan'de başlatılan periyodik iş: artımlı güncelleme + günlük tam yeniden kurulum."""
+    while True:
+        try:
+            full = not recommendation_index.ready or recommendation_index.rebuild_due()
+            added = await recommendation_index.refresh(full=full)
+            if added:
+                print(f"🧭 Recommender: {added} trip işlendi ({'tam' if full else 'artımlı'})")
+        except Exception as e:
+            metrics.inc("recommender.errors")
+            print(f"Recommender refresh failed: {e}")
+        await asyncio.sleep(interval)
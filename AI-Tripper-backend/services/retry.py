@@ -0,0 +1,157 @@
+"""
+Dış çağrılar için ortak retry politikası.
+
+- Decorrelated jitter backoff (istemciler aynı anda yeniden denemesin)
+- Retry-After başlığı / Google RetryInfo gövdesi dikkate alınır
+- İstekten aşağı aktarılan uçtan uca deadline (ContextVar) aşılmaz
+- Geçici ağ hataları (ConnectTimeout, ReadTimeout, ...) yeniden denenir
+"""
+import asyncio
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable
+
+import httpx
+
+# Trip planner için varsayılan uçtan uca süre (istemci X-Request-Timeout ile kısaltabilir)
+DEFAULT_REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE_SECONDS", 150))
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """İsteğin uçtan uca süresi doldu; yeni deneme yapılmaz."""
+
+
+@contextmanager
+def request_deadline(seconds: float | None):
+    """Bu blok (ve içinde başlatılan görevler) için mutlak bir deadline belirle."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(min(deadline, current) if current else deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_remaining() -> float | None:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def parse_request_timeout(value: str | None) -> float:
+    """X-Request-Timeout başlığı (saniye); geçersizse veya çok büyükse varsayılan kullanılır."""
+    try:
+        return min(float(value), DEFAULT_REQUEST_DEADLINE) if value else DEFAULT_REQUEST_DEADLINE
+    except ValueError:
+        return DEFAULT_REQUEST_DEADLINE
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Retry-After (saniye veya HTTP tarihi) ya da Google RetryInfo `retryDelay` alanı."""
+    header = response.headers.get("Retry-After")
+    if header:
+        header = header.strip()
+        if header.isdigit():
+            return float(header)
+        try:
+            return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    match = re.search(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"', response.text[:4000])
+    if match:
+        return float(match.group(1))
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    retry_exceptions: tuple[type[Exception], ...] = field(
+        default=(
+            httpx.ConnectTimeout,
+            httpx.ReadTimeout,
+            httpx.PoolTimeout,
+            httpx.ConnectError,
+            httpx.RemoteProtocolError,
+        )
+    )
+
+    def next_delay(self, previous: float) -> float:
+        """Decorrelated jitter: sleep = min(cap, uniform(base, previous * 3))."""
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    async def run(
+        self,
+        call: Callable[[int], Awaitable[httpx.Response]],
+        on_retry: Callable[[int, float, httpx.Response | None, Exception | None], None] | None = None,
+    ) -> httpx.Response:
+        """
+        `call(attempt)`'i politikaya göre tekrarla. Son yanıt (başarısız olsa da) döner;
+        ağ hatası yeniden denenemezse son istisna fırlatılır.
+        """
+        delay = self.base_delay
+        for attempt in range(self.max_attempts):
+            remaining = deadline_remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded()
+
+            response, error = None, None
+            try:
+                if remaining is None:
+                    response = await call(attempt)
+                else:
+                    async with asyncio.timeout(remaining):
+                        response = await call(attempt)
+            except TimeoutError:
+                raise DeadlineExceeded() from None
+            except self.retry_exceptions as exc:
+                error = exc
+
+            last_attempt = attempt == self.max_attempts - 1
+            if error is None and (response.status_code not in self.retry_statuses or last_attempt):
+                return response
+            if error is not None and last_attempt:
+                raise error
+
+            delay = self.next_delay(delay)
+            wait = delay
+            if response is not None:
+                server_hint = retry_after_seconds(response)
+                if server_hint is not None:
+                    # Sunucunun istediğinden önce gelme, ama yine de biraz jitter ekle;
+                    # deadline olmasa da bekleme max_delay'i aşmaz (Retry-After: 3600 gibi)
+                    wait = min(server_hint + random.uniform(0, self.base_delay), self.max_delay)
+
+            remaining = deadline_remaining()
+            if remaining is not None and wait >= remaining:
+                # Beklersek deadline'ı kaçıracağız: mevcut sonucu hemen bildir
+                if error is not None:
+                    raise error
+                return response
+
+            if on_retry:
+                on_retry(attempt, wait, response, error)
+            await asyncio.sleep(wait)
+
+        raise RuntimeError("unreachable")
+
+
+# Gemini: pahalı ve kota sınırlı, daha uzun backoff
+GEMINI_RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=30.0)
+# Nominatim, REST Countries, Unsplash: hızlı başarısız ol
+OUTBOUND_RETRY_POLICY = RetryPolicy(max_attempts=2, base_delay=0.3, max_delay=2.0)
@@ -0,0 +1,85 @@
+"""
+Sunucuda tutulan kısa ömürlü taslak planlar.
+
+/api/trip-planner ürettiği (ve doğruladığı) planı form bilgileriyle birlikte Redis'e
+sıkıştırılmış olarak yazar ve bir draft_id döner. Kaydetme / geçmiş çağrıları tüm planı
+tekrar göndermek yerine sadece draft_id + isim gönderir; plan tekrar doğrulanmaz.
+
+Redis yoksa draft oluşturulmaz (draft_id None) ve istemci eskisi gibi planın tamamını yollar.
+"""
+import base64
+import json
+import os
+import secrets
+import zlib
+
+from fastapi import HTTPException
+
+from database import schemas
+from services import metrics
+
+TRIP_DRAFT_TTL = int(os.getenv("TRIP_DRAFT_TTL", 86400))  # saniye
+
+DRAFT_FIELDS = ("city", "country", "duration_days", "travelers", "interests", "budget", "transport", "trip_plan")
+
+
+def _draft_key(user_id: int, draft_id: str) -> str:
+    # Kullanıcıya bağlı anahtar: başka kullanıcı draft_id'yi bilse bile okuyamaz
+    return f"trip_draft:{user_id}:{draft_id}"
+
+
+def _encode(draft: dict) -> str:
+    # decode_responses=True olduğu için sıkıştırılmış veri base64 metin olarak tutulur
+    return base64.b64encode(zlib.compress(json.dumps(draft, ensure_ascii=False).encode("utf-8"))).decode("ascii")
+
+
+def _decode(value: str) -> dict:
+    return json.loads(zlib.decompress(base64.b64decode(value)).decode("utf-8"))
+
+
+async def create_draft(user_id: int, draft: dict) -> str | None:
+    """Planı taslak olarak sakla; Redis yoksa veya hata olursa None."""
+    from database.database import redis_client
+
+    if not redis_client:
+        return None
+
+    draft_id = secrets.token_urlsafe(16)
+    try:
+        await redis_client.setex(_draft_key(user_id, draft_id), TRIP_DRAFT_TTL, _encode(draft))
+    except Exception as e:
+        print(f"Trip draft write error: {e}")
+        return None
+    metrics.inc("trip_drafts.created")
+    return draft_id
+
+
+async def load_draft(user_id: int, draft_id: str) -> dict | None:
+    from database.database import redis_client
+
+    if not redis_client:
+        return None
+    try:
+        value = await redis_client.get(_draft_key(user_id, draft_id))
+    except Exception as e:
+        print(f"Trip draft read error: {e}")
+        return None
+    return _decode(value) if value else None
+
+
+async def trip_fields(trip: schemas.TripCreate, user_id: int) -> dict:
+    """TripCreate'i Trip kolonlarına çevir; draft_id verilmişse plan taslaktan okunur."""
+    if not trip.draft_id:
+        return trip.model_dump(exclude={"draft_id"})
+
+    draft = await load_draft(user_id, trip.draft_id)
+    if draft is None:
+        metrics.inc("trip_drafts.missing")
+        raise HTTPException(status_code=404, detail="Trip draft not found or expired")
+
+    metrics.inc("trip_drafts.used")
+    return {
+        **{field: draft.get(field) for field in DRAFT_FIELDS},
+        "name": trip.name,
+        "is_saved": trip.is_saved,
+    }
@@ -0,0 +1,128 @@
+"""
+Geçmiş / kayıtlı trip listeleri için keyset sayfalama.
+
+Sıra (created_at DESC, id DESC); cursor son satırın (created_at, id) çiftidir, böylece
+derin sayfalar OFFSET gibi önceki satırları taramaz (ix_trips_user_created_id).
+Listeler sadece özet kolonları yükler; plan blob'u yalnızca detay endpoint'inden döner.
+"""
+import base64
+import re
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from database import models
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+SUMMARY_COLUMNS = (
+    models.Trip.id,
+    models.Trip.user_id,
+    models.Trip.is_saved,
+    models.Trip.name,
+    models.Trip.city,
+    models.Trip.country,
+    models.Trip.duration_days,
+    models.Trip.travelers,
+    models.Trip.interests,
+    models.Trip.budget,
+    models.Trip.transport,
+    models.Trip.summary,
+    models.Trip.created_at,
+    models.Trip.updated_at,
+)
+
+
+def encode_cursor(trip: models.Trip) -> str:
+    raw = f"{trip.created_at.isoformat()}|{trip.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, trip_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(trip_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def trip_page_query(user_id: int, saved_only: bool = False, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Liste sorgusu (bench_queries.py de EXPLAIN için aynı sorguyu kullanır)."""
+    query = select(models.Trip).options(load_only(*SUMMARY_COLUMNS)).where(models.Trip.user_id == user_id)
+    if saved_only:
+        query = query.where(models.Trip.is_saved == True)
+    if cursor:
+        query = query.where(tuple_(models.Trip.created_at, models.Trip.id) < decode_cursor(cursor))
+    # Bir fazla satır: sonraki sayfa var mı diye ayrıca COUNT sorgusu atmamak için
+    return query.order_by(models.Trip.created_at.desc(), models.Trip.id.desc()).limit(limit + 1)
+
+
+def _prefix_tsquery(text: str) -> str | None:
+    """Prefix araması: 'ayasofya cam' -> 'ayasofya:* & cam:*' (sadece harf/rakam kelimeleri, kaçış gerekmez)."""
+    words = re.findall(r"\w+", text.casefold())[:8]
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+def trip_search_query(
+    user_id: int,
+    q: str | None = None,
+    place_type: str | None = None,
+    interest: str | None = None,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """Kayıtlı trip'lerde arama; filtreler GIN indekslerini kullanır (ix_trips_search, *_gin)."""
+    query = trip_page_query(user_id, saved_only=True, cursor=cursor, limit=limit)
+    tsquery = _prefix_tsquery(q or "")
+    if tsquery:
+        document = func.trip_search_document(
+            models.Trip.name, models.Trip.city, models.Trip.plan_terms, models.Trip.interests
+        )
+        query = query.where(document.op("@@")(func.to_tsquery("simple", tsquery)))
+    if place_type:
+        query = query.where(
+            models.Trip.plan_terms.contains({"types": [place_type.strip().lower()]})
+        )
+    if interest:
+        query = query.where(models.Trip.interests.contains([interest.strip().lower()]))
+    return query
+
+
+async def _page(db: AsyncSession, query, limit: int) -> dict:
+    result = await db.execute(query)
+    trips = list(result.scalars().all())
+    has_more = len(trips) > limit
+    trips = trips[:limit]
+    return {
+        "items": trips,
+        "next_cursor": encode_cursor(trips[-1]) if has_more else None,
+    }
+
+
+async def list_trips(
+    db: AsyncSession,
+    user_id: int,
+    saved_only: bool = False,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """Bir sayfa trip özeti ve bir sonraki sayfanın cursor'ı (yoksa None)."""
+    return await _page(db, trip_page_query(user_id, saved_only=saved_only, cursor=cursor, limit=limit), limit)
+
+
+async def search_trips(
+    db: AsyncSession,
+    user_id: int,
+    q: str | None = None,
+    place_type: str | None = None,
+    interest: str | None = None,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    query = trip_search_query(user_id, q=q, place_type=place_type, interest=interest, cursor=cursor, limit=limit)
+    return await _page(db, query, limit)
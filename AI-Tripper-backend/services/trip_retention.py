@@ -0,0 +1,213 @@
+"""
+Kaydedilmemiş geçmiş trip'ler için saklama (retention) işi.
+
+TRIP_HISTORY_RETENTION_DAYS'ten eski `is_saved=False` satırlar `trips`'ten alınıp aylık
+partition'lı trip_history_archive'a taşınır (veya mode="delete" ile silinir). Böylece
+`trips` kaydedilmiş planlar + yakın geçmişle sınırlı kalır ve kullanıcı sorguları küçük
+bir tabloda çalışır.
+
+- Her batch tek bir DELETE ... RETURNING -> INSERT ifadesi ve ayrı bir transaction'dır;
+  satır kilitleri batch boyunca tutulur, FOR UPDATE SKIP LOCKED ile o an düzenlenen
+  satırlar beklenmeden atlanır.
+- Batch'ler arasında kısa bir bekleme autovacuum / replikaların yetişmesine fırsat verir.
+- TRIP_ARCHIVE_RETENTION_MONTHS'ten eski arşiv partition'ları satır satır silinmez,
+  DROP TABLE ile bütün olarak atılır.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import models
+from database.database import AsyncSessionLocal
+from services import metrics
+
+TRIP_HISTORY_RETENTION_DAYS = int(os.getenv("TRIP_HISTORY_RETENTION_DAYS", 180))
+TRIP_ARCHIVE_RETENTION_MONTHS = int(os.getenv("TRIP_ARCHIVE_RETENTION_MONTHS", 24))  # 0: arşiv hiç silinmez
+TRIP_RETENTION_BATCH_SIZE = int(os.getenv("TRIP_RETENTION_BATCH_SIZE", 1000))
+TRIP_RETENTION_PAUSE = float(os.getenv("TRIP_RETENTION_PAUSE", 0.1))  # saniye, batch'ler arası
+TRIP_RETENTION_INTERVAL = int(os.getenv("TRIP_RETENTION_INTERVAL", 3600))  # saniye; 0 ile worker kapalı
+
+ADVISORY_LOCK_ID = 0x7269_7465  # "rite": aynı anda tek retention batch'i
+ARCHIVE_TABLE = "trip_history_archive"
+PARTITION_NAME = re.compile(rf"^{ARCHIVE_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+ARCHIVE_COLUMNS = (
+    "id, user_id, name, city, country, duration_days, travelers, interests, budget, transport, "
+    "plan_hash, trip_plan, summary, created_at, updated_at"
+)
+
+# Taşınacak batch: eskiden yeniye, kilitli satırlar atlanır (ix_trips_created_at)
+_BATCH = f"""
+    SELECT id FROM trips
+    WHERE is_saved IS NOT TRUE AND created_at < :cutoff
+    ORDER BY created_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+"""
+
+ARCHIVE_BATCH = text(f"""
+    WITH batch AS ({_BATCH}),
+    moved AS (
+        DELETE FROM trips t USING batch WHERE t.id = batch.id
+        RETURNING {", ".join(f"t.{column.strip()}" for column in ARCHIVE_COLUMNS.split(","))}
+    )
+    INSERT INTO {ARCHIVE_TABLE} ({ARCHIVE_COLUMNS}, archived_at)
+    SELECT {ARCHIVE_COLUMNS}, now() at time zone 'utc' FROM moved
+""")
+
+DELETE_BATCH = text(f"""
+    WITH batch AS ({_BATCH})
+    DELETE FROM trips t USING batch WHERE t.id = batch.id
+""")
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def history_cutoff(days: int = TRIP_HISTORY_RETENTION_DAYS) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def _eligible(cutoff: datetime):
+    return select(models.Trip.id).where(models.Trip.is_saved.is_not(True), models.Trip.created_at < cutoff)
+
+
+async def count_eligible(db: AsyncSession, cutoff: datetime) -> int:
+    return await db.scalar(select(func.count()).select_from(_eligible(cutoff).subquery()))
+
+
+async def _partition_names(db: AsyncSession) -> list[str]:
+    result = await db.execute(text(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+        """
+    ), {"parent": ARCHIVE_TABLE})
+    return list(result.scalars())
+
+
+async def ensure_partitions(db: AsyncSession, cutoff: datetime) -> int:
+    """Taşınacak en eski satırdan cutoff ayına kadar eksik aylık partition'ları aç."""
+    # Paralel iki worker aynı partition'ı açmaya çalışmasın
+    await db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_ID)))
+    oldest = await db.scalar(select(func.min(models.Trip.created_at)).where(
+        models.Trip.is_saved.is_not(True), models.Trip.created_at < cutoff
+    ))
+    if oldest is None:
+        return 0
+
+    existing = set(await _partition_names(db))
+    created = 0
+    month = _month_start(oldest)
+    while month <= cutoff:
+        name = f"{ARCHIVE_TABLE}_y{month.year:04d}m{month.month:02d}"
+        if name not in existing:
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ARCHIVE_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+            ))
+            created += 1
+        month = _next_month(month)
+    await db.commit()
+    metrics.inc("trip_retention.partitions_created", created)
+    return created
+
+
+async def drop_expired_partitions(db: AsyncSession, months: int = TRIP_ARCHIVE_RETENTION_MONTHS) -> list[str]:
+    """Tamamı `months` aydan eski arşiv partition'larını at."""
+    if months <= 0:
+        return []
+    now = datetime.utcnow()
+    # Bu ayın başından `months` ay geri
+    index = now.year * 12 + now.month - 1 - months
+    limit = datetime(index // 12, index % 12 + 1, 1)
+
+    await db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_ID)))
+    dropped = []
+    for name in sorted(await _partition_names(db)):
+        match = PARTITION_NAME.match(name)
+        if match and _next_month(datetime(int(match.group(1)), int(match.group(2)), 1)) <= limit:
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    await db.commit()
+    metrics.inc("trip_retention.partitions_dropped", len(dropped))
+    return dropped
+
+
+async def retention_batch(
+    session_factory=AsyncSessionLocal,
+    cutoff: datetime | None = None,
+    batch_size: int = TRIP_RETENTION_BATCH_SIZE,
+    mode: str = "archive",
+) -> int:
+    """Bir batch'i arşive taşı (veya sil); işlenen satır sayısını döner."""
+    statement = ARCHIVE_BATCH if mode == "archive" else DELETE_BATCH
+    async with session_factory() as db:
+        locked = await db.scalar(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_ID)))
+        if not locked:
+            # Başka bir retention çalışıyor
+            return 0
+        # Uzun süre kilit beklemektense batch'i bırak (bir sonraki turda tekrar denenir)
+        await db.execute(text("SET LOCAL lock_timeout = '2s'"))
+        result = await db.execute(statement, {"cutoff": cutoff or history_cutoff(), "batch_size": batch_size})
+        await db.commit()
+
+    metrics.inc("trip_retention.rows", result.rowcount, mode=mode)
+    return result.rowcount
+
+
+async def run_retention(
+    days: int = TRIP_HISTORY_RETENTION_DAYS,
+    batch_size: int = TRIP_RETENTION_BATCH_SIZE,
+    mode: str = "archive",
+    max_batches: int | None = None,
+    on_batch: Callable[[int, int], None] | None = None,
+    session_factory=AsyncSessionLocal,
+) -> dict:
+    """Eşiği geçen tüm geçmişi batch'ler halinde işle; on_batch(batch_no, toplam) ilerleme bildirir."""
+    cutoff = history_cutoff(days)
+    if mode == "archive":
+        async with session_factory() as db:
+            await ensure_partitions(db, cutoff)
+
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        processed = await retention_batch(session_factory, cutoff, batch_size, mode)
+        if not processed:
+            break
+        total += processed
+        batches += 1
+        if on_batch:
+            on_batch(batches, total)
+        await asyncio.sleep(TRIP_RETENTION_PAUSE)
+
+    async with session_factory() as db:
+        dropped = await drop_expired_partitions(db)
+    return {"cutoff": cutoff, "mode": mode, "rows": total, "batches": batches, "dropped_partitions": dropped}
+
+
+async def run_retention_worker(interval: int = TRIP_RETENTION_INTERVAL) -> None:
+    """Lifespan'de başlatılan periyodik iş."""
+    while True:
+        try:
+            report = await run_retention()
+            if report["rows"] or report["dropped_partitions"]:
+                print(
+                    f"🗄️ Trip retention: {report['rows']} geçmiş trip arşivlendi, "
+                    f"{len(report['dropped_partitions'])} eski partition silindi"
+                )
+        except Exception as e:
+            metrics.inc("trip_retention.errors")
+            print(f"Trip retention failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,203 @@
+"""
+Kimliği doğrulanmış kullanıcı çözümlemesi için önbellekler (bkz. auth.security._user_from_token).
+
+- Token önbelleği: doğrulanmış token -> (user_id, exp). Sınırlı LRU; JWT her istekte yeniden
+  çözülmez, eski (sub=username) token'lar için username sorgusu bir kez yapılır.
+- Kullanıcı snapshot'ı: users satırının kolon değerleri (hashed_password hariç; gerekirse
+  session'dan ayrıca yüklenir). Süreç içinde USER_CACHE_LOCAL_TTL, Redis'te USER_CACHE_TTL
+  saniye tutulur; istek session'ına SELECT atmadan bağlanır.
+
+Profil güncelleme, silme, (de)aktivasyon ve kredi değişikliklerinden sonra invalidate_user
+çağrılır ve kullanıcının sürüm sayacı artar. cache_user sadece SELECT'ten önce okunan sürüm
+hâlâ geçerliyse yazar: commit'ten önce eski satırı okumuş eşzamanlı bir istek, invalidation'dan
+sonra eski snapshot'ı geri yazamaz. Diğer worker'ların süreç içi kopyası en geç
+USER_CACHE_LOCAL_TTL içinde düşer.
+"""
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import DateTime, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from database import models
+from services import metrics
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))  # saniye, Redis
+USER_CACHE_LOCAL_TTL = float(os.getenv("USER_CACHE_LOCAL_TTL", 5))  # saniye, süreç içi
+# Sürüm sayacı snapshot'tan uzun yaşamalı; düşerse yazma güvenli tarafta kalır (atlanır)
+USER_VERSION_TTL = 86400
+
+_tokens: OrderedDict[str, tuple[int, float]] = OrderedDict()
+_local_users: OrderedDict[int, tuple[dict, float]] = OrderedDict()
+# user_id -> son süreç içi invalidation sırası
+_local_versions: OrderedDict[int, int] = OrderedDict()
+_invalidation_seq = itertools.count(1)
+
+# Parola hash'i önbelleğe (Redis dahil) hiç yazılmaz
+_SECRET_COLUMNS = {"hashed_password"}
+_USER_COLUMNS = [attr.key for attr in sa_inspect(models.User).column_attrs if attr.key not in _SECRET_COLUMNS]
+_DATETIME_COLUMNS = {
+    attr.key for attr in sa_inspect(models.User).column_attrs if isinstance(attr.columns[0].type, DateTime)
+}
+
+
+# KEYS[1] = snapshot, KEYS[2] = sürüm sayacı; ARGV = snapshot, beklenen sürüm, ttl
+CONDITIONAL_SET_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+_conditional_set = None
+_conditional_set_client = None
+
+
+@dataclass(frozen=True)
+class UserVersion:
+    """Snapshot aranırken okunan invalidation sürümü; cache_user sadece hâlâ aynıysa yazar."""
+
+    shared: str | None  # Redis sayacı; None = okunamadı, Redis'e yazılmaz
+    local: int
+
+
+def cached_token_user(token: str) -> int | None:
+    """Token daha önce doğrulandıysa ve süresi dolmadıysa kullanıcı id'si."""
+    entry = _tokens.get(token)
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at <= time.time():
+        _tokens.pop(token, None)
+        return None
+    _tokens.move_to_end(token)
+    return user_id
+
+
+def remember_token(token: str, user_id: int, expires_at: float | None) -> None:
+    _tokens[token] = (user_id, expires_at if expires_at is not None else float("inf"))
+    _tokens.move_to_end(token)
+    while len(_tokens) > AUTH_TOKEN_CACHE_SIZE:
+        _tokens.popitem(last=False)
+
+
+def snapshot_user(user: models.User) -> dict:
+    snapshot = {key: getattr(user, key) for key in _USER_COLUMNS}
+    for key in _DATETIME_COLUMNS:
+        if snapshot[key] is not None:
+            snapshot[key] = snapshot[key].isoformat()
+    return snapshot
+
+
+async def attach_user(db: AsyncSession, snapshot: dict) -> models.User:
+    """Snapshot'tan, session'a bağlı (persistent) bir User oluştur; veritabanına gidilmez."""
+    values = dict(snapshot)
+    for key in _DATETIME_COLUMNS:
+        if values.get(key) is not None:
+            values[key] = datetime.fromisoformat(values[key])
+    user = models.User(**values)
+    # Sorgudan yeni yüklenmiş gibi "temiz" duruma getir: sadece değiştirilen alanlar UPDATE edilir
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def _remember_local(user_id: int, snapshot: dict) -> None:
+    _local_users[user_id] = (snapshot, time.monotonic() + USER_CACHE_LOCAL_TTL)
+    _local_users.move_to_end(user_id)
+    while len(_local_users) > USER_CACHE_SIZE:
+        _local_users.popitem(last=False)
+
+
+def _local_version(user_id: int) -> int:
+    return _local_versions.get(user_id, 0)
+
+
+async def get_user_snapshot(user_id: int) -> tuple[dict | None, UserVersion]:
+    """Önbellekteki snapshot (yoksa None) ve miss durumunda cache_user'a verilecek sürüm."""
+    from database.database import redis_client
+
+    local = _local_version(user_id)
+    cached = _local_users.get(user_id)
+    if cached and cached[1] > time.monotonic():
+        metrics.inc("auth.user_cache", result="local")
+        return cached[0], UserVersion(shared=None, local=local)
+
+    shared = None
+    try:
+        if redis_client:
+            raw, shared = await redis_client.mget(f"auth_user:{user_id}", f"auth_user_version:{user_id}")
+            shared = shared or "0"
+            if raw:
+                snapshot = json.loads(raw)
+                if _local_version(user_id) == local:
+                    _remember_local(user_id, snapshot)
+                metrics.inc("auth.user_cache", result="redis")
+                return snapshot, UserVersion(shared=shared, local=local)
+    except Exception as e:
+        print(f"User cache read error: {e}")
+
+    metrics.inc("auth.user_cache", result="miss")
+    return None, UserVersion(shared=shared, local=local)
+
+
+async def cache_user(user: models.User, version: UserVersion | None) -> None:
+    """Yeni okunan satırı önbelleğe al; arada invalidation olduysa (sürüm değiştiyse) yazma."""
+    global _conditional_set, _conditional_set_client
+    from database.database import redis_client
+
+    if version is None or _local_version(user.id) != version.local:
+        metrics.inc("auth.user_cache_write_skipped", reason="local")
+        return
+    snapshot = snapshot_user(user)
+    _remember_local(user.id, snapshot)
+    if version.shared is None:
+        return
+    try:
+        if redis_client:
+            if _conditional_set is None or _conditional_set_client is not redis_client:
+                _conditional_set = redis_client.register_script(CONDITIONAL_SET_LUA)
+                _conditional_set_client = redis_client
+            written = await _conditional_set(
+                keys=[f"auth_user:{user.id}", f"auth_user_version:{user.id}"],
+                args=[json.dumps(snapshot), version.shared, USER_CACHE_TTL],
+            )
+            if not int(written):
+                # Başka bir worker arada invalidate etti: süreç içi kopya da eski olabilir
+                _local_users.pop(user.id, None)
+                metrics.inc("auth.user_cache_write_skipped", reason="shared")
+    except Exception as e:
+        print(f"User cache write error: {e}")
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Kullanıcı satırı değişti (profil, aktiflik, kredi) veya silindi."""
+    from database.database import mark_user_write, redis_client
+
+    # Gecikmeli replikadan eski satır okunup tekrar önbelleğe alınmasın (sürüm artmadan önce)
+    await mark_user_write(user_id)
+    _local_users.pop(user_id, None)
+    _local_versions[user_id] = next(_invalidation_seq)
+    _local_versions.move_to_end(user_id)
+    while len(_local_versions) > USER_CACHE_SIZE:
+        _local_versions.popitem(last=False)
+    # Silinen/yeniden adlandırılan kullanıcının token'ları tekrar doğrulansın
+    for token in [token for token, (cached_id, _) in _tokens.items() if cached_id == user_id]:
+        _tokens.pop(token, None)
+    try:
+        if redis_client:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(f"auth_user:{user_id}")
+                pipe.incr(f"auth_user_version:{user_id}")
+                pipe.expire(f"auth_user_version:{user_id}", USER_VERSION_TTL)
+                await pipe.execute()
+    except Exception as e:
+        print(f"User cache delete error: {e}")
+    metrics.inc("auth.user_cache_invalidations")
@@ -0,0 +1,51 @@
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from database.database import AsyncSessionLocal
+from database.models import User
+from services.credit_ledger import credit_ledger
+
+PARALLEL_REQUESTS = 100
+STARTING_CREDITS = 3
+
+
+async def reserve_once(user_id: int) -> bool:
+    try:
+        async with credit_ledger.hold(user_id):
+            await asyncio.sleep(0.01)  # generation süresini taklit et
+        return True
+    except HTTPException:
+        return False
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.username == "credit_race_user"))
+        user = User(
+            email="credit_race_user@test.com",
+            username="credit_race_user",
+            hashed_password="x",
+            remaining_routes=STARTING_CREDITS,
+        )
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    results = await asyncio.gather(*(reserve_once(user_id) for _ in range(PARALLEL_REQUESTS)))
+    succeeded = sum(results)
+
+    async with AsyncSessionLocal() as db:
+        remaining = await db.scalar(select(User.remaining_routes).where(User.id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+    print(f"Parallel requests: {PARALLEL_REQUESTS}, succeeded: {succeeded}, remaining: {remaining}")
+    assert succeeded == STARTING_CREDITS, "Overspend detected!"
+    assert remaining == 0
+    print("✅ No overspend")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
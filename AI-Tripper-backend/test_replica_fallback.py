@@ -0,0 +1,61 @@
+"""
+Replika sorgu sırasında ulaşılamaz olursa okuma aynı istekte primary'de tekrarlanmalı (200, 500 değil).
+
+Replika adresi bilerek ulaşılamaz bir sokete ayarlanır; gecikme ölçümü "sağlıklı" olarak
+önceden doldurulur, böylece istek replikaya yönlenir ve bağlantı sorgu anında düşer.
+
+    DATABASE_URL=postgresql://... python test_replica_fallback.py
+"""
+import asyncio
+import os
+import time
+
+os.environ["READ_REPLICA_URL"] = "postgresql://postgres@/aitripper?host=/nonexistent-replica-socket"
+
+import httpx
+from sqlalchemy import delete
+
+from database import database
+from database.models import User
+from main import app
+from services import metrics
+
+USERNAME = "replica_fallback_user"
+
+
+async def main():
+    async with database.AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.username == USERNAME))
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post(
+            "/api/auth/register",
+            json={"email": f"{USERNAME}@test.com", "username": USERNAME, "password": "secret123"},
+        )
+        response = await client.post("/api/auth/login", data={"username": USERNAME, "password": "secret123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        # Token önbelleğe girsin (yönlendirme için kullanıcı bilinsin)
+        assert (await client.get("/api/auth/me", headers=headers)).status_code == 200
+
+        # Replika son ölçümde sağlıklıydı, sonra düştü
+        database._sticky_users.clear()
+        database._replica_state.update(lag=0.0, checked_at=time.monotonic(), down_until=0.0)
+        response = await client.get("/api/history/", headers=headers)
+
+    async with database.AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.username == USERNAME))
+        await db.commit()
+
+    counters = metrics.snapshot()["counters"]
+    print(f"GET /api/history/ -> {response.status_code}")
+    assert response.status_code == 200, response.text
+    assert counters.get("db.read_route{route=replica}", 0) >= 1, "request was not routed to the replica"
+    assert counters.get("db.read_route{reason=replica_error,route=primary}", 0) >= 1
+    assert database._replica_state["down_until"] > time.monotonic(), "replica was not marked down"
+    print("✅ Replica failure fell back to primary within the same request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
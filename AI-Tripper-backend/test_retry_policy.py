@@ -0,0 +1,67 @@
+"""
+Sunucunun Retry-After / RetryInfo ipucu, deadline yokken bile max_delay'den uzun bekletmemeli.
+
+Ağ ve veritabanı gerekmez; asyncio.sleep kaydedilir, gerçekten beklenmez:
+
+    python test_retry_policy.py
+"""
+import asyncio
+
+import httpx
+
+from services import retry
+from services.retry import RetryPolicy
+
+waits = []
+
+
+async def fake_sleep(seconds):
+    waits.append(seconds)
+
+
+def responses(*items):
+    queue = list(items)
+
+    async def call(attempt):
+        return queue.pop(0)
+
+    return call
+
+
+async def main():
+    retry.asyncio.sleep = fake_sleep
+    policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=10.0)
+    assert retry.deadline_remaining() is None
+
+    # Retry-After başlığı (saniye)
+    response = await policy.run(
+        responses(
+            httpx.Response(429, headers={"Retry-After": "3600"}),
+            httpx.Response(200),
+        )
+    )
+    assert response.status_code == 200
+    assert waits == [10.0], waits
+
+    # Google RetryInfo gövdesi
+    waits.clear()
+    response = await policy.run(
+        responses(
+            httpx.Response(429, text='{"error": {"details": [{"retryDelay": "900s"}]}}'),
+            httpx.Response(200),
+        )
+    )
+    assert response.status_code == 200
+    assert waits == [10.0], waits
+
+    # Kısa ipucu hâlâ dikkate alınır (jitter base_delay içinde)
+    waits.clear()
+    await policy.run(responses(httpx.Response(503, headers={"Retry-After": "2"}), httpx.Response(200)))
+    assert 2.0 <= waits[0] <= 2.5, waits
+
+    print(f"waits capped at max_delay={policy.max_delay}s")
+    print("✅ Server retry hints never exceed max_delay")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Önbellekten çeviri yolunda model nesne yerine JSON dizisi dönerse trip planner 500 vermemeli,
+itinerary'yi yeniden üretmeli.
+
+Gemini ve Redis çağrıları süreç içinde taklit edilir (ağ yok); sadece veritabanı gerekir:
+
+    DATABASE_URL=postgresql://... python test_translation_fallback.py
+"""
+import asyncio
+
+import httpx
+from sqlalchemy import delete
+
+import gemini_stub
+from database.database import AsyncSessionLocal
+from database.models import User
+from main import app
+from services import llm_service, metrics
+
+USERNAME = "translation_fallback_user"
+CITY = "Translationville"
+
+calls = {"translation": 0, "itinerary": 0}
+
+
+async def fake_call_gemini_json(payload, static_prefix=None, choices=None, quality_check=None):
+    prompt = payload["contents"][0]["parts"][0]["text"]
+    if "Translate every string" in prompt:
+        calls["translation"] += 1
+        return ["not", "an", "object"]
+    calls["itinerary"] += 1
+    return gemini_stub._fake_itinerary(prompt)
+
+
+async def cached_in_other_language(trip_data):
+    # Aynı gezi İngilizce olarak önbellekte varmış gibi
+    return gemini_stub._fake_itinerary(f"Create a {trip_data['days']}-day travel itinerary for {CITY} in English")
+
+
+async def main():
+    llm_service._call_gemini_json = fake_call_gemini_json
+    llm_service._cached_itinerary_in_other_language = cached_in_other_language
+    llm_service.key_pool.keys = lambda: ["test"]
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.username == USERNAME))
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post(
+            "/api/auth/register",
+            json={"email": f"{USERNAME}@test.com", "username": USERNAME, "password": "secret123"},
+        )
+        response = await client.post("/api/auth/login", data={"username": USERNAME, "password": "secret123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.post(
+            "/api/trip-planner",
+            headers=headers,
+            json={"city": CITY, "days": 2, "travelers": "cift", "language": "Turkish"},
+        )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.username == USERNAME))
+        await db.commit()
+
+    print(f"POST /api/trip-planner -> {response.status_code}, calls={calls}")
+    assert response.status_code == 200, response.text
+    assert calls["translation"] == 1, "translation path was not exercised"
+    assert calls["itinerary"] == 1, "itinerary was not regenerated"
+    assert metrics.counter_value("itinerary_cache.translated") == 0
+    print("✅ Non-object translation answer fell back to regeneration")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -239,7 +239,7 @@ export default function RouteForm({ onRequireAuth }: RouteFormProps) {
                 updateUser({ ...user, remaining_routes: response.remaining_routes });
             }
 
-            setCurrentTripPlan(response.itinerary);
+            setCurrentTripPlan(response.itinerary, response.draft_id);
             setCurrentTripFormData({
                 city,
                 days: parseInt(days),
@@ -1,7 +1,7 @@
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuthStore } from "../store/useAuthStore";
-import { getRouteHistory, type RouteHistoryResponse } from "../services/api";
+import { getRouteHistory, type TripListItem } from "../services/api";
 import Navbar from "../components/Navbar";
 import Breadcrumb from "../components/Breadcrumb";
 import { Clock, MapPin, Calendar, Loader2, Sparkles } from "lucide-react";
@@ -10,7 +10,9 @@ import { motion } from "framer-motion";
 export default function History() {
     const { token } = useAuthStore();
     const navigate = useNavigate();
-    const [history, setHistory] = useState<RouteHistoryResponse[]>([]);
+    const [history, setHistory] = useState<TripListItem[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
 
@@ -22,8 +24,9 @@ export default function History() {
 
         const loadHistory = async () => {
             try {
-                const data = await getRouteHistory(token);
-                setHistory(data);
+                const page = await getRouteHistory(token);
+                setHistory(page.items);
+                setNextCursor(page.next_cursor);
             } catch (err: any) {
                 console.error("Failed to load history:", err);
                 setError(err.message || "Не удалось загрузить историю");
@@ -35,6 +38,22 @@ export default function History() {
         loadHistory();
     }, [token, navigate]);
 
+    const loadMoreHistory = async () => {
+        if (!token || !nextCursor) return;
+
+        setLoadingMore(true);
+        try {
+            const page = await getRouteHistory(token, nextCursor);
+            setHistory((current) => [...current, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err: any) {
+            console.error("Failed to load more history:", err);
+            setError(err.message || "Не удалось загрузить историю");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     return (
         <div className="min-h-screen bg-[#f8fafc] font-sans">
             <Navbar />
@@ -145,6 +164,20 @@ export default function History() {
                         ))}
                     </div>
                 )}
+
+                {/* Load more */}
+                {!loading && !error && nextCursor && (
+                    <div className="flex justify-center mt-8">
+                        <button
+                            onClick={loadMoreHistory}
+                            disabled={loadingMore}
+                            className="px-6 py-3 bg-white border border-gray-200 rounded-xl font-semibold text-gray-700 hover:border-orange-500/50 transition-colors flex items-center gap-2 disabled:opacity-60"
+                        >
+                            {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                            Показать еще
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -2,7 +2,7 @@ import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuthStore } from "../store/useAuthStore";
 import { useTripStore } from "../store/useTripStore";
-import { getSavedTrips, deleteSavedTrip, type SavedTripResponse } from "../services/api";
+import { getSavedTrips, getSavedTrip, deleteSavedTrip, type TripListItem } from "../services/api";
 import Navbar from "../components/Navbar";
 import Breadcrumb from "../components/Breadcrumb";
 import { Heart, Calendar, MapPin, Users, Trash2, Eye, Loader2, DollarSign, Sparkles } from "lucide-react";
@@ -14,7 +14,9 @@ export default function SavedTrips() {
     const setCurrentTripPlan = useTripStore((state) => state.setCurrentTripPlan);
     const setCurrentTripFormData = useTripStore((state) => state.setCurrentTripFormData);
 
-    const [trips, setTrips] = useState<SavedTripResponse[]>([]);
+    const [trips, setTrips] = useState<TripListItem[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [deletingId, setDeletingId] = useState<number | null>(null);
@@ -36,8 +38,9 @@ export default function SavedTrips() {
         setError(null);
 
         try {
-            const data = await getSavedTrips(token);
-            setTrips(data);
+            const page = await getSavedTrips(token);
+            setTrips(page.items);
+            setNextCursor(page.next_cursor);
         } catch (err: any) {
             console.error("Error loading saved trips:", err);
             setError(err.message || "Не удалось загрузить сохраненные маршруты");
@@ -46,7 +49,35 @@ export default function SavedTrips() {
         }
     };
 
-    const handleViewTrip = (trip: SavedTripResponse) => {
+    const loadMoreTrips = async () => {
+        if (!token || !nextCursor) return;
+
+        setLoadingMore(true);
+        try {
+            const page = await getSavedTrips(token, nextCursor);
+            setTrips((current) => [...current, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err: any) {
+            console.error("Error loading more saved trips:", err);
+            setError(err.message || "Не удалось загрузить сохраненные маршруты");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const handleViewTrip = async (summary: TripListItem) => {
+        if (!token) return;
+
+        // Liste sadece özet içerir; tam planı detay endpoint'inden al
+        let trip;
+        try {
+            trip = await getSavedTrip(summary.id, token);
+        } catch (err: any) {
+            console.error("Error loading saved trip:", err);
+            alert(err.message || "Не удалось загрузить маршрут");
+            return;
+        }
+
         // Set the trip plan in store and navigate to result page
         setCurrentTripPlan(trip.trip_plan);
         setCurrentTripFormData({
@@ -252,6 +283,20 @@ export default function SavedTrips() {
                         ))}
                     </div>
                 )}
+
+                {/* Load more */}
+                {!loading && !error && nextCursor && (
+                    <div className="flex justify-center mt-8">
+                        <button
+                            onClick={loadMoreTrips}
+                            disabled={loadingMore}
+                            className="px-6 py-3 bg-white border border-gray-200 rounded-xl font-semibold text-gray-700 hover:border-orange-500/50 transition-colors flex items-center gap-2 disabled:opacity-60"
+                        >
+                            {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                            Показать еще
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -143,6 +143,7 @@ export default function TripPlanResult() {
     const navigate = useNavigate();
     const currentTripPlan = useTripStore((s) => s.currentTripPlan);
     const currentTripFormData = useTripStore((s) => s.currentTripFormData);
+    const currentDraftId = useTripStore((s) => s.currentDraftId);
     const { token } = useAuthStore();
 
     const [isSaving, setIsSaving] = useState(false);
@@ -174,7 +175,7 @@ export default function TripPlanResult() {
                 currentTripPlan, tripName, currentTripFormData.city,
                 currentTripFormData.days, currentTripFormData.travelers,
                 currentTripFormData.interests, currentTripFormData.budget || "orta",
-                currentTripFormData.transport || "farketmez", token,
+                currentTripFormData.transport || "farketmez", token, currentDraftId,
             );
             setSaveSuccess(true);
             setTimeout(() => { setShowSaveModal(false); setSaveSuccess(false); setTripName(""); }, 2000);
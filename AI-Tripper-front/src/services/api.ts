@@ -254,19 +254,53 @@ export async function getSavedRoutes(token: string): Promise<SavedRouteResponse[
             throw new ApiError("Failed to get saved routes", response.status);
         }
 
-        return await response.json();
+        return (await response.json()).items;
     } catch (error) {
         if (error instanceof ApiError) throw error;
         throw new ApiError("Network error getting routes", undefined, error);
     }
 }
 
+export type TripPlanSummary = {
+    destination?: string | null;
+    city_image?: string | null;
+    day_titles: (string | null)[];
+}
+
+/** Liste kartı: trip_plan içermez, tam plan için getSavedTrip */
+export type TripListItem = {
+    id: number;
+    user_id: number;
+    is_saved: boolean;
+    name?: string | null;
+    city: string;
+    country?: string | null;
+    duration_days: number;
+    travelers: string;
+    interests: string[];
+    budget?: string | null;
+    transport?: string | null;
+    summary?: TripPlanSummary | null;
+    created_at: string;
+    updated_at: string;
+}
+
+/** Keyset sayfası; next_cursor null ise son sayfa */
+export type TripPage = {
+    items: TripListItem[];
+    next_cursor: string | null;
+}
+
+function pageQuery(cursor?: string | null): string {
+    return cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+}
+
 /**
- * Get user's route history
+ * Get user's route history (one page, newest first)
  */
-export async function getRouteHistory(token: string): Promise<RouteHistoryResponse[]> {
+export async function getRouteHistory(token: string, cursor?: string | null): Promise<TripPage> {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/history`, {
+        const response = await fetch(`${API_BASE_URL}/api/history${pageQuery(cursor)}`, {
             method: "GET",
             headers: {
                 "Authorization": `Bearer ${token}`,
@@ -378,6 +412,7 @@ export type DetailedTripItinerary = {
 export type DetailedTripResponse = {
     success: boolean;
     itinerary: DetailedTripItinerary;
+    draft_id?: string;
     remaining_routes?: number;
     message: string;
 }
@@ -479,6 +514,7 @@ function toDetailedTripResponse(value: unknown): DetailedTripResponse {
     return {
         success: Boolean(value.success),
         itinerary: toDetailedTripItinerary(value.itinerary),
+        draft_id: typeof value.draft_id === "string" ? value.draft_id : undefined,
         remaining_routes: typeof value.remaining_routes === "number" ? value.remaining_routes : undefined,
         message: typeof value.message === "string" ? value.message : "",
     };
@@ -559,7 +595,9 @@ export type SavedTripResponse = {
 
 /**
  * Trip'i favorilere kaydet - Yeni trip oluşturur (POST)
- * Artık sadece kullanıcı "Kaydet" butonuna basınca veritabanına ekleniyor
+ * Artık sadece kullanıcı "Kaydet" butonuna basınca veritabanına ekleniyor.
+ * draftId varsa plan tekrar gönderilmez (sunucudaki taslak kullanılır);
+ * taslağın süresi dolmuşsa (404) planın tamamı gönderilir.
  */
 export async function saveTripToFavorites(
     tripPlan: DetailedTripItinerary,
@@ -570,16 +608,25 @@ export async function saveTripToFavorites(
     interests: string[],
     budget: string,
     transport: string,
-    token: string
+    token: string,
+    draftId?: string | null
 ): Promise<SavedTripResponse> {
+    const post = (body: Record<string, unknown>) => fetch(`${API_BASE_URL}/api/routes/saved`, {
+        method: "POST",
+        headers: {
+            "Authorization": `Bearer ${token}`,
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(body),
+    });
+
     try {
-        const response = await fetch(`${API_BASE_URL}/api/routes/saved`, {
-            method: "POST",
-            headers: {
-                "Authorization": `Bearer ${token}`,
-                "Content-Type": "application/json",
-            },
-            body: JSON.stringify({
+        let response = draftId
+            ? await post({ draft_id: draftId, is_saved: true, name: name })
+            : null;
+
+        if (!response || response.status === 404) {
+            response = await post({
                 city: city,
                 country: tripPlan.trip_summary?.destination || "",
                 duration_days: days,
@@ -590,8 +637,8 @@ export async function saveTripToFavorites(
                 trip_plan: tripPlan,
                 is_saved: true,
                 name: name
-            }),
-        });
+            });
+        }
 
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({}));
@@ -610,11 +657,11 @@ export async function saveTripToFavorites(
 }
 
 /**
- * Kayıtlı trip'leri getir (is_saved = true)
+ * Kayıtlı trip'leri getir (is_saved = true) - tek sayfa özet, en yeniden eskiye
  */
-export async function getSavedTrips(token: string): Promise<SavedTripResponse[]> {
+export async function getSavedTrips(token: string, cursor?: string | null): Promise<TripPage> {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/routes/saved`, {
+        const response = await fetch(`${API_BASE_URL}/api/routes/saved${pageQuery(cursor)}`, {
             method: "GET",
             headers: {
                 "Authorization": `Bearer ${token}`,
@@ -632,6 +679,29 @@ export async function getSavedTrips(token: string): Promise<SavedTripResponse[]>
     }
 }
 
+/**
+ * Tek bir kayıtlı trip'i tam planıyla getir
+ */
+export async function getSavedTrip(tripId: number, token: string): Promise<SavedTripResponse> {
+    try {
+        const response = await fetch(`${API_BASE_URL}/api/routes/saved/${tripId}`, {
+            method: "GET",
+            headers: {
+                "Authorization": `Bearer ${token}`,
+            },
+        });
+
+        if (!response.ok) {
+            throw new ApiError("Failed to get saved trip", response.status);
+        }
+
+        return await response.json();
+    } catch (error) {
+        if (error instanceof ApiError) throw error;
+        throw new ApiError("Network error getting saved trip", undefined, error);
+    }
+}
+
 /**
  * Kayıtlı trip'i sil
  */
@@ -5,6 +5,8 @@ import type { DetailedTripItinerary } from "../services/api";
 interface TripState {
     // AI Trip Planner state
     currentTripPlan: DetailedTripItinerary | null;
+    // Sunucudaki taslak (kaydederken planı tekrar yüklememek için)
+    currentDraftId: string | null;
     currentTripFormData: {
         city: string;
         days: number;
@@ -19,7 +21,7 @@ interface TripState {
     error: string | null;
 
     // Actions (state'i değiştiren fonksiyonlar)
-    setCurrentTripPlan: (plan: DetailedTripItinerary | null) => void;
+    setCurrentTripPlan: (plan: DetailedTripItinerary | null, draftId?: string | null) => void;
     setCurrentTripFormData: (data: TripState['currentTripFormData']) => void;
     setIsLoading: (isLoading: boolean) => void;
     setError: (error: string | null) => void;
@@ -29,6 +31,7 @@ interface TripState {
 // Initial state (başlangıç değerleri)
 const initialState = {
     currentTripPlan: null,
+    currentDraftId: null,
     currentTripFormData: null,
     isLoading: false,
     error: null,
@@ -40,7 +43,7 @@ export const useTripStore = create<TripState>((set) => ({
     ...initialState,
 
     // Actions - State'i değiştiren fonksiyonlar
-    setCurrentTripPlan: (plan) => set({ currentTripPlan: plan }),
+    setCurrentTripPlan: (plan, draftId = null) => set({ currentTripPlan: plan, currentDraftId: draftId }),
     setCurrentTripFormData: (data) => set({ currentTripFormData: data }),
     setIsLoading: (isLoading) => set({ isLoading }),
     setError: (error) => set({ error }),